@@ -0,0 +1,194 @@
+"""
+Deterministic stand-in for the Ollama HTTP API, for offline benchmarks.
+
+Embeddings are hashed bags of words, so similar texts get similar vectors
+and every run produces the same index. Chat answers stream a fixed number
+of tokens with a configurable delay between them.
+
+    python -m benchmark.fake_ollama --port 11435 --token-ms 20
+"""
+
+import argparse
+import json
+import math
+import re
+import time
+import zlib
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WORD = re.compile(r"\w+")
+ANSWER = (
+    "Based on the movies in the context, here is what I found. "
+    "The film was directed by a celebrated director and is rated highly by "
+    "audiences. It is a classic of its genre and remains popular today. "
+)
+
+
+def embed(text: str, dim: int) -> list:
+    vector = [0.0] * dim
+    for word in WORD.findall(text.lower()):
+        h = zlib.crc32(word.encode("utf-8"))
+        vector[h % dim] += 1.0 if (h >> 16) & 1 else -1.0
+    norm = math.sqrt(sum(x * x for x in vector))
+    if norm == 0:
+        vector[0] = norm = 1.0
+    return [x / norm for x in vector]
+
+
+def answer_tokens(count: int) -> list:
+    words = re.findall(r"\S+\s*", ANSWER)
+    return [words[i % len(words)] for i in range(count)]
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    settings = {}
+
+    def log_message(self, format, *args):
+        pass
+
+    def _body(self) -> dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b"{}"
+        return json.loads(raw or b"{}")
+
+    def _send_json(self, payload: dict, status: int = 200):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_stream(self, chunks):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for chunk in chunks:
+            data = (json.dumps(chunk) + "\n").encode("utf-8")
+            self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            self.wfile.flush()
+        self.wfile.write(b"0\r\n\r\n")
+
+    def do_GET(self):
+        if self.path in ("/", "/api/version"):
+            self._send_json({"version": "0.0.0-fake"})
+        elif self.path == "/api/tags":
+            self._send_json({"models": []})
+        else:
+            self._send_json({"error": "not found"}, status=404)
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_POST(self):
+        body = self._body()
+        model = body.get("model", "fake")
+        dim = self.settings["dim"]
+        if self.path == "/api/pull":
+            self._send_json({"status": "success"})
+        elif self.path == "/api/show":
+            self._send_json(
+                {
+                    "modelfile": "",
+                    "parameters": "",
+                    "template": "",
+                    "details": {"family": "fake", "format": "gguf"},
+                    "model_info": {"fake.context_length": 8192},
+                }
+            )
+        elif self.path == "/api/embed":
+            texts = body.get("input") or []
+            if isinstance(texts, str):
+                texts = [texts]
+            time.sleep(self.settings["embed_ms"] / 1000)
+            self._send_json(
+                {"model": model, "embeddings": [embed(t, dim) for t in texts]}
+            )
+        elif self.path == "/api/embeddings":
+            time.sleep(self.settings["embed_ms"] / 1000)
+            self._send_json({"embedding": embed(body.get("prompt", ""), dim)})
+        elif self.path in ("/api/chat", "/api/generate"):
+            self._generate(body, model, chat=self.path == "/api/chat")
+        else:
+            self._send_json({"error": "not found"}, status=404)
+
+    def _generate(self, body: dict, model: str, chat: bool):
+        tokens = answer_tokens(self.settings["tokens"])
+        delay = self.settings["token_ms"] / 1000
+        time.sleep(self.settings["first_token_ms"] / 1000)
+
+        def chunk(content: str, done: bool) -> dict:
+            payload = {
+                "model": model,
+                "created_at": datetime.now(timezone.utc).isoformat(),
+                "done": done,
+            }
+            if chat:
+                payload["message"] = {"role": "assistant", "content": content}
+            else:
+                payload["response"] = content
+            if done:
+                payload.update(
+                    done_reason="stop",
+                    total_duration=0,
+                    prompt_eval_count=0,
+                    eval_count=len(tokens),
+                )
+            return payload
+
+        if not body.get("stream", True):
+            time.sleep(delay * len(tokens))
+            self._send_json(chunk("".join(tokens), True))
+            return
+
+        def stream():
+            for token in tokens:
+                yield chunk(token, False)
+                time.sleep(delay)
+            yield chunk("", True)
+
+        self._send_stream(stream())
+
+
+def serve(
+    port: int,
+    dim: int = 256,
+    embed_ms: float = 0.0,
+    first_token_ms: float = 0.0,
+    token_ms: float = 10.0,
+    tokens: int = 64,
+):
+    Handler.settings = {
+        "dim": dim,
+        "embed_ms": embed_ms,
+        "first_token_ms": first_token_ms,
+        "token_ms": token_ms,
+        "tokens": tokens,
+    }
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    server.daemon_threads = True
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--embed-ms", type=float, default=0.0)
+    parser.add_argument("--first-token-ms", type=float, default=0.0)
+    parser.add_argument("--token-ms", type=float, default=10.0)
+    parser.add_argument("--tokens", type=int, default=64)
+    args = parser.parse_args()
+    serve(
+        args.port,
+        dim=args.dim,
+        embed_ms=args.embed_ms,
+        first_token_ms=args.first_token_ms,
+        token_ms=args.token_ms,
+        tokens=args.tokens,
+    )
@@ -0,0 +1,428 @@
+"""
+Offline benchmark of the RAG service.
+
+Starts a fake Ollama server, ingests a synthetic movie CSV into a local
+vector store, serves the API in-process with an in-memory chat store and
+drives it over HTTP. Measures ingest rows/s, ``/api/search`` latency under
+concurrency, ``/api/chat/stream`` time to first token and peak RSS, and
+writes them as JSON. With ``--baseline`` the run is compared against an
+earlier result and exits with status 1 on a regression.
+
+    python -m benchmark.run --rows 1000 --output bench.json
+    python -m benchmark.run --baseline bench.json --tolerance 0.15
+"""
+
+import argparse
+import asyncio
+import csv
+import json
+import os
+import platform
+import random
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+
+GENRES = ["Drama", "Crime", "Action", "Comedy", "Adventure", "Sci-Fi", "Romance"]
+FIRST_NAMES = ["Christopher", "Martin", "Akira", "Greta", "Sofia", "Bong", "Hayao"]
+LAST_NAMES = ["Nolan", "Scorsese", "Kurosawa", "Gerwig", "Coppola", "Joon-ho"]
+WORDS = (
+    "a young detective uncovers a conspiracy while a family struggles to "
+    "survive the war and two friends travel across the country to find a "
+    "lost treasure as an artist falls in love in a city of dreams"
+).split()
+QUERIES = [
+    "crime drama about a family",
+    "science fiction movie with space travel",
+    "romantic comedy in a big city",
+    "war movie directed by Kurosawa",
+    "adventure film about friends finding treasure",
+    "highly rated detective thriller",
+    "animated movie by Hayao",
+    "best drama from the nineties",
+]
+
+# Metric name -> which direction is better
+METRICS = {
+    "ingest_rows_per_s": "higher",
+    "search_rps": "higher",
+    "search_p50_ms": "lower",
+    "search_p99_ms": "lower",
+    "chat_ttft_p50_ms": "lower",
+    "chat_ttft_p99_ms": "lower",
+    "peak_rss_mb": "lower",
+}
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port: int, timeout: float = 10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.2):
+                return
+        except OSError:
+            time.sleep(0.05)
+    raise TimeoutError(f"Nothing listening on port {port}")
+
+
+def write_dataset(path: str, rows: int, seed: int = 0):
+    """Writes a CSV with the columns of the IMDB top 1000 dataset."""
+    rng = random.Random(seed)
+    columns = [
+        "Poster_Link",
+        "Series_Title",
+        "Released_Year",
+        "Certificate",
+        "Runtime",
+        "Genre",
+        "IMDB_Rating",
+        "Overview",
+        "Meta_score",
+        "Director",
+        "Star1",
+        "Star2",
+        "Star3",
+        "Star4",
+        "No_of_Votes",
+        "Gross",
+    ]
+
+    def person():
+        return f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        for i in range(rows):
+            title = " ".join(rng.sample(WORDS, 3)).title()
+            writer.writerow(
+                [
+                    f"https://example.com/posters/{i}.jpg",
+                    f"{title} {i}",
+                    rng.randint(1920, 2020),
+                    rng.choice(["U", "A", "UA", "R", "PG-13"]),
+                    f"{rng.randint(80, 200)} min",
+                    ", ".join(rng.sample(GENRES, rng.randint(1, 3))),
+                    round(rng.uniform(7.6, 9.3), 1),
+                    " ".join(rng.choices(WORDS, k=rng.randint(20, 40))).capitalize(),
+                    rng.randint(50, 100),
+                    person(),
+                    person(),
+                    person(),
+                    person(),
+                    person(),
+                    rng.randint(25000, 2000000),
+                    f"{rng.randint(10000, 500000000):,}",
+                ]
+            )
+
+
+def start_fake_ollama(port: int, args) -> subprocess.Popen:
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "benchmark.fake_ollama",
+            "--port",
+            str(port),
+            "--dim",
+            str(args.dim),
+            "--embed-ms",
+            str(args.embed_ms),
+            "--first-token-ms",
+            str(args.first_token_ms),
+            "--token-ms",
+            str(args.token_ms),
+            "--tokens",
+            str(args.tokens),
+        ]
+    )
+    wait_for_port(port)
+    return process
+
+
+def configure_env(args, workdir: str, ollama_port: int):
+    env = {
+        "OLLAMA_API": f"http://127.0.0.1:{ollama_port}",
+        "EMBEDDED_MODEL": "fake-embed",
+        "LLM_MODEL": "fake-llm",
+        "FILE_PATH": os.path.join(workdir, "movies.csv"),
+        "COLLECTION_NAME": "benchmark",
+        "VECTOR_STORE": "numpy",
+        "NUMPY_STORE_PATH": os.path.join(workdir, "numpy_store"),
+        "NEIGHBORS_PATH": os.path.join(workdir, "neighbors"),
+        "CHAT_STORE": "memory",
+        "SYNC_ON_START": "false",
+        "INGEST_CHECKPOINT": "",
+        "SEMANTIC_CACHE": "false",
+        "WARM_UP": "false",
+        "EMBED_CACHE_SIZE": "0",
+        "EMBED_CACHE_PATH": "",
+    }
+    if args.qdrant_url:
+        env["VECTOR_STORE"] = "qdrant"
+        env["QDRANT_URL"] = args.qdrant_url
+    for item in args.env:
+        key, _, value = item.partition("=")
+        env[key] = value
+    os.environ.update(env)
+    return env
+
+
+def percentile(values: list, q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, round(q / 100 * len(values)) - 1))
+    return values[index]
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def bench_ingest() -> dict:
+    from src.config.load_config import load_config
+    from src.core.indexing import Indexer
+
+    indexer = Indexer(indexer_config=load_config().indexer_config())
+    stats = indexer.ingest_file(start_row=0)
+    return {
+        "rows": stats["rows"],
+        "vectors": stats["vectors"],
+        "seconds": stats["seconds"],
+        "rows_per_s": stats["rows"] / stats["seconds"] if stats["seconds"] else 0.0,
+    }
+
+
+def start_server(port: int):
+    import uvicorn
+
+    from main import app
+
+    server = uvicorn.Server(
+        uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning")
+    )
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        if not thread.is_alive():
+            raise RuntimeError("API server failed to start")
+        time.sleep(0.05)
+    wait_until_ready(f"http://127.0.0.1:{port}/api/ready")
+    return server, thread
+
+
+def wait_until_ready(url: str, timeout: float = 300.0):
+    import httpx
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        response = httpx.get(url)
+        if response.status_code == 200:
+            return
+        if response.json().get("status") == "failed":
+            raise RuntimeError(f"API failed to start: {response.text}")
+        time.sleep(0.1)
+    raise TimeoutError("API did not become ready")
+
+
+async def drive(total: int, concurrency: int, request):
+    """Runs ``request(i)`` ``total`` times with ``concurrency`` in flight."""
+    counter = iter(range(total))
+    results = []
+    errors = 0
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            try:
+                results.append(await request(i))
+            except Exception:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return results, errors, time.perf_counter() - started
+
+
+async def bench_search(base_url: str, total: int, concurrency: int) -> dict:
+    import httpx
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+
+        async def request(i):
+            started = time.perf_counter()
+            response = await client.post(
+                "/api/search", json={"query": QUERIES[i % len(QUERIES)], "limit": 5}
+            )
+            response.raise_for_status()
+            return (time.perf_counter() - started) * 1000
+
+        latencies, errors, elapsed = await drive(total, concurrency, request)
+    return {
+        "requests": total,
+        "concurrency": concurrency,
+        "errors": errors,
+        "rps": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 50),
+        "p99_ms": percentile(latencies, 99),
+    }
+
+
+async def bench_chat(base_url: str, total: int, concurrency: int) -> dict:
+    import httpx
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=120) as client:
+
+        async def request(i):
+            body = {"message": QUERIES[i % len(QUERIES)], "user_id": f"bench-{i}"}
+            started = time.perf_counter()
+            ttft = None
+            async with client.stream("POST", "/api/chat/stream", json=body) as r:
+                r.raise_for_status()
+                async for line in r.aiter_lines():
+                    if ttft is None and line.startswith("data:"):
+                        ttft = time.perf_counter() - started
+            if ttft is None:
+                raise RuntimeError("empty stream")
+            return ttft * 1000, (time.perf_counter() - started) * 1000
+
+        results, errors, _ = await drive(total, concurrency, request)
+    ttfts = [ttft for ttft, _ in results]
+    totals = [total for _, total in results]
+    return {
+        "requests": total,
+        "concurrency": concurrency,
+        "errors": errors,
+        "ttft_p50_ms": percentile(ttfts, 50),
+        "ttft_p99_ms": percentile(ttfts, 99),
+        "total_p50_ms": percentile(totals, 50),
+    }
+
+
+def compare(metrics: dict, baseline: dict, tolerance: float) -> list:
+    regressions = []
+    for name, better in METRICS.items():
+        old, new = baseline.get(name), metrics.get(name)
+        if not old or new is None:
+            continue
+        change = (new - old) / old
+        if (better == "higher" and change < -tolerance) or (
+            better == "lower" and change > tolerance
+        ):
+            regressions.append(f"{name}: {old:.2f} -> {new:.2f} ({change:+.1%})")
+    return regressions
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark of the API")
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--search-requests", type=int, default=500)
+    parser.add_argument("--search-concurrency", type=int, default=16)
+    parser.add_argument("--chat-requests", type=int, default=50)
+    parser.add_argument("--chat-concurrency", type=int, default=8)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--embed-ms", type=float, default=0.0)
+    parser.add_argument("--first-token-ms", type=float, default=50.0)
+    parser.add_argument("--token-ms", type=float, default=10.0)
+    parser.add_argument("--tokens", type=int, default=64)
+    parser.add_argument(
+        "--qdrant-url", help="Benchmark against this Qdrant instead of numpy"
+    )
+    parser.add_argument(
+        "--env", action="append", default=[], help="Extra KEY=VALUE settings"
+    )
+    parser.add_argument("--output", default="benchmark_result.json")
+    parser.add_argument("--baseline", help="Earlier result to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="imdb-rag-bench-")
+    ollama_port, api_port = free_port(), free_port()
+    env = configure_env(args, workdir, ollama_port)
+    write_dataset(env["FILE_PATH"], args.rows)
+    ollama = start_fake_ollama(ollama_port, args)
+    try:
+        print(f"Ingesting {args.rows} rows")
+        ingest = bench_ingest()
+        server, thread = start_server(api_port)
+        base_url = f"http://127.0.0.1:{api_port}"
+        print(f"Search: {args.search_requests} requests")
+        search = asyncio.run(
+            bench_search(base_url, args.search_requests, args.search_concurrency)
+        )
+        print(f"Chat stream: {args.chat_requests} requests")
+        chat = asyncio.run(
+            bench_chat(base_url, args.chat_requests, args.chat_concurrency)
+        )
+        server.should_exit = True
+        thread.join(timeout=10)
+    finally:
+        ollama.terminate()
+        ollama.wait()
+
+    metrics = {
+        "ingest_rows_per_s": ingest["rows_per_s"],
+        "search_rps": search["rps"],
+        "search_p50_ms": search["p50_ms"],
+        "search_p99_ms": search["p99_ms"],
+        "chat_ttft_p50_ms": chat["ttft_p50_ms"],
+        "chat_ttft_p99_ms": chat["ttft_p99_ms"],
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    result = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "args": vars(args),
+        },
+        "metrics": metrics,
+        "details": {"ingest": ingest, "search": search, "chat": chat},
+    }
+    with open(args.output, "w") as f:
+        json.dump(result, f, indent=2)
+    print(json.dumps(metrics, indent=2))
+    print(f"Saved to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["metrics"]
+        regressions = compare(metrics, baseline, args.tolerance)
+        if regressions:
+            print("Regressions against baseline:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print("No regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
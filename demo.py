@@ -10,9 +10,9 @@ def demo():
     print(Fore.YELLOW + "Loading...\n\n" + Style.RESET_ALL)
 
     user_id = input("User id: ")
+    chat = chat_engine(user_id)
     while True:
 
-        chat = chat_engine(user_id)
         query = input("\nEnter query (s for stop): ")
         if query in ["s", "stop"]:
             break
@@ -1,14 +1,19 @@
 import asyncio
 import logging
+from contextlib import asynccontextmanager
 
 import uvicorn
 from fastapi import FastAPI, Request
 from fastapi.exceptions import HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 
 from src.api.routes import router
 from src.api.schema import ErrorResponse, SubErrorResponse
+from src.config.load_config import load_config
+from src.services.resources import close_resources, init_resources
+from src.utils.metrics import ServerTimingMiddleware, instrument_llama_index
 
 logging.basicConfig(
     level=logging.INFO,
@@ -18,12 +23,33 @@ logging.basicConfig(
     ],
 )
 logger = logging.getLogger(__name__)
+startup_config = load_config().startup_config()
+
+
+def log_startup_failure(task: asyncio.Task):
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(f"Startup failed: {str(task.exception())}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Build the index, LLM and chat store in the background so the process
+    # answers /api/health right away; /api/ready reports when they are loaded.
+    startup = asyncio.create_task(asyncio.to_thread(init_resources))
+    startup.add_done_callback(log_startup_failure)
+    yield
+    if not startup.done():
+        logger.info("Waiting for startup to finish before shutting down")
+    await asyncio.gather(startup, return_exceptions=True)
+    await asyncio.to_thread(close_resources)
+
 
 # Create FastAPI app
 app = FastAPI(
     title="IMDB Movie RAG API",
     description="A streaming RAG API for IMDB movie data",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 # Add CORS middleware
@@ -33,7 +59,10 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],
 )
+app.add_middleware(ServerTimingMiddleware)
+instrument_llama_index()
 
 
 # Global exception handler
@@ -61,5 +90,12 @@ async def global_exception_handler(request: Request, exc: Exception):
 app.include_router(router, prefix="/api")
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
 if __name__ == "__main__":
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
+    uvicorn.run(
+        "main:app", host="0.0.0.0", port=8000, reload=startup_config["reload"]
+    )
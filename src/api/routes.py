@@ -1,59 +1,328 @@
 import json
 import logging
+import re
 import uuid
-from typing import AsyncGenerator
+from typing import AsyncGenerator, List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException
-from fastapi.responses import StreamingResponse
-from llama_index.core.schema import NodeWithScore
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from llama_index.core.base.llms.types import ChatMessage, MessageRole
+from llama_index.core.schema import NodeWithScore, QueryBundle
+from starlette.background import BackgroundTask
 
 from src.api.schema import (
+    BatchSearchRequest,
+    BatchSearchResponse,
+    BatchSearchResult,
     ChatRequest,
     ChatResponse,
     SearchRequest,
     SearchResponse,
     SearchResult,
+    SimilarMovie,
+    SimilarMoviesResponse,
 )
+from src.api.sse import ChatStreamFramer, coalesce, per_token
 from src.config.load_config import load_config
-from src.core.indexing import Indexer
+from src.core.chat_store import chat_mem
+from src.core.filters import build_filters, filters_key
 from src.services.chat_engine import chat_engine
+from src.services.resources import (
+    Resources,
+    get_resources,
+    resources_error,
+    resources_ready,
+)
+from src.services.scheduler import AdmissionRejected, FairLane, Lease
+from src.utils.concurrency import run_blocking
+from src.utils.metrics import (
+    ACTIVE_STREAMS,
+    CHAT_TOKENS,
+    CHAT_TOKENS_PER_SECOND,
+    CHAT_TTFT_SECONDS,
+    current_timings,
+    profiler,
+    record,
+    timed,
+)
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
-# Initialize config and indexer
-config = load_config()
-indexer = Indexer(indexer_config=config.indexer_config()).get_index()
+server_config = load_config().server_config()
+
+
+def require_resources() -> Resources:
+    """
+    Shared index, LLM and chat store, built once per process in the app
+    lifespan. Requests arriving before they are ready get a 503.
+    """
+    if not resources_ready():
+        raise HTTPException(
+            status_code=503,
+            detail="Service is starting",
+            headers={"Retry-After": "5"},
+        )
+    return get_resources()
+
+
+async def admit(lane: FairLane, user_id: str = "anonymous") -> Lease:
+    """
+    Waits for a slot in ``lane``, or fails fast with 429/503 and Retry-After
+    when the lane is overloaded.
+    """
+    try:
+        return await lane.acquire(user_id)
+    except AdmissionRejected as e:
+        raise HTTPException(
+            status_code=e.status_code,
+            detail=e.detail,
+            headers={"Retry-After": str(e.retry_after)},
+        )
+
+
+def to_search_results(nodes) -> list[SearchResult]:
+    search_results = []
+    for node in nodes:
+        if isinstance(node, NodeWithScore):
+            search_result = SearchResult(
+                node_id=node.node_id,
+                movie_id=node.node.ref_doc_id or node.node_id,
+                text=node.text,
+                score=float(node.score),
+                metadata=node.metadata or {},
+            )
+        else:
+            search_result = SearchResult(
+                node_id=node.node_id,
+                movie_id=node.ref_doc_id or node.node_id,
+                text=node.text,
+                score=0.0,
+                metadata=node.metadata or {},
+            )
+        search_results.append(search_result)
+    return search_results
+
+
+def run_table_search(request: SearchRequest, resources: Resources):
+    """
+    Answers filter/sort/top-N queries exactly from the movie table, without
+    embedding the query. Returns None for anything else.
+    """
+    if resources.query_router is None:
+        return None
+    query = resources.query_router.route(request.query, request.filters)
+    if query is None:
+        return None
+    with timed("table_query"):
+        nodes = resources.movie_table.nodes(query, request.limit)
+    if not nodes:
+        return None
+    search_results = to_search_results(nodes)
+    return SearchResponse(
+        results=search_results,
+        query=request.query,
+        total_results=len(search_results),
+        source="table",
+    )
+
+
+async def run_search(request: SearchRequest, resources: Resources) -> SearchResponse:
+    """
+    Runs a vector search, answering from the movie table for table queries
+    and from the semantic cache when a close enough query was served before.
+    """
+    response = run_table_search(request, resources)
+    if response is not None:
+        return response
+
+    query_bundle = QueryBundle(request.query)
+    namespace = (
+        f"search:{request.limit}:{request.mode}:{request.fusion}:{request.alpha}:"
+        f"{filters_key(request.filters)}"
+    )
+    if resources.cache_config["enabled"]:
+        query_bundle.embedding = await resources.indexer.aembed_query(request.query)
+        cached = resources.semantic_cache.lookup(namespace, query_bundle.embedding)
+        if cached is not None:
+            return cached.model_copy(update={"query": request.query})
+
+    retriever = resources.indexer.as_retriever(
+        top_k=request.limit,
+        filters=build_filters(request.filters),
+        mode=request.mode,
+        fusion=request.fusion,
+        alpha=request.alpha,
+    )
+    nodes = await retriever.aretrieve(query_bundle)
+    search_results = to_search_results(nodes)
+    response = SearchResponse(
+        results=search_results,
+        query=request.query,
+        total_results=len(search_results),
+    )
+
+    if resources.cache_config["enabled"]:
+        resources.semantic_cache.store(namespace, query_bundle.embedding, response)
+    return response
+
+
+async def run_batch_search(request: BatchSearchRequest, resources: Resources):
+    """
+    Yields ``BatchSearchResult`` items in completion order.
+    """
+    if len(request.queries) > server_config["batch_max_queries"]:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {server_config['batch_max_queries']} queries per batch",
+        )
+    items = [
+        {
+            "query": query.query,
+            "top_k": query.limit,
+            "filters": build_filters(query.filters),
+            "mode": query.mode,
+            "fusion": query.fusion,
+            "alpha": query.alpha,
+        }
+        for query in request.queries
+    ]
+    async for position, nodes in resources.indexer.abatch_retrieve(
+        items,
+        chunk_size=server_config["batch_chunk_size"],
+        concurrency=server_config["batch_concurrency"],
+    ):
+        search_results = to_search_results(nodes)
+        yield BatchSearchResult(
+            index=position,
+            response=SearchResponse(
+                results=search_results,
+                query=request.queries[position].query,
+                total_results=len(search_results),
+            ),
+        )
+
+
+async def lookup_chat_answer(request: ChatRequest, resources: Resources):
+    """
+    Returns ``(embedding, cached_answer)`` for a chat message. Both are None
+    when chat caching is disabled or the user already has a conversation,
+    since the answer then depends on the history and not only the message.
+    """
+    if not (
+        resources.cache_config["enabled"] and resources.cache_config["chat_enabled"]
+    ):
+        return None, None
+    if await resources.chat_store.aget_messages(request.user_id):
+        return None, None
+    embedding = await resources.indexer.aembed_query(request.message)
+    cached = resources.semantic_cache.lookup(chat_namespace(request), embedding)
+    return embedding, cached
+
+
+async def remember_cached_answer(
+    request: ChatRequest, answer: str, resources: Resources
+):
+    # Keep the conversation history identical to a real generation.
+    memory = chat_mem(
+        request.user_id,
+        resources.chat_store,
+        resources.llm,
+        resources.memory_config,
+        lane=resources.chat_lane,
+    )
+    await memory.aput(ChatMessage(role=MessageRole.USER, content=request.message))
+    await memory.aput(ChatMessage(role=MessageRole.ASSISTANT, content=answer))
+
+
+def chat_namespace(request: ChatRequest) -> str:
+    return f"chat:{request.mode}:{filters_key(request.filters)}"
+
+
+def replay_tokens(answer: str):
+    return re.findall(r"\S+\s*|\s+", answer)
+
+
+def observe_stream(framer: ChatStreamFramer):
+    timings = framer.timings()
+    generation = timings["total"] - timings["ttft"]
+    CHAT_TTFT_SECONDS.observe(timings["ttft"])
+    CHAT_TOKENS.inc(timings["tokens"])
+    record("generation", generation)
+    if generation > 0 and timings["tokens"] > 1:
+        CHAT_TOKENS_PER_SECOND.observe((timings["tokens"] - 1) / generation)
 
 
 @router.post("/chat/stream")
-async def stream_chat(request: ChatRequest) -> StreamingResponse:
+async def stream_chat(
+    request: ChatRequest, resources: Resources = Depends(require_resources)
+) -> StreamingResponse:
     """
     Stream chat responses using the RAG system
     """
+    lease = None
     try:
-        # Get chat engine for the user
-        engine = chat_engine(request.user_id)
+        framer = ChatStreamFramer(request.user_id)
+        embedding, cached_answer = await lookup_chat_answer(request, resources)
+        engine = None
+        if cached_answer is None:
+            # Held until the stream ends, cached answers need no LLM slot
+            lease = await admit(resources.chat_lane, request.user_id)
+            # Get chat engine for the user
+            with timed("chat_engine"):
+                engine = await run_blocking(
+                    chat_engine,
+                    request.user_id,
+                    resources=resources,
+                    filters=request.filters,
+                    mode=request.mode,
+                )
+
+        async def token_stream():
+            if cached_answer is not None:
+                await remember_cached_answer(request, cached_answer, resources)
+                for token in replay_tokens(cached_answer):
+                    yield token
+                return
+
+            # Stream the response from the chat engine
+            with timed("chat_setup"):
+                response = await engine.astream_chat(request.message)
+            tokens = []
+            async for token in response.async_response_gen():
+                tokens.append(token)
+                yield token
+            if embedding is not None:
+                resources.semantic_cache.store(
+                    chat_namespace(request), embedding, "".join(tokens)
+                )
+
+        stream_mode = request.stream_mode or server_config["stream_mode"]
+        if stream_mode == "coalesce":
+            chunks = coalesce(
+                token_stream(),
+                window_ms=server_config["stream_coalesce_ms"],
+                max_bytes=server_config["stream_coalesce_bytes"],
+                framer=framer,
+            )
+        else:
+            chunks = per_token(token_stream(), framer=framer)
 
         # Generate streaming response
         async def generate_response() -> AsyncGenerator[str, None]:
+            ACTIVE_STREAMS.inc()
             try:
-                # Stream the response from the chat engine
-                response = engine.stream_chat(request.message)
-
-                for token in response.response_gen:
-                    # Create response object
-                    chat_response = ChatResponse(
-                        content=token,
-                        user_id=request.user_id,
-                        message_id=str(uuid.uuid4()),
-                    )
-
+                async for chunk in chunks:
                     # Send as Server-Sent Events
-                    yield f"data: {json.dumps(chat_response.model_dump())}\n\n"
+                    yield framer.frame(chunk)
 
+                observe_stream(framer)
+                if server_config["stream_timing_frame"]:
+                    timings = {**current_timings(), **framer.timings()}
+                    yield f"event: timing\ndata: {json.dumps(timings)}\n\n"
                 # Send completion signal
                 yield "data: [DONE]\n\n"
+                framer.log_timings()
 
             except Exception as e:
                 logger.error(f"Error in chat streaming: {str(e)}")
@@ -62,6 +331,10 @@ async def stream_chat(request: ChatRequest) -> StreamingResponse:
                     "details": str(e),
                 }
                 yield f"data: {json.dumps(error_response)}\n\n"
+            finally:
+                ACTIVE_STREAMS.dec()
+                if lease is not None:
+                    lease.release()
 
         return StreamingResponse(
             generate_response(),
@@ -71,9 +344,17 @@ async def stream_chat(request: ChatRequest) -> StreamingResponse:
                 "Connection": "keep-alive",
                 "Content-Type": "text/event-stream",
             },
+            # In case the client leaves before the stream starts
+            background=BackgroundTask(lease.release) if lease else None,
         )
 
+    except HTTPException:
+        if lease is not None:
+            lease.release()
+        raise
     except Exception as e:
+        if lease is not None:
+            lease.release()
         logger.error(f"Error setting up chat stream: {str(e)}")
         raise HTTPException(
             status_code=500, detail=f"Error setting up chat stream: {str(e)}"
@@ -81,43 +362,19 @@ async def stream_chat(request: ChatRequest) -> StreamingResponse:
 
 
 @router.post("/search/stream")
-async def stream_search(request: SearchRequest) -> StreamingResponse:
+async def stream_search(
+    request: SearchRequest, resources: Resources = Depends(require_resources)
+) -> StreamingResponse:
     """
     Stream search results from the vector database
     """
+    lease = await admit(resources.search_lane)
     try:
 
         async def generate_search_results() -> AsyncGenerator[str, None]:
             try:
                 # Perform vector search
-                retriever = indexer.as_retriever(similarity_top_k=request.limit)
-                nodes = retriever.retrieve(request.query)
-
-                # Convert nodes to search results
-                search_results = []
-                for node in nodes:
-                    if isinstance(node, NodeWithScore):
-                        search_result = SearchResult(
-                            node_id=node.node_id,
-                            text=node.text,
-                            score=float(node.score),
-                            metadata=node.metadata or {},
-                        )
-                    else:
-                        search_result = SearchResult(
-                            node_id=node.node_id,
-                            text=node.text,
-                            score=0.0,
-                            metadata=node.metadata or {},
-                        )
-                    search_results.append(search_result)
-
-                # Create response
-                response = SearchResponse(
-                    results=search_results,
-                    query=request.query,
-                    total_results=len(search_results),
-                )
+                response = await run_search(request, resources)
 
                 # Stream the response
                 yield f"data: {json.dumps(response.model_dump())}\n\n"
@@ -130,6 +387,8 @@ async def stream_search(request: SearchRequest) -> StreamingResponse:
                     "details": str(e),
                 }
                 yield f"data: {json.dumps(error_response)}\n\n"
+            finally:
+                lease.release()
 
         return StreamingResponse(
             generate_search_results(),
@@ -139,9 +398,11 @@ async def stream_search(request: SearchRequest) -> StreamingResponse:
                 "Connection": "keep-alive",
                 "Content-Type": "text/event-stream",
             },
+            background=BackgroundTask(lease.release),
         )
 
     except Exception as e:
+        lease.release()
         logger.error(f"Error setting up search stream: {str(e)}")
         raise HTTPException(
             status_code=500, detail=f"Error setting up search stream: {str(e)}"
@@ -149,66 +410,218 @@ async def stream_search(request: SearchRequest) -> StreamingResponse:
 
 
 @router.post("/chat")
-async def chat(request: ChatRequest) -> ChatResponse:
+async def chat(
+    request: ChatRequest, resources: Resources = Depends(require_resources)
+) -> ChatResponse:
     """
     Non-streaming chat endpoint for simple requests
     """
     try:
-        engine = chat_engine(request.user_id)
-        response = engine.chat(request.message)
+        embedding, answer = await lookup_chat_answer(request, resources)
+        if answer is not None:
+            await remember_cached_answer(request, answer, resources)
+        else:
+            lease = await admit(resources.chat_lane, request.user_id)
+            try:
+                engine = await run_blocking(
+                    chat_engine,
+                    request.user_id,
+                    resources=resources,
+                    filters=request.filters,
+                    mode=request.mode,
+                )
+                response = await engine.achat(request.message)
+            finally:
+                lease.release()
+            answer = response.response
+            if embedding is not None:
+                resources.semantic_cache.store(
+                    chat_namespace(request), embedding, answer
+                )
 
         return ChatResponse(
-            content=response.response,
+            content=answer,
             user_id=request.user_id,
             message_id=str(uuid.uuid4()),
         )
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error in chat: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error in chat: {str(e)}")
 
 
 @router.post("/search")
-async def search(request: SearchRequest) -> SearchResponse:
+async def search(
+    request: SearchRequest, resources: Resources = Depends(require_resources)
+) -> SearchResponse:
     """
     Non-streaming search endpoint
     """
+    lease = await admit(resources.search_lane)
     try:
-        retriever = indexer.as_retriever(similarity_top_k=request.limit)
-        nodes = retriever.retrieve(request.query)
-
-        search_results = []
-        for node in nodes:
-            if isinstance(node, NodeWithScore):
-                search_result = SearchResult(
-                    node_id=node.node_id,
-                    text=node.text,
-                    score=float(node.score),
-                    metadata=node.metadata or {},
-                )
-            else:
-                search_result = SearchResult(
-                    node_id=node.node_id,
-                    text=node.text,
-                    score=0.0,
-                    metadata=node.metadata or {},
-                )
-            search_results.append(search_result)
-
-        return SearchResponse(
-            results=search_results,
-            query=request.query,
-            total_results=len(search_results),
-        )
+        return await run_search(request, resources)
 
     except Exception as e:
         logger.error(f"Error in search: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error in search: {str(e)}")
+    finally:
+        lease.release()
+
+
+@router.post("/search/batch/stream")
+async def stream_batch_search(
+    request: BatchSearchRequest, resources: Resources = Depends(require_resources)
+) -> StreamingResponse:
+    """
+    Stream per-query results of a batch search as each one completes
+    """
+    lease = await admit(resources.search_lane)
+    batch = run_batch_search(request, resources)
+    try:
+        # Validate the batch and surface setup errors before the stream starts
+        first = await anext(batch, None)
+
+    except HTTPException:
+        lease.release()
+        raise
+    except Exception as e:
+        lease.release()
+        logger.error(f"Error setting up batch search stream: {str(e)}")
+        raise HTTPException(
+            status_code=500, detail=f"Error setting up batch search stream: {str(e)}"
+        )
+
+    async def generate_batch_results() -> AsyncGenerator[str, None]:
+        try:
+            if first is not None:
+                yield f"data: {json.dumps(first.model_dump())}\n\n"
+            async for result in batch:
+                yield f"data: {json.dumps(result.model_dump())}\n\n"
+            yield "data: [DONE]\n\n"
+
+        except Exception as e:
+            logger.error(f"Error in batch search streaming: {str(e)}")
+            error_response = {
+                "error": "An error occurred while searching",
+                "details": str(e),
+            }
+            yield f"data: {json.dumps(error_response)}\n\n"
+        finally:
+            lease.release()
+
+    return StreamingResponse(
+        generate_batch_results(),
+        media_type="text/plain",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "Content-Type": "text/event-stream",
+        },
+        background=BackgroundTask(lease.release),
+    )
+
+
+@router.post("/search/batch")
+async def batch_search(
+    request: BatchSearchRequest, resources: Resources = Depends(require_resources)
+) -> BatchSearchResponse:
+    """
+    Batch search endpoint, results are returned in request order
+    """
+    lease = await admit(resources.search_lane)
+    try:
+        results = [None] * len(request.queries)
+        async for result in run_batch_search(request, resources):
+            results[result.index] = result.response
+        return BatchSearchResponse(results=results)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error in batch search: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error in batch search: {str(e)}")
+    finally:
+        lease.release()
+
+
+@router.get("/movies/{movie_id}/similar")
+async def similar_movies(
+    movie_id: str,
+    limit: int = Query(10, ge=1, le=100),
+    genres: Optional[List[str]] = Query(None),
+    year_min: Optional[int] = None,
+    year_max: Optional[int] = None,
+    resources: Resources = Depends(require_resources),
+) -> SimilarMoviesResponse:
+    """
+    Movies most similar to ``movie_id``, from the precomputed neighbor table
+    """
+    table = resources.neighbor_table
+    if table is None:
+        raise HTTPException(status_code=404, detail="Similar movies are disabled")
+    with timed("similar_lookup"):
+        results = table.similar(
+            movie_id,
+            limit=limit,
+            genres=genres,
+            year_min=year_min,
+            year_max=year_max,
+        )
+    if results is None:
+        raise HTTPException(status_code=404, detail=f"Unknown movie: {movie_id}")
+    return SimilarMoviesResponse(
+        movie_id=movie_id,
+        title=table.title(movie_id) or "",
+        results=[SimilarMovie(**result) for result in results],
+        total_results=len(results),
+    )
+
+
+@router.post("/debug/profiler/start")
+async def start_profiler(interval_ms: float = 10.0):
+    """
+    Start the sampling profiler, if enabled for this deployment
+    """
+    if not server_config["profiler_enabled"]:
+        raise HTTPException(status_code=404, detail="Profiler is disabled")
+    profiler.start(interval=interval_ms / 1000)
+    return {"running": True, "interval_ms": interval_ms}
+
+
+@router.post("/debug/profiler/stop")
+async def stop_profiler() -> PlainTextResponse:
+    """
+    Stop the sampling profiler and return folded stacks for flame graphs
+    """
+    if not server_config["profiler_enabled"]:
+        raise HTTPException(status_code=404, detail="Profiler is disabled")
+    return PlainTextResponse(profiler.stop())
 
 
 @router.get("/health")
 async def health_check():
     """
-    Health check endpoint
+    Health check endpoint, answers as soon as the process is up
     """
     return {"status": "healthy", "service": "imdb-movie-rag"}
+
+
+@router.get("/ready")
+async def readiness_check():
+    """
+    Readiness endpoint, 200 once the index, LLM and chat store are loaded
+    """
+    if resources_ready():
+        return {"status": "ready", "service": "imdb-movie-rag"}
+    error = resources_error()
+    return JSONResponse(
+        status_code=503,
+        content={
+            "status": "failed" if error else "starting",
+            "service": "imdb-movie-rag",
+            "details": str(error) if error else None,
+        },
+        headers={"Retry-After": "5"},
+    )
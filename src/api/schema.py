@@ -1,4 +1,4 @@
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Literal, Optional
 
 from pydantic import BaseModel
 
@@ -14,9 +14,25 @@ class ErrorResponse(BaseModel):
     detail: dict
 
 
+class MovieFilters(BaseModel):
+    genres: Optional[List[str]] = None
+    directors: Optional[List[str]] = None
+    year_min: Optional[int] = None
+    year_max: Optional[int] = None
+    rating_min: Optional[float] = None
+    rating_max: Optional[float] = None
+    runtime_min: Optional[int] = None
+    runtime_max: Optional[int] = None
+    gross_min: Optional[float] = None
+    gross_max: Optional[float] = None
+
+
 class ChatRequest(BaseModel):
     message: str
     user_id: str
+    filters: Optional[MovieFilters] = None
+    mode: Optional[Literal["dense", "sparse", "hybrid"]] = None
+    stream_mode: Optional[Literal["token", "coalesce"]] = None
 
 
 class ChatResponse(BaseModel):
@@ -28,10 +44,19 @@ class ChatResponse(BaseModel):
 class SearchRequest(BaseModel):
     query: str
     limit: int = 5
+    filters: Optional[MovieFilters] = None
+    mode: Optional[Literal["dense", "sparse", "hybrid"]] = None
+    fusion: Literal["rrf", "weighted"] = "rrf"
+    alpha: float = 0.5
+
+
+class BatchSearchRequest(BaseModel):
+    queries: List[SearchRequest]
 
 
 class SearchResult(BaseModel):
     node_id: str
+    movie_id: Optional[str] = None
     text: str
     score: float
     metadata: Dict[str, Any]
@@ -41,3 +66,28 @@ class SearchResponse(BaseModel):
     results: List[SearchResult]
     query: str
     total_results: int
+    source: Literal["vector", "table"] = "vector"
+
+
+class SimilarMovie(BaseModel):
+    movie_id: str
+    title: str
+    year: Optional[int] = None
+    genres: List[str]
+    score: float
+
+
+class SimilarMoviesResponse(BaseModel):
+    movie_id: str
+    title: str
+    results: List[SimilarMovie]
+    total_results: int
+
+
+class BatchSearchResult(BaseModel):
+    index: int
+    response: SearchResponse
+
+
+class BatchSearchResponse(BaseModel):
+    results: List[SearchResponse]
@@ -0,0 +1,124 @@
+import asyncio
+import json
+import logging
+import time
+import uuid
+from typing import AsyncIterator
+
+logger = logging.getLogger(__name__)
+
+
+class ChatStreamFramer:
+    """
+    Encodes ``ChatResponse`` SSE frames for one streamed answer.
+
+    Every frame of the answer shares one ``message_id``, and the constant
+    tail of the frame is encoded once, so a frame costs a single
+    ``json.dumps`` of the content. The output is byte-identical to
+    ``json.dumps(ChatResponse(...).model_dump())``.
+    """
+
+    def __init__(self, user_id: str, message_id: str = None):
+        self.user_id = user_id
+        self.message_id = message_id or str(uuid.uuid4())
+        self._suffix = (
+            f', "user_id": {json.dumps(user_id)}, '
+            f'"message_id": {json.dumps(self.message_id)}}}\n\n'
+        )
+        self.started = time.perf_counter()
+        self.first_frame_at = None
+        self.frames = 0
+        self.tokens = 0
+
+    def frame(self, content: str) -> str:
+        if self.first_frame_at is None:
+            self.first_frame_at = time.perf_counter()
+        self.frames += 1
+        return 'data: {"content": ' + json.dumps(content) + self._suffix
+
+    def timings(self) -> dict:
+        now = time.perf_counter()
+        first = self.first_frame_at or now
+        return {
+            "ttft": first - self.started,
+            "total": now - self.started,
+            "frames": self.frames,
+            "tokens": self.tokens,
+        }
+
+    def log_timings(self):
+        timings = self.timings()
+        logger.info(
+            "chat stream %s: ttft=%.3fs total=%.3fs frames=%d tokens=%d",
+            self.message_id,
+            timings["ttft"],
+            timings["total"],
+            timings["frames"],
+            timings["tokens"],
+        )
+
+
+async def coalesce(
+    tokens: AsyncIterator[str],
+    window_ms: float = 50,
+    max_bytes: int = 256,
+    framer: ChatStreamFramer = None,
+) -> AsyncIterator[str]:
+    """
+    Groups tokens into chunks so one SSE frame carries several tokens.
+
+    The first token is emitted immediately to keep time-to-first-token low.
+    After that, a chunk is emitted when ``window_ms`` has passed since its
+    first token or when it reaches ``max_bytes``, whichever comes first. The
+    window is enforced with a timer, so a stalled generation still flushes
+    what it has.
+    """
+    loop = asyncio.get_running_loop()
+    window = window_ms / 1000
+    iterator = tokens.__aiter__()
+    buffer, size, deadline = [], 0, None
+    first = True
+    pending = None
+    try:
+        while True:
+            if pending is None:
+                pending = asyncio.ensure_future(anext(iterator))
+            timeout = max(0.0, deadline - loop.time()) if buffer else None
+            done, _ = await asyncio.wait({pending}, timeout=timeout)
+            if not done:
+                yield "".join(buffer)
+                buffer, size = [], 0
+                continue
+
+            try:
+                token = pending.result()
+            except StopAsyncIteration:
+                pending = None
+                break
+            pending = None
+            if framer is not None:
+                framer.tokens += 1
+
+            if first:
+                first = False
+                yield token
+                continue
+            if not buffer:
+                deadline = loop.time() + window
+            buffer.append(token)
+            size += len(token.encode("utf-8"))
+            if size >= max_bytes or loop.time() >= deadline:
+                yield "".join(buffer)
+                buffer, size = [], 0
+        if buffer:
+            yield "".join(buffer)
+    finally:
+        if pending is not None:
+            pending.cancel()
+
+
+async def per_token(tokens: AsyncIterator[str], framer: ChatStreamFramer = None):
+    async for token in tokens:
+        if framer is not None:
+            framer.tokens += 1
+        yield token
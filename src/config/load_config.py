@@ -17,13 +17,131 @@ class AppConfig:
         self.postgres_db = os.getenv("POSTGRES_DB")
         self.postgres_user = os.getenv("POSTGRES_USER")
         self.postgres_pass = os.getenv("POSTGRES_PASSWORD")
+        self.postgres_pool_size = int(os.getenv("POSTGRES_POOL_SIZE", "5"))
+        self.postgres_max_overflow = int(os.getenv("POSTGRES_MAX_OVERFLOW", "10"))
+        self.chat_store = os.getenv("CHAT_STORE", "postgres")
+        self.chat_cache_size = int(os.getenv("CHAT_CACHE_SIZE", "1024"))
+        self.chat_flush_interval = float(os.getenv("CHAT_FLUSH_INTERVAL", "0.5"))
+        self.memory_mode = os.getenv("MEMORY_MODE", "buffer")
+        self.memory_token_limit = int(os.getenv("MEMORY_TOKEN_LIMIT", "5000"))
+        self.memory_recent_messages = int(os.getenv("MEMORY_RECENT_MESSAGES", "8"))
+        self.summary_token_limit = int(os.getenv("SUMMARY_TOKEN_LIMIT", "512"))
+        self.embed_cache_size = int(os.getenv("EMBED_CACHE_SIZE", "4096"))
+        self.embed_cache_path = os.getenv("EMBED_CACHE_PATH")
         self.vector_db_url = os.getenv("QDRANT_URL", "http://localhost:6333")
+        self.sync_on_start = os.getenv("SYNC_ON_START", "true").lower() == "true"
+        self.embed_batch_size = int(os.getenv("EMBED_BATCH_SIZE", "32"))
+        self.embed_concurrency = int(os.getenv("EMBED_CONCURRENCY", "4"))
+        self.upsert_batch_size = int(os.getenv("UPSERT_BATCH_SIZE", "256"))
+        self.ingest_queue_size = int(os.getenv("INGEST_QUEUE_SIZE", "8"))
+        self.qdrant_prefer_grpc = (
+            os.getenv("QDRANT_PREFER_GRPC", "false").lower() == "true"
+        )
+        self.qdrant_grpc_port = int(os.getenv("QDRANT_GRPC_PORT", "6334"))
+        self.qdrant_quantization = os.getenv("QDRANT_QUANTIZATION", "none")
+        self.qdrant_pq_compression = os.getenv("QDRANT_PQ_COMPRESSION", "x16")
+        self.qdrant_rescore = os.getenv("QDRANT_RESCORE", "true").lower() == "true"
+        self.qdrant_oversampling = float(os.getenv("QDRANT_OVERSAMPLING", "2.0"))
+        self.qdrant_hnsw_m = int(os.getenv("QDRANT_HNSW_M", "16"))
+        self.qdrant_hnsw_ef_construct = int(
+            os.getenv("QDRANT_HNSW_EF_CONSTRUCT", "100")
+        )
+        self.qdrant_hnsw_ef = os.getenv("QDRANT_HNSW_EF")
+        self.qdrant_on_disk = os.getenv("QDRANT_ON_DISK", "false").lower() == "true"
+        self.vector_store = os.getenv("VECTOR_STORE", "qdrant")
+        self.numpy_store_path = os.getenv("NUMPY_STORE_PATH", "numpy_store")
+        self.numpy_store_dtype = os.getenv("NUMPY_STORE_DTYPE", "float32")
+        self.numpy_store_read_only = (
+            os.getenv("NUMPY_STORE_READ_ONLY", "false").lower() == "true"
+        )
+        self.hybrid_search = os.getenv("HYBRID_SEARCH", "true").lower() == "true"
+        self.search_mode = os.getenv("SEARCH_MODE", "hybrid")
+        self.bm25_k1 = float(os.getenv("BM25_K1", "1.2"))
+        self.bm25_b = float(os.getenv("BM25_B", "0.75"))
+        self.bm25_avg_doc_len = float(os.getenv("BM25_AVG_DOC_LEN", "120"))
+        self.single_flight = os.getenv("SINGLE_FLIGHT", "true").lower() == "true"
+        self.ingest_chunk_rows = int(os.getenv("INGEST_CHUNK_ROWS", "1000"))
+        self.doc_template = os.getenv("DOC_TEMPLATE")
+        self.ingest_checkpoint = os.getenv("INGEST_CHECKPOINT")
+        self.warm_up = os.getenv("WARM_UP", "true").lower() == "true"
+        self.llm_keep_alive = os.getenv("LLM_KEEP_ALIVE", "30m")
+        self.reload = os.getenv("UVICORN_RELOAD", "false").lower() == "true"
+        self.llm_concurrency = int(os.getenv("LLM_CONCURRENCY", "4"))
+        self.llm_queue_size = int(os.getenv("LLM_QUEUE_SIZE", "32"))
+        self.llm_user_queue_size = int(os.getenv("LLM_USER_QUEUE_SIZE", "2"))
+        self.llm_max_wait = float(os.getenv("LLM_MAX_WAIT", "30"))
+        self.llm_request_timeout = float(os.getenv("LLM_REQUEST_TIMEOUT", "600"))
+        self.search_concurrency = int(os.getenv("SEARCH_CONCURRENCY", "32"))
+        self.search_queue_size = int(os.getenv("SEARCH_QUEUE_SIZE", "256"))
+        self.search_max_wait = float(os.getenv("SEARCH_MAX_WAIT", "5"))
+        self.blocking_threads = int(os.getenv("BLOCKING_THREADS", "16"))
+        self.stream_mode = os.getenv("STREAM_MODE", "coalesce")
+        self.stream_coalesce_ms = float(os.getenv("STREAM_COALESCE_MS", "50"))
+        self.stream_coalesce_bytes = int(os.getenv("STREAM_COALESCE_BYTES", "256"))
+        self.stream_timing_frame = (
+            os.getenv("STREAM_TIMING_FRAME", "true").lower() == "true"
+        )
+        self.profiler_enabled = os.getenv("PROFILER_ENABLED", "false").lower() == "true"
+        self.batch_max_queries = int(os.getenv("SEARCH_BATCH_MAX_QUERIES", "1000"))
+        self.batch_chunk_size = int(os.getenv("SEARCH_BATCH_CHUNK_SIZE", "16"))
+        self.batch_concurrency = int(os.getenv("SEARCH_BATCH_CONCURRENCY", "4"))
+        self.table_queries = os.getenv("TABLE_QUERIES", "true").lower() == "true"
+        self.table_max_rows = int(os.getenv("TABLE_MAX_ROWS", "50"))
+        self.similar_movies = os.getenv("SIMILAR_MOVIES", "true").lower() == "true"
+        self.neighbors_path = os.getenv("NEIGHBORS_PATH", "neighbors")
+        self.neighbors_k = int(os.getenv("NEIGHBORS_K", "20"))
+        self.neighbors_block_size = int(os.getenv("NEIGHBORS_BLOCK_SIZE", "1024"))
+        self.context_packing = os.getenv("CONTEXT_PACKING", "true").lower() == "true"
+        self.context_token_budget = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1500"))
+        self.semantic_cache = os.getenv("SEMANTIC_CACHE", "true").lower() == "true"
+        self.semantic_cache_chat = (
+            os.getenv("SEMANTIC_CACHE_CHAT", "false").lower() == "true"
+        )
+        self.semantic_cache_threshold = float(
+            os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95")
+        )
+        self.semantic_cache_size = int(os.getenv("SEMANTIC_CACHE_SIZE", "1024"))
+        self.semantic_cache_ttl = int(os.getenv("SEMANTIC_CACHE_TTL", "3600"))
 
     def indexer_config(self):
         config = {
             "vector_db": self.vector_db_url,
+            "vector_store": self.vector_store,
+            "qdrant_profile": self.qdrant_profile(),
+            "numpy_store_path": self.numpy_store_path,
+            "numpy_store_dtype": self.numpy_store_dtype,
+            "numpy_store_read_only": self.numpy_store_read_only,
             "collection_name": self.collection,
             "file_path": self.file_path,
+            "sync_on_start": self.sync_on_start,
+            "embed_batch_size": self.embed_batch_size,
+            "embed_concurrency": self.embed_concurrency,
+            "upsert_batch_size": self.upsert_batch_size,
+            "ingest_queue_size": self.ingest_queue_size,
+            "chunk_rows": self.ingest_chunk_rows,
+            "doc_template": self.doc_template,
+            "single_flight": self.single_flight,
+            "checkpoint_path": self.ingest_checkpoint,
+            "hybrid": self.hybrid_search,
+            "search_mode": self.search_mode,
+            "bm25_k1": self.bm25_k1,
+            "bm25_b": self.bm25_b,
+            "bm25_avg_doc_len": self.bm25_avg_doc_len,
+        }
+        return config
+
+    def qdrant_profile(self):
+        config = {
+            "prefer_grpc": self.qdrant_prefer_grpc,
+            "grpc_port": self.qdrant_grpc_port,
+            "quantization": self.qdrant_quantization,
+            "pq_compression": self.qdrant_pq_compression,
+            "rescore": self.qdrant_rescore,
+            "oversampling": self.qdrant_oversampling,
+            "hnsw_m": self.qdrant_hnsw_m,
+            "hnsw_ef_construct": self.qdrant_hnsw_ef_construct,
+            "hnsw_ef": int(self.qdrant_hnsw_ef) if self.qdrant_hnsw_ef else None,
+            "on_disk": self.qdrant_on_disk,
         }
         return config
 
@@ -31,6 +149,9 @@ class AppConfig:
         config = {
             "embedded_model": self.embedded_model,
             "ollama_api": self.ollama_url,
+            "embed_batch_size": self.embed_batch_size,
+            "cache_size": self.embed_cache_size,
+            "cache_path": self.embed_cache_path,
         }
         return config
 
@@ -41,6 +162,20 @@ class AppConfig:
             "user": self.postgres_user,
             "pass": self.postgres_pass,
             "db": self.postgres_db,
+            "pool_size": self.postgres_pool_size,
+            "max_overflow": self.postgres_max_overflow,
+        }
+        return config
+
+    def memory_config(self):
+        config = {
+            "backend": self.chat_store,
+            "cache_size": self.chat_cache_size,
+            "flush_interval": self.chat_flush_interval,
+            "mode": self.memory_mode,
+            "token_limit": self.memory_token_limit,
+            "recent_messages": self.memory_recent_messages,
+            "summary_token_limit": self.summary_token_limit,
         }
         return config
 
@@ -48,6 +183,74 @@ class AppConfig:
         config = {
             "llm_model": self.llm_model,
             "ollama_api": self.ollama_url,
+            "request_timeout": self.llm_request_timeout,
+        }
+        return config
+
+    def server_config(self):
+        config = {
+            "blocking_threads": self.blocking_threads,
+            "stream_mode": self.stream_mode,
+            "stream_coalesce_ms": self.stream_coalesce_ms,
+            "stream_coalesce_bytes": self.stream_coalesce_bytes,
+            "stream_timing_frame": self.stream_timing_frame,
+            "profiler_enabled": self.profiler_enabled,
+            "batch_max_queries": self.batch_max_queries,
+            "batch_chunk_size": self.batch_chunk_size,
+            "batch_concurrency": self.batch_concurrency,
+        }
+        return config
+
+    def cache_config(self):
+        config = {
+            "enabled": self.semantic_cache,
+            "chat_enabled": self.semantic_cache_chat,
+            "threshold": self.semantic_cache_threshold,
+            "max_entries": self.semantic_cache_size,
+            "ttl": self.semantic_cache_ttl,
+        }
+        return config
+
+    def scheduler_config(self):
+        config = {
+            "llm_concurrency": self.llm_concurrency,
+            "llm_queue_size": self.llm_queue_size,
+            "llm_user_queue_size": self.llm_user_queue_size,
+            "llm_max_wait": self.llm_max_wait,
+            "search_concurrency": self.search_concurrency,
+            "search_queue_size": self.search_queue_size,
+            "search_max_wait": self.search_max_wait,
+        }
+        return config
+
+    def startup_config(self):
+        config = {
+            "warm_up": self.warm_up,
+            "keep_alive": self.llm_keep_alive,
+            "reload": self.reload,
+        }
+        return config
+
+    def table_config(self):
+        config = {
+            "enabled": self.table_queries,
+            "max_rows": self.table_max_rows,
+        }
+        return config
+
+    def neighbors_config(self):
+        config = {
+            "enabled": self.similar_movies,
+            "path": os.path.join(self.neighbors_path, f"{self.collection}.npz"),
+            "k": self.neighbors_k,
+            "block_size": self.neighbors_block_size,
+        }
+        return config
+
+    def context_config(self):
+        config = {
+            "enabled": self.context_packing,
+            "token_budget": self.context_token_budget,
         }
         return config
 
@@ -1,14 +1,259 @@
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, List, Optional
+
+from llama_index.core.base.llms.types import ChatMessage
 from llama_index.core.memory import ChatMemoryBuffer
-from llama_index.storage.chat_store.postgres import PostgresChatStore
+from llama_index.core.storage.chat_store.base import BaseChatStore
+from pydantic import PrivateAttr
+from sqlalchemy import (
+    JSON,
+    URL,
+    Column,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    create_engine,
+    delete,
+    select,
+)
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy_utils import create_database, database_exists
 
 from src.config.load_config import load_config
+from src.core.summary_memory import RollingSummaryMemory
+from src.utils.metrics import timed
 
 config = load_config().postgres_config()
-from sqlalchemy import URL, create_engine
-from sqlalchemy_utils import create_database, database_exists
+logger = logging.getLogger(__name__)
+
+# Same layout as the llama-index PostgresChatStore table, so existing
+# conversations keep working.
+metadata = MetaData()
+chat_table = Table(
+    "data_chatstore",
+    metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("key", String, nullable=False, unique=True),
+    Column("value", JSON),
+)
+
+
+class WriteBehindChatStore(BaseChatStore):
+    """
+    Chat store with an in-process LRU of hot conversations in front of
+    Postgres.
+
+    Reads of a hot conversation and all writes are served from memory, so
+    they never touch the database on the request path. Changed conversations
+    are written back in batched upserts by a background thread every
+    ``flush_interval`` seconds, and ``close()`` flushes what is left. Only
+    clean conversations are evicted. Without an engine the store is purely
+    in memory.
+
+    The cache is per process: with several workers, route a user to the same
+    worker or expect history written elsewhere to appear after a flush.
+    """
+
+    max_conversations: int = 1024
+    flush_interval: float = 0.5
+
+    _engine: Any = PrivateAttr(default=None)
+    _cache: OrderedDict = PrivateAttr(default_factory=OrderedDict)
+    _dirty: set = PrivateAttr(default_factory=set)
+    _lock: Any = PrivateAttr(default_factory=threading.RLock)
+    _stop: Any = PrivateAttr(default_factory=threading.Event)
+    _flusher: Any = PrivateAttr(default=None)
+
+    def __init__(self, engine=None, **kwargs: Any):
+        super().__init__(**kwargs)
+        self._engine = engine
+        if engine is not None:
+            metadata.create_all(engine)
+            self._flusher = threading.Thread(target=self._flush_loop, daemon=True)
+            self._flusher.start()
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "WriteBehindChatStore"
+
+    # Cache
+
+    def _load(self, key: str) -> List[ChatMessage]:
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+        messages = []
+        if self._engine is not None:
+            with timed("memory_load"), self._engine.connect() as conn:
+                row = conn.execute(
+                    select(chat_table.c.value).where(chat_table.c.key == key)
+                ).first()
+            if row is not None and row[0]:
+                messages = [ChatMessage.model_validate(m) for m in row[0]]
+        with self._lock:
+            # A concurrent writer may have filled the entry meanwhile
+            messages = self._cache.setdefault(key, messages)
+            self._evict()
+        return messages
+
+    def _store(self, key: str, messages: Optional[List[ChatMessage]]):
+        with self._lock:
+            self._cache[key] = messages if messages is not None else []
+            self._cache.move_to_end(key)
+            if self._engine is not None:
+                self._dirty.add(key)
+            self._evict()
+
+    def _evict(self):
+        if self._engine is None:
+            return
+        for key in list(self._cache):
+            if len(self._cache) <= self.max_conversations:
+                break
+            if key not in self._dirty:
+                del self._cache[key]
+
+    # Write-behind
+
+    def _flush_loop(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Chat store flush failed: {str(e)}")
+
+    def flush(self):
+        """
+        Writes every changed conversation to Postgres in one transaction.
+        """
+        if self._engine is None:
+            return
+        with self._lock:
+            batch = {key: list(self._cache.get(key, [])) for key in self._dirty}
+            self._dirty.clear()
+        if not batch:
+            return
+        rows = [
+            {"key": key, "value": [m.model_dump(mode="json") for m in messages]}
+            for key, messages in batch.items()
+            if messages
+        ]
+        empty = [key for key, messages in batch.items() if not messages]
+        try:
+            with self._engine.begin() as conn:
+                if rows:
+                    stmt = insert(chat_table).values(rows)
+                    stmt = stmt.on_conflict_do_update(
+                        index_elements=[chat_table.c.key],
+                        set_={"value": stmt.excluded.value},
+                    )
+                    conn.execute(stmt)
+                if empty:
+                    conn.execute(delete(chat_table).where(chat_table.c.key.in_(empty)))
+        except Exception:
+            with self._lock:
+                self._dirty.update(batch)
+            raise
+
+    def close(self):
+        self._stop.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        self.flush()
+        if self._engine is not None:
+            self._engine.dispose()
+
+    # BaseChatStore
 
+    def set_messages(self, key: str, messages: List[ChatMessage]) -> None:
+        self._store(key, list(messages))
+
+    def get_messages(self, key: str) -> List[ChatMessage]:
+        return list(self._load(key))
+
+    def update_messages(self, key: str, fn):
+        """
+        Applies ``fn`` to a copy of the conversation and stores the result.
+        The conversation is loaded first without holding the lock, so a cold
+        load never blocks other conversations.
+        """
+        while True:
+            self._load(key)
+            with self._lock:
+                if key not in self._cache:
+                    continue  # evicted in between, load again
+                messages = list(self._cache[key])
+                result = fn(messages)
+                self._store(key, messages)
+                return result
+
+    def add_message(self, key: str, message: ChatMessage) -> None:
+        self.update_messages(key, lambda messages: messages.append(message))
+
+    def delete_messages(self, key: str) -> Optional[List[ChatMessage]]:
+        def clear(messages):
+            removed = list(messages)
+            messages.clear()
+            return removed or None
+
+        return self.update_messages(key, clear)
+
+    def delete_message(self, key: str, idx: int) -> Optional[ChatMessage]:
+        return self.update_messages(
+            key, lambda messages: messages.pop(idx) if idx < len(messages) else None
+        )
+
+    def delete_last_message(self, key: str) -> Optional[ChatMessage]:
+        return self.update_messages(
+            key, lambda messages: messages.pop() if messages else None
+        )
+
+    def get_keys(self) -> List[str]:
+        keys = set()
+        if self._engine is not None:
+            with self._engine.connect() as conn:
+                keys.update(conn.execute(select(chat_table.c.key)).scalars())
+        with self._lock:
+            keys.update(k for k, v in self._cache.items() if v)
+        return sorted(keys)
+
+    def _is_hot(self, key: str) -> bool:
+        with self._lock:
+            return key in self._cache
+
+    async def aget_messages(self, key: str) -> List[ChatMessage]:
+        # Only a cold conversation needs the database, and then off the loop
+        if self._is_hot(key):
+            return self.get_messages(key)
+        return await super().aget_messages(key)
+
+    async def aset_messages(self, key: str, messages: List[ChatMessage]) -> None:
+        self.set_messages(key, messages)
+
+    async def async_add_message(self, key: str, message: ChatMessage) -> None:
+        if self._is_hot(key):
+            return self.add_message(key, message)
+        return await super().async_add_message(key, message)
+
+
+def chat_store(
+    config=config, max_conversations=1024, flush_interval=0.5, backend="postgres"
+):
+    """
+    Builds the process-wide chat store.
+
+    The database check runs once here, and one pooled engine is shared by
+    cold loads and the background flusher for the lifetime of the process.
+    With ``backend="memory"`` history lives only in the process, for local
+    runs and benchmarks without Postgres.
+    """
+    if backend == "memory":
+        return WriteBehindChatStore(max_conversations=max_conversations)
 
-def chat_mem(user_id):
     url_object = URL.create(
         "postgresql+psycopg2",
         username=config["user"],
@@ -17,21 +262,42 @@ def chat_mem(user_id):
         port=config["port"],
         database=config["db"],
     )
-    engine = create_engine(url_object)
+    engine = create_engine(
+        url_object,
+        pool_size=config.get("pool_size", 5),
+        max_overflow=config.get("max_overflow", 10),
+        pool_pre_ping=True,
+    )
     if not database_exists(engine.url):
         create_database(engine.url)
 
-    chat_store = PostgresChatStore.from_params(
-        host=config["host"],
-        port=config["port"],
-        user=config["user"],
-        password=config["pass"],
-        database=config["db"],
+    store = WriteBehindChatStore(
+        engine=engine,
+        max_conversations=max_conversations,
+        flush_interval=flush_interval,
     )
+    return store
+
+
+def chat_mem(
+    user_id, store: BaseChatStore, llm=None, memory_config: dict = None, lane=None
+):
+    memory_config = memory_config or {}
+    token_limit = memory_config.get("token_limit", 5000)
+    if memory_config.get("mode") == "summary" and llm is not None:
+        return RollingSummaryMemory(
+            token_limit=token_limit,
+            chat_store=store,
+            chat_store_key=user_id,
+            llm=llm,
+            recent_messages=memory_config.get("recent_messages", 8),
+            summary_token_limit=memory_config.get("summary_token_limit", 512),
+            lane=lane,
+        )
 
     chat_memory = ChatMemoryBuffer.from_defaults(
-        token_limit=5000,
-        chat_store=chat_store,
+        token_limit=token_limit,
+        chat_store=store,
         chat_store_key=user_id,
     )
     return chat_memory
@@ -0,0 +1,34 @@
+from typing import Hashable, List
+
+from llama_index.core.base.base_retriever import BaseRetriever
+from llama_index.core.schema import NodeWithScore, QueryBundle
+
+from src.utils.single_flight import SingleFlight
+
+
+class CoalescingRetriever(BaseRetriever):
+    """
+    Retriever wrapper that shares one in-flight retrieval between concurrent
+    identical queries. ``key`` identifies the retriever settings (top-k,
+    filters, mode, ...), the query text completes the flight key.
+    """
+
+    def __init__(self, retriever: BaseRetriever, flight: SingleFlight, key: Hashable):
+        super().__init__()
+        self._retriever = retriever
+        self._flight = flight
+        self._key = key
+
+    def _retrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        nodes = self._flight.do(
+            (self._key, query_bundle.query_str),
+            lambda: self._retriever.retrieve(query_bundle),
+        )
+        return list(nodes)
+
+    async def _aretrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        nodes = await self._flight.ado(
+            (self._key, query_bundle.query_str),
+            lambda: self._retriever.aretrieve(query_bundle),
+        )
+        return list(nodes)
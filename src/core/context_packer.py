@@ -0,0 +1,255 @@
+import ast
+import logging
+import re
+import threading
+from typing import List, Optional
+
+from llama_index.core.postprocessor.types import BaseNodePostprocessor
+from llama_index.core.schema import MetadataMode, NodeWithScore, QueryBundle, TextNode
+from llama_index.core.utils import get_tokenizer
+from pydantic import PrivateAttr
+
+logger = logging.getLogger(__name__)
+
+# Fields sent for every movie, in display order. Templated documents label
+# their text lines (Title, Stars, ...), older ones carry the raw CSV columns.
+BASE_FIELDS = [
+    "Title",
+    "Series_Title",
+    "Released_Year",
+    "Genre",
+    "Director",
+    "IMDB_Rating",
+    "Overview",
+]
+# Extra fields, sent only when the question mentions one of the keywords
+OPTIONAL_FIELDS = {
+    "Stars": ("actor", "actress", "star", "cast", "played", "plays", "who"),
+    "Star1": ("actor", "actress", "star", "cast", "played", "plays", "who"),
+    "Star2": ("actor", "actress", "star", "cast", "played", "plays", "who"),
+    "Star3": ("actor", "actress", "star", "cast", "played", "plays"),
+    "Star4": ("actor", "actress", "star", "cast", "played", "plays"),
+    "Runtime": ("runtime", "long", "length", "minute", "hour", "duration"),
+    "Gross": ("gross", "box office", "earn", "money", "revenue", "profit"),
+    "Meta_score": ("meta", "critic", "review"),
+    "No_of_Votes": ("vote", "popular"),
+    "Certificate": ("certificate", "rated", "rating for", "age", "kid", "family"),
+}
+# Fields that never help answering a question
+DROP_FIELDS = {"Poster_Link"}
+# Metadata of nodes that describe the results instead of being one (e.g. a
+# table lookup header). They are kept first and unpacked, with ``{count}``
+# in the template filled with the number of movies that fit.
+HEADER_KEY = "results_header"
+
+# Missing CSV values show up as bare ``nan`` in the dict repr
+NAN_PATTERN = re.compile(r"(?<=': )nan(?=[,}])")
+LINE_PATTERN = re.compile(r"^\s*([A-Za-z_ ]+?)\s*:\s*(.*)$")
+
+
+def parse_record(text: str) -> Optional[dict]:
+    """
+    Recovers the field mapping of a movie document, either a dict repr of
+    the CSV row or ``Key: value`` lines. Returns None for anything else.
+    """
+    text = text.strip()
+    if text.startswith("{") and text.endswith("}"):
+        try:
+            record = ast.literal_eval(NAN_PATTERN.sub("None", text))
+        except (ValueError, SyntaxError):
+            return None
+        return record if isinstance(record, dict) else None
+
+    record = {}
+    for line in text.splitlines():
+        match = LINE_PATTERN.match(line)
+        if match is None:
+            return None
+        record[match.group(1)] = match.group(2)
+    return record or None
+
+
+def merge_chunks(chunks: List[TextNode]) -> str:
+    """
+    Stitches the chunks of one document back together, dropping the text
+    that consecutive chunks share because of the splitter overlap.
+    """
+    chunks = sorted(chunks, key=lambda node: node.start_char_idx or 0)
+    text = chunks[0].get_content()
+    end = chunks[0].end_char_idx
+    for node in chunks[1:]:
+        content = node.get_content()
+        if end is not None and node.start_char_idx is not None:
+            if node.end_char_idx is not None and node.end_char_idx <= end:
+                continue  # fully contained
+            text += content[max(end - node.start_char_idx, 0) :]
+            end = node.end_char_idx
+            continue
+        # No offsets, look for the longest suffix/prefix overlap instead
+        overlap = next(
+            (
+                size
+                for size in range(min(len(text), len(content)), 0, -1)
+                if text.endswith(content[:size])
+            ),
+            0,
+        )
+        text += content[overlap:]
+        end = None
+    return text
+
+
+class ContextPacker(BaseNodePostprocessor):
+    """
+    Packs retrieved nodes into as few prompt tokens as possible before they
+    are pasted into ``{context_str}``.
+
+    Chunks of the same movie are merged and their overlap removed, each movie
+    is rendered with only the fields relevant to the question, and movies are
+    added in score order until ``token_budget`` is used up.
+    """
+
+    token_budget: int = 1500
+
+    _tokenizer = PrivateAttr()
+    _lock = PrivateAttr(default_factory=threading.Lock)
+    _tokens_in = PrivateAttr(default=0)
+    _tokens_out = PrivateAttr(default=0)
+    _calls = PrivateAttr(default=0)
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._tokenizer = get_tokenizer()
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "ContextPacker"
+
+    def count_tokens(self, text: str) -> int:
+        return len(self._tokenizer(text))
+
+    def select_fields(self, query: str) -> List[str]:
+        query = query.lower()
+        fields = list(BASE_FIELDS)
+        for field, keywords in OPTIONAL_FIELDS.items():
+            if any(keyword in query for keyword in keywords):
+                fields.append(field)
+        return fields
+
+    def render(self, text: str, fields: List[str], metadata: dict = None) -> str:
+        record = parse_record(text)
+        if record is None:
+            return text.strip()
+        record = {**(metadata or {}), **record}
+        keys = [key for key in fields if key in record]
+        keys += [
+            key
+            for key in record
+            if key not in keys
+            and key not in DROP_FIELDS
+            and key not in BASE_FIELDS
+            and key not in OPTIONAL_FIELDS
+        ]
+        lines = []
+        for key in keys:
+            value = record[key]
+            if value is None or value == "":
+                continue
+            if isinstance(value, (list, tuple)):
+                value = ", ".join(str(item) for item in value)
+            lines.append(f"{key}: {value}")
+        return "\n".join(lines)
+
+    def fit(self, text: str, budget: int) -> Optional[str]:
+        tokens = self.count_tokens(text)
+        if tokens <= budget:
+            return text
+        if budget < 32:
+            return None
+        # Trim proportionally, the tail of a movie is its least useful part
+        return text[: int(len(text) * budget / tokens)].rstrip() + "…"
+
+    def _postprocess_nodes(
+        self,
+        nodes: List[NodeWithScore],
+        query_bundle: Optional[QueryBundle] = None,
+    ) -> List[NodeWithScore]:
+        if not nodes:
+            return nodes
+        headers = [n for n in nodes if HEADER_KEY in n.node.metadata]
+        nodes = [n for n in nodes if HEADER_KEY not in n.node.metadata]
+
+        tokens_in = sum(
+            self.count_tokens(n.node.get_content(metadata_mode=MetadataMode.LLM))
+            for n in nodes
+        )
+
+        groups = {}
+        for n in nodes:
+            key = n.node.ref_doc_id or n.node.node_id
+            group = groups.setdefault(key, {"chunks": [], "score": None})
+            group["chunks"].append(n.node)
+            if n.score is not None:
+                group["score"] = max(group["score"] or n.score, n.score)
+        ordered = sorted(
+            groups.items(),
+            key=lambda item: item[1]["score"] or 0.0,
+            reverse=True,
+        )
+
+        fields = self.select_fields(query_bundle.query_str if query_bundle else "")
+        budget = self.token_budget - sum(
+            self.count_tokens(n.node.metadata[HEADER_KEY]) for n in headers
+        )
+        tokens_out = 0
+        packed = []
+        for key, group in ordered:
+            first = group["chunks"][0]
+            metadata = {
+                name: value
+                for name, value in first.metadata.items()
+                if name not in first.excluded_llm_metadata_keys
+            }
+            text = merge_chunks(group["chunks"])
+            text = self.fit(self.render(text, fields, metadata), budget)
+            if text is None:
+                break
+            used = self.count_tokens(text)
+            budget -= used
+            tokens_out += used
+            packed.append(
+                NodeWithScore(node=TextNode(id_=key, text=text), score=group["score"])
+            )
+
+        headers = [
+            NodeWithScore(
+                node=TextNode(
+                    id_=n.node.node_id,
+                    text=n.node.metadata[HEADER_KEY].replace(
+                        "{count}", str(len(packed))
+                    ),
+                ),
+                score=n.score,
+            )
+            for n in headers
+        ]
+
+        with self._lock:
+            self._calls += 1
+            self._tokens_in += tokens_in
+            self._tokens_out += tokens_out
+        logger.info(
+            f"Packed {len(nodes)} nodes into {len(packed)} movies, "
+            f"{tokens_in} -> {tokens_out} tokens "
+            f"({tokens_in - tokens_out} saved)"
+        )
+        return headers + packed
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "calls": self._calls,
+                "tokens_in": self._tokens_in,
+                "tokens_out": self._tokens_out,
+                "tokens_saved": self._tokens_in - self._tokens_out,
+            }
@@ -1,26 +1,67 @@
 import json
 import logging
+from typing import List
 
 import requests
 from llama_index.embeddings.ollama import OllamaEmbedding
 
 from src.config.load_config import AppConfig, load_config
+from src.core.embedding_cache import CachedEmbedding
+from src.utils.metrics import timed
 
 config = load_config()
 logger = logging.getLogger(__name__)
 
 
+class BatchOllamaEmbedding(OllamaEmbedding):
+    """
+    OllamaEmbedding that sends a batch of texts to ``/api/embed`` in one
+    request instead of one request per text.
+    """
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "BatchOllamaEmbedding"
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        result = self._client.embed(
+            model=self.model_name,
+            input=[self._format_text(text) for text in texts],
+            options=self.ollama_additional_kwargs,
+        )
+        return [list(embedding) for embedding in result.embeddings]
+
+    async def _aget_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        result = await self._async_client.embed(
+            model=self.model_name,
+            input=[self._format_text(text) for text in texts],
+            options=self.ollama_additional_kwargs,
+        )
+        return [list(embedding) for embedding in result.embeddings]
+
+
 def embedded_model(config: AppConfig = config):
     embedded_config = config.embedded_config()
     base_url = embedded_config["ollama_api"]
     model_name = embedded_config["embedded_model"]
     data = {"model": model_name}
-    response = requests.post(f"{base_url}/api/pull", data=json.dumps(data))
+    with timed("model_pull"):
+        response = requests.post(f"{base_url}/api/pull", data=json.dumps(data))
 
     if response.status_code == 200:
         logger.info(f"Pulled model {model_name} from {base_url}")
     else:
         logger.error(f"{response.status_code}: {response.text}")
 
-    embedded_model = OllamaEmbedding(model_name=model_name, base_url=base_url)
+    embedded_model = BatchOllamaEmbedding(
+        model_name=model_name,
+        base_url=base_url,
+        embed_batch_size=embedded_config["embed_batch_size"],
+    )
+    if embedded_config["cache_size"] > 0 or embedded_config["cache_path"]:
+        embedded_model = CachedEmbedding(
+            embedded_model,
+            max_entries=embedded_config["cache_size"],
+            disk_path=embedded_config["cache_path"],
+        )
     return embedded_model
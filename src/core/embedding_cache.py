@@ -0,0 +1,226 @@
+import asyncio
+import hashlib
+import sqlite3
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Any, List, Optional
+
+import numpy as np
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from pydantic import PrivateAttr
+
+from src.utils.metrics import cache_result
+
+
+def normalize_text(text: str) -> str:
+    return " ".join(unicodedata.normalize("NFKC", text).split())
+
+
+def queries_as_texts(model) -> bool:
+    # Without distinct instructions a query embeds exactly like a text,
+    # so many queries can share one batched call.
+    query_instruction = getattr(model, "query_instruction", None)
+    text_instruction = getattr(model, "text_instruction", None)
+    return query_instruction == text_instruction
+
+
+class DiskEmbeddingCache:
+    """
+    Persistent embedding tier backed by a single sqlite file, so embeddings
+    survive restarts and can be shared by workers on the same host.
+    """
+
+    def __init__(self, path: str):
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB)"
+        )
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[List[float]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT vector FROM embeddings WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        return np.frombuffer(row[0], dtype=np.float32).tolist()
+
+    def put_many(self, items):
+        rows = [
+            (key, np.asarray(vector, dtype=np.float32).tobytes())
+            for key, vector in items
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)", rows
+            )
+            self._conn.commit()
+
+
+class CachedEmbedding(BaseEmbedding):
+    """
+    Wraps another embedding model with a bounded in-memory LRU and an optional
+    sqlite tier. Keys combine the model name, the embedding kind (query or
+    text) and the whitespace/unicode normalized input.
+    """
+
+    _memory_hits: int = PrivateAttr(default=0)
+    _disk_hits: int = PrivateAttr(default=0)
+    _misses: int = PrivateAttr(default=0)
+    _inner: BaseEmbedding = PrivateAttr()
+    _memory: OrderedDict = PrivateAttr()
+    _max_entries: int = PrivateAttr()
+    _disk: Optional[DiskEmbeddingCache] = PrivateAttr(default=None)
+    _lock: Any = PrivateAttr()
+
+    def __init__(
+        self,
+        inner: BaseEmbedding,
+        max_entries: int = 4096,
+        disk_path: str = None,
+        **kwargs: Any,
+    ):
+        super().__init__(
+            model_name=inner.model_name,
+            embed_batch_size=inner.embed_batch_size,
+            **kwargs,
+        )
+        self._inner = inner
+        self._memory = OrderedDict()
+        self._max_entries = max_entries
+        self._disk = DiskEmbeddingCache(disk_path) if disk_path else None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "CachedEmbedding"
+
+    def _key(self, kind: str, text: str) -> str:
+        raw = f"{self.model_name}\x00{kind}\x00{text}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _lookup_memory(self, key: str) -> Optional[List[float]]:
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self._memory_hits += 1
+                return self._memory[key]
+        return None
+
+    def _lookup_disk(self, keys: List[str]) -> dict:
+        found = {}
+        for key in keys:
+            vector = self._disk.get(key)
+            if vector is not None:
+                found[key] = vector
+        if found:
+            self._remember(found.items(), persist=False)
+            self._disk_hits += len(found)
+        return found
+
+    def _remember(self, items, persist: bool = True):
+        with self._lock:
+            for key, vector in items:
+                self._memory[key] = vector
+                self._memory.move_to_end(key)
+            while len(self._memory) > self._max_entries:
+                self._memory.popitem(last=False)
+        if persist and self._disk is not None:
+            self._disk.put_many(items)
+
+    def _prepare(self, kind: str, texts: List[str]):
+        texts = [normalize_text(t) for t in texts]
+        keys = [self._key(kind, t) for t in texts]
+        vectors = [self._lookup_memory(k) for k in keys]
+        return texts, keys, vectors
+
+    def _missing(self, keys: List[str], vectors: list, found: dict) -> List[int]:
+        for i, key in enumerate(keys):
+            if vectors[i] is None and key in found:
+                vectors[i] = found[key]
+        for vector in vectors:
+            cache_result("embedding", vector is not None)
+        missing = [i for i, v in enumerate(vectors) if v is None]
+        self._misses += len(missing)
+        return missing
+
+    def _split(self, kind: str, texts: List[str]):
+        texts, keys, vectors = self._prepare(kind, texts)
+        found = {}
+        if self._disk is not None:
+            found = self._lookup_disk([k for k, v in zip(keys, vectors) if v is None])
+        return texts, keys, vectors, self._missing(keys, vectors, found)
+
+    async def _asplit(self, kind: str, texts: List[str]):
+        # The in-memory tier is checked inline, sqlite runs off the event loop
+        texts, keys, vectors = self._prepare(kind, texts)
+        found = {}
+        unknown = [k for k, v in zip(keys, vectors) if v is None]
+        if self._disk is not None and unknown:
+            found = await asyncio.to_thread(self._lookup_disk, unknown)
+        return texts, keys, vectors, self._missing(keys, vectors, found)
+
+    def _embed_batch(self, kind: str, texts: List[str]) -> List[List[float]]:
+        texts, keys, vectors, missing = self._split(kind, texts)
+        if missing:
+            batch = [texts[i] for i in missing]
+            if kind == "query":
+                fresh = [self._inner.get_query_embedding(t) for t in batch]
+            else:
+                fresh = self._inner.get_text_embedding_batch(batch)
+            for i, vector in zip(missing, fresh):
+                vectors[i] = vector
+            self._remember([(keys[i], vectors[i]) for i in missing])
+        return vectors
+
+    async def _aembed_batch(self, kind: str, texts: List[str]) -> List[List[float]]:
+        texts, keys, vectors, missing = await self._asplit(kind, texts)
+        if missing:
+            batch = [texts[i] for i in missing]
+            if kind == "query" and len(batch) > 1 and queries_as_texts(self._inner):
+                fresh = await self._inner.aget_text_embedding_batch(batch)
+            elif kind == "query":
+                fresh = [await self._inner.aget_query_embedding(t) for t in batch]
+            else:
+                fresh = await self._inner.aget_text_embedding_batch(batch)
+            for i, vector in zip(missing, fresh):
+                vectors[i] = vector
+            items = [(keys[i], vectors[i]) for i in missing]
+            self._remember(items, persist=False)
+            if self._disk is not None:
+                await asyncio.to_thread(self._disk.put_many, items)
+        return vectors
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        return self._embed_batch("query", [query])[0]
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        return (await self._aembed_batch("query", [query]))[0]
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        return self._embed_batch("text", [text])[0]
+
+    async def _aget_text_embedding(self, text: str) -> List[float]:
+        return (await self._aembed_batch("text", [text]))[0]
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        return self._embed_batch("text", texts)
+
+    async def _aget_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        return await self._aembed_batch("text", texts)
+
+    async def aget_query_embedding_batch(self, queries: List[str]) -> List[List[float]]:
+        return await self._aembed_batch("query", queries)
+
+    def stats(self):
+        return {
+            "entries": len(self._memory),
+            "memory_hits": self._memory_hits,
+            "disk_hits": self._disk_hits,
+            "misses": self._misses,
+        }
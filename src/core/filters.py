@@ -0,0 +1,120 @@
+from typing import Optional
+
+from llama_index.core.vector_stores.types import (
+    FilterOperator,
+    MetadataFilter,
+    MetadataFilters,
+)
+from qdrant_client.http.models import (
+    FieldCondition,
+    Filter,
+    MatchAny,
+    MatchValue,
+    PayloadSchemaType,
+    Range,
+)
+
+# Request field prefix -> numeric metadata key, for ``<prefix>_min``/``_max``
+RANGE_FIELDS = {
+    "year": "Released_Year",
+    "rating": "IMDB_Rating",
+    "runtime": "Runtime",
+    "gross": "Gross",
+}
+
+# Payload indexes created on the collection so filters run inside the search
+PAYLOAD_INDEXES = {
+    "doc_id": PayloadSchemaType.KEYWORD,
+    "Genre": PayloadSchemaType.KEYWORD,
+    "Director": PayloadSchemaType.KEYWORD,
+    "Released_Year": PayloadSchemaType.INTEGER,
+    "Runtime": PayloadSchemaType.INTEGER,
+    "IMDB_Rating": PayloadSchemaType.FLOAT,
+    "Gross": PayloadSchemaType.FLOAT,
+}
+
+
+def build_filters(filters) -> Optional[MetadataFilters]:
+    """
+    Translates request filters into metadata filters that the vector store
+    pushes down into the search.
+
+    Args:
+        filters: A ``MovieFilters`` request model, or None.
+
+    Returns:
+        The combined (AND) metadata filters, or None when nothing is set.
+    """
+    if filters is None:
+        return None
+
+    items = []
+    if filters.genres:
+        items.append(
+            MetadataFilter(
+                key="Genre",
+                value=[genre.strip().title() for genre in filters.genres],
+                operator=FilterOperator.IN,
+            )
+        )
+    if filters.directors:
+        items.append(
+            MetadataFilter(
+                key="Director",
+                value=[director.strip() for director in filters.directors],
+                operator=FilterOperator.IN,
+            )
+        )
+    for name, key in RANGE_FIELDS.items():
+        low = getattr(filters, f"{name}_min")
+        high = getattr(filters, f"{name}_max")
+        if low is not None:
+            items.append(
+                MetadataFilter(key=key, value=low, operator=FilterOperator.GTE)
+            )
+        if high is not None:
+            items.append(
+                MetadataFilter(key=key, value=high, operator=FilterOperator.LTE)
+            )
+
+    if not items:
+        return None
+    return MetadataFilters(filters=items)
+
+
+RANGE_OPERATORS = {
+    FilterOperator.GT: "gt",
+    FilterOperator.GTE: "gte",
+    FilterOperator.LT: "lt",
+    FilterOperator.LTE: "lte",
+}
+
+
+def to_qdrant_filter(filters: Optional[MetadataFilters]) -> Optional[Filter]:
+    """
+    Converts the AND filters produced by ``build_filters`` into a Qdrant
+    filter, for requests that bypass the llama-index vector store.
+    """
+    if filters is None:
+        return None
+    conditions = []
+    for item in filters.filters:
+        if item.operator == FilterOperator.IN:
+            match = MatchAny(any=list(item.value))
+            conditions.append(FieldCondition(key=item.key, match=match))
+        elif item.operator == FilterOperator.EQ:
+            match = MatchValue(value=item.value)
+            conditions.append(FieldCondition(key=item.key, match=match))
+        elif item.operator in RANGE_OPERATORS:
+            bound = Range(**{RANGE_OPERATORS[item.operator]: item.value})
+            conditions.append(FieldCondition(key=item.key, range=bound))
+        else:
+            raise ValueError(f"Unsupported filter operator: {item.operator}")
+    return Filter(must=conditions)
+
+
+def filters_key(filters) -> str:
+    # Stable string for cache namespaces
+    if filters is None:
+        return ""
+    return filters.model_dump_json(exclude_none=True)
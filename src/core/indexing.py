@@ -1,11 +1,46 @@
+import asyncio
+import json
+import os
+
 from llama_index.core import StorageContext, VectorStoreIndex
-from llama_index.core.schema import Node
+from llama_index.core.schema import Node, NodeWithScore, QueryBundle
 from llama_index.core.vector_stores.types import BasePydanticVectorStore
 from llama_index.vector_stores.qdrant import QdrantVectorStore
-from qdrant_client import QdrantClient
+from qdrant_client.http.models import (
+    Modifier,
+    QueryRequest,
+    SparseVector,
+    SparseVectorParams,
+)
 
+from src.core.coalescing_retriever import CoalescingRetriever
 from src.core.embedded_model import embedded_model
-from src.pipeline.preprocessed_doc import Process_doc
+from src.core.embedding_cache import queries_as_texts
+from src.core.filters import PAYLOAD_INDEXES, to_qdrant_filter
+from src.core.numpy_store import NumpyVectorStore
+from src.core.qdrant_profile import (
+    ProfiledAsyncQdrantClient,
+    ProfiledQdrantClient,
+    client_kwargs,
+    dense_params,
+    hnsw_config,
+    quantization_config,
+    search_params,
+)
+from src.core.sparse_encoder import FUSIONS, BM25Encoder
+from src.pipeline.doc_schema import DocSchema
+from src.pipeline.ingestion import BulkIngestor
+from src.pipeline.preprocessed_doc import HASH_KEY, Process_doc
+from src.utils.single_flight import SingleFlight
+
+DEFAULT_PROFILE = {
+    "on_disk": False,
+    "hnsw_m": 16,
+    "hnsw_ef_construct": 100,
+    "quantization": "none",
+}
+DENSE_VECTOR_NAME = "text-dense"
+SPARSE_VECTOR_NAME = "text-sparse-new"
 
 
 class Indexer:
@@ -13,34 +48,397 @@ class Indexer:
         self,
         vector_store: BasePydanticVectorStore = None,
         indexer_config: dict = None,
+        embed_model=None,
     ):
-        self.embed_model = embedded_model()
-        self.qdrant_client = QdrantClient(indexer_config["vector_db"])
+        self.embed_model = embed_model or embedded_model()
+        # Known when restoring a snapshot, otherwise probed from the model
+        self.vector_size = indexer_config.get("vector_size")
+        self.backend = indexer_config.get("vector_store", "qdrant")
         self.collection_name = indexer_config["collection_name"]
-        self.vector_store = vector_store or self.load_qdrant()
+        self.qdrant_client = None
+        self.aqdrant_client = None
+        self.qdrant_profile = indexer_config.get("qdrant_profile")
+        self.created_collection = False
+        if self.backend == "numpy":
+            if vector_store is None:
+                vector_store = self.load_numpy(indexer_config)
+        else:
+            kwargs = {}
+            if self.qdrant_profile:
+                kwargs = client_kwargs(self.qdrant_profile)
+                kwargs["search_params"] = search_params(self.qdrant_profile)
+            self.qdrant_client = ProfiledQdrantClient(
+                indexer_config["vector_db"], **kwargs
+            )
+            self.aqdrant_client = ProfiledAsyncQdrantClient(
+                indexer_config["vector_db"], **kwargs
+            )
+        self.sparse_encoder = BM25Encoder(
+            k1=indexer_config.get("bm25_k1", 1.2),
+            b=indexer_config.get("bm25_b", 0.75),
+            avg_doc_len=indexer_config.get("bm25_avg_doc_len", 120),
+        )
+        self.hybrid = (
+            vector_store is None
+            and indexer_config.get("hybrid", True)
+            and self.supports_hybrid()
+        )
+        self.search_mode = indexer_config.get("search_mode", "hybrid")
+        self._fusion_indexes = {}
+        if vector_store is None:
+            self.ensure_collection()
+            vector_store = self.load_qdrant()
+        self.vector_store = vector_store
         self.index = self.load_index_from_vector_store(
             self.vector_store, self.embed_model
         )
-        self.pipe = Process_doc(indexer_config["file_path"])
+        self.pipe = Process_doc(
+            indexer_config["file_path"],
+            chunk_rows=indexer_config.get("chunk_rows", 1000),
+            schema=DocSchema(indexer_config.get("doc_template")),
+        )
+        self.checkpoint_path = indexer_config.get("checkpoint_path")
+        self.sync_on_start = indexer_config.get("sync_on_start", True)
+        self.ingestor = BulkIngestor(
+            self.embed_model,
+            self.vector_store,
+            embed_batch_size=indexer_config.get("embed_batch_size", 32),
+            embed_concurrency=indexer_config.get("embed_concurrency", 4),
+            upsert_batch_size=indexer_config.get("upsert_batch_size", 256),
+            queue_size=indexer_config.get("ingest_queue_size", 8),
+        )
+        self._change_listeners = []
+        self.single_flight = indexer_config.get("single_flight", True)
+        self.embed_flight = SingleFlight("embed_query")
+        self.retrieve_flight = SingleFlight("retrieve")
 
     def get_index(self):
-        result = self.check_collection_exists()
-        if not result:
+        if getattr(self.vector_store, "read_only", False):
+            # Shared read-only copy, another process owns ingestion
+            return self.index
+        result = self.check_collection_exists() and not self.created_collection
+        # Indexes go in before the data so HNSW links are built filter-aware
+        self.create_payload_indexes()
+        if not result or self.load_checkpoint() is not None:
             print("Begin Insert data")
-            nodes = self.pipe.run()
-            self.add_nodes_to_index(nodes)
+            # A checkpoint is only meaningful while its collection still exists
+            self.ingest_file(start_row=None if result else 0)
+        elif self.sync_on_start:
+            self.sync()
         return self.index
 
-    def load_qdrant(self):
+    def ensure_collection(self):
+        """
+        Creates the Qdrant collection with the configured performance profile
+        (HNSW parameters, quantization, on-disk storage) if it does not exist
+        yet. The dense vector size is probed from the embedding model unless
+        ``vector_size`` is configured.
+        """
+        if self.qdrant_client.collection_exists(self.collection_name):
+            return
+        profile = self.qdrant_profile or DEFAULT_PROFILE
+        vector_size = self.vector_size or len(
+            self.embed_model.get_text_embedding("dimension probe")
+        )
+        dense = dense_params(profile, vector_size)
+        kwargs = {}
+        if self.hybrid:
+            kwargs["vectors_config"] = {DENSE_VECTOR_NAME: dense}
+            kwargs["sparse_vectors_config"] = {
+                SPARSE_VECTOR_NAME: SparseVectorParams(modifier=Modifier.IDF)
+            }
+        else:
+            kwargs["vectors_config"] = dense
+        self.qdrant_client.create_collection(
+            collection_name=self.collection_name,
+            hnsw_config=hnsw_config(profile),
+            quantization_config=quantization_config(profile),
+            **kwargs,
+        )
+        self.created_collection = True
+        print(f"collection: {self.collection_name} created")
+
+    def create_payload_indexes(self):
+        """
+        Creates the keyword/integer/float payload indexes used by search
+        filters, skipping any the collection already has.
+        """
+        if self.qdrant_client is None or not self.check_collection_exists():
+            return
+        info = self.qdrant_client.get_collection(self.collection_name)
+        existing = info.payload_schema or {}
+        for field_name, field_schema in PAYLOAD_INDEXES.items():
+            if field_name not in existing:
+                self.qdrant_client.create_payload_index(
+                    collection_name=self.collection_name,
+                    field_name=field_name,
+                    field_schema=field_schema,
+                )
+
+    def load_checkpoint(self):
+        if not self.checkpoint_path or not os.path.exists(self.checkpoint_path):
+            return None
+        with open(self.checkpoint_path) as f:
+            checkpoint = json.load(f)
+        if checkpoint.get("collection") != self.collection_name:
+            return None
+        return checkpoint["row"]
+
+    def save_checkpoint(self, row: int):
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"collection": self.collection_name, "row": row}, f)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def ingest_file(self, start_row: int = None):
+        """
+        Streams the source file through the ingestion pipeline. When a
+        checkpoint path is configured, the number of fully upserted rows is
+        recorded as the load progresses so a crashed load resumes where it
+        stopped instead of starting over.
+
+        Args:
+            start_row: Row to start from, defaults to the saved checkpoint.
+
+        Returns:
+            Ingestion stats (rows, vectors and elapsed seconds).
+        """
+        if start_row is None:
+            start_row = self.load_checkpoint() or 0
+        if start_row:
+            print(f"Resuming insert from row {start_row}")
+
+        on_commit = None
+        if self.checkpoint_path:
+            self.save_checkpoint(start_row)
+
+            def on_commit(rows):
+                self.save_checkpoint(start_row + rows)
+
+        nodes = self.pipe.iter_nodes(self.pipe.iter_docs(start_row=start_row))
+        stats = self.ingestor.run(nodes, on_commit=on_commit)
+        if self.checkpoint_path:
+            os.remove(self.checkpoint_path)
+        self._notify_change()
+        return stats
+
+    def existing_hashes(self) -> dict:
+        """
+        Reads the content hash stored for every document in the collection.
+
+        Returns:
+            A mapping of document id to content hash (None for points ingested
+            before hashes were stored).
+        """
+        hashes = {}
+        if isinstance(self.vector_store, NumpyVectorStore):
+            for payload in self.vector_store.iter_payloads():
+                hashes[payload.get("doc_id")] = payload.get(HASH_KEY)
+            return hashes
+
+        offset = None
+        while True:
+            points, offset = self.qdrant_client.scroll(
+                collection_name=self.collection_name,
+                with_payload=["doc_id", HASH_KEY],
+                with_vectors=False,
+                limit=1000,
+                offset=offset,
+            )
+            for point in points:
+                payload = point.payload or {}
+                hashes[payload.get("doc_id")] = payload.get(HASH_KEY)
+            if offset is None:
+                break
+        return hashes
+
+    def dimension(self):
+        """
+        Size of the stored dense vectors, None while the store is empty.
+        """
+        if isinstance(self.vector_store, NumpyVectorStore):
+            return self.vector_store.dim
+        params = self.qdrant_client.get_collection(self.collection_name).config.params
+        vectors = params.vectors
+        if isinstance(vectors, dict):
+            vectors = vectors.get(DENSE_VECTOR_NAME)
+        return vectors.size if vectors is not None else None
+
+    def iter_vectors(self):
+        """
+        Reads back every stored chunk with its dense vector, without calling
+        the embedding model.
+
+        Yields:
+            ``(payload, vector)`` pairs, the payload in llama-index node format.
+        """
+        if isinstance(self.vector_store, NumpyVectorStore):
+            yield from self.vector_store.iter_vectors()
+            return
+
+        offset = None
+        while True:
+            points, offset = self.qdrant_client.scroll(
+                collection_name=self.collection_name,
+                with_payload=True,
+                with_vectors=[DENSE_VECTOR_NAME] if self.hybrid else True,
+                limit=1000,
+                offset=offset,
+            )
+            for point in points:
+                vector = point.vector
+                if isinstance(vector, dict):
+                    vector = vector.get(DENSE_VECTOR_NAME)
+                if vector is not None:
+                    yield point.payload or {}, vector
+            if offset is None:
+                break
+
+    def sync(self):
+        """
+        Brings the collection in line with the source file. Only new or changed
+        rows are embedded and upserted, and rows no longer in the file are
+        deleted. Unchanged rows are left untouched.
+
+        Returns:
+            Counts of added, updated and deleted documents.
+        """
+        # Ids still in ``existing`` once the file is consumed were deleted
+        # from the source.
+        existing = self.existing_hashes()
+        report = {"added": 0, "updated": 0, "deleted": 0}
+
+        def changed_docs():
+            for doc in self.pipe.iter_docs():
+                if doc.doc_id not in existing:
+                    report["added"] += 1
+                    yield doc
+                elif existing.pop(doc.doc_id) != doc.metadata[HASH_KEY]:
+                    # Drop the old chunks first, the chunk count may shrink.
+                    self.vector_store.delete(doc.doc_id)
+                    report["updated"] += 1
+                    yield doc
+
+        self.ingestor.run(self.pipe.iter_nodes(changed_docs()))
+        for doc_id in existing:
+            self.vector_store.delete(doc_id)
+        report["deleted"] = len(existing)
+        if any(report.values()):
+            self._notify_change()
+
+        print(f"collection: {self.collection_name} synced {report}")
+        return report
+
+    def supports_hybrid(self):
+        """
+        Hybrid search needs the sparse vectors the collection was created
+        with, so older dense-only collections fall back to dense search until
+        they are re-created.
+        """
+        if not self.qdrant_client.collection_exists(self.collection_name):
+            return True
+        params = self.qdrant_client.get_collection(self.collection_name).config.params
+        if SPARSE_VECTOR_NAME in (params.sparse_vectors or {}):
+            return True
+        print(
+            f"collection: {self.collection_name} has no sparse vectors, "
+            "hybrid search disabled until it is re-created"
+        )
+        return False
+
+    def load_numpy(self, indexer_config: dict):
+        vector_store = NumpyVectorStore(
+            persist_dir=os.path.join(
+                indexer_config.get("numpy_store_path", "numpy_store"),
+                self.collection_name,
+            ),
+            dtype=indexer_config.get("numpy_store_dtype", "float32"),
+            read_only=indexer_config.get("numpy_store_read_only", False),
+        )
+        return vector_store
+
+    def load_qdrant(self, fusion: str = "rrf"):
+        kwargs = {}
+        if self.hybrid:
+            kwargs = {
+                "enable_hybrid": True,
+                "dense_vector_name": DENSE_VECTOR_NAME,
+                "sparse_vector_name": SPARSE_VECTOR_NAME,
+                # Qdrant applies IDF, the encoder supplies the BM25 TF part
+                "sparse_config": SparseVectorParams(modifier=Modifier.IDF),
+                "sparse_doc_fn": self.sparse_encoder.encode_documents,
+                "sparse_query_fn": self.sparse_encoder.encode_queries,
+                "hybrid_fusion_fn": FUSIONS[fusion],
+            }
         vector_store = QdrantVectorStore(
             client=self.qdrant_client,
+            aclient=self.aqdrant_client,
             collection_name=self.collection_name,
+            **kwargs,
         )
         return vector_store
 
+    def fusion_index(self, fusion: str):
+        # The default store fuses with RRF; other fusions get their own view
+        # over the same collection.
+        if fusion == "rrf":
+            return self.index
+        if fusion not in self._fusion_indexes:
+            self._fusion_indexes[fusion] = VectorStoreIndex.from_vector_store(
+                vector_store=self.load_qdrant(fusion), embed_model=self.embed_model
+            )
+        return self._fusion_indexes[fusion]
+
+    def as_retriever(
+        self, top_k=5, filters=None, mode: str = None, fusion="rrf", alpha=0.5
+    ):
+        """
+        Builds a retriever for the requested search mode.
+
+        Args:
+            top_k: Number of nodes to return.
+            filters: Optional metadata filters.
+            mode: "dense", "sparse" or "hybrid", defaults to the configured
+                mode. Sparse and hybrid fall back to dense when the collection
+                has no sparse vectors.
+            fusion: "rrf" or "weighted", how hybrid results are combined.
+            alpha: Weight of the dense results in the fusion.
+        """
+        mode = mode or self.search_mode
+        retriever = self._build_retriever(top_k, filters, mode, fusion, alpha)
+        if not self.single_flight:
+            return retriever
+        filters_json = filters.model_dump_json() if filters is not None else None
+        key = (top_k, filters_json, mode, fusion, alpha)
+        return CoalescingRetriever(retriever, self.retrieve_flight, key)
+
+    def _build_retriever(self, top_k, filters, mode, fusion, alpha):
+        if mode == "hybrid" and self.hybrid:
+            return self.fusion_index(fusion).as_retriever(
+                similarity_top_k=top_k * 2,
+                sparse_top_k=top_k * 2,
+                hybrid_top_k=top_k,
+                vector_store_query_mode="hybrid",
+                alpha=alpha,
+                filters=filters,
+            )
+        if mode == "sparse" and self.hybrid:
+            return self.index.as_retriever(
+                similarity_top_k=top_k,
+                sparse_top_k=top_k,
+                vector_store_query_mode="sparse",
+                filters=filters,
+            )
+        return self.index.as_retriever(similarity_top_k=top_k, filters=filters)
+
     def check_collection_exists(self, **kwargs):
         collection_name = kwargs.get("collection_name", self.collection_name)
-        result = self.qdrant_client.collection_exists(collection_name=collection_name)
+        if isinstance(self.vector_store, NumpyVectorStore):
+            result = self.vector_store.exists()
+        else:
+            result = self.qdrant_client.collection_exists(
+                collection_name=collection_name
+            )
         if result:
             print(f"collection: {collection_name} is already exists")
         else:
@@ -63,11 +461,170 @@ class Indexer:
         )
         return self.index
 
-    def add_nodes_to_index(self, nodes: list[Node], **kwargs):
-        self.index.insert_nodes(nodes, **kwargs)
+    def on_change(self, callback):
+        """
+        Registers a callback run whenever nodes are added to or removed from
+        the index, e.g. to invalidate caches built on top of it.
+        """
+        self._change_listeners.append(callback)
+
+    def _notify_change(self):
+        for callback in self._change_listeners:
+            callback()
+
+    def add_nodes_to_index(self, nodes: list[Node]):
+        """
+        Embeds and upserts nodes through the batched ingestion pipeline.
+
+        Returns:
+            Ingestion stats (rows, vectors and elapsed seconds).
+        """
+        stats = self.ingestor.run(nodes)
+        self._notify_change()
+        return stats
 
     def remove_nodes_from_index(self, node_ids, **kwargs):
         self.index.delete_nodes(node_ids, **kwargs)
+        self._notify_change()
+
+    def retrieve(self, query: str, top_k=5, filters=None, **kwargs):
+        retriever = self.as_retriever(top_k=top_k, filters=filters, **kwargs)
+        return retriever.retrieve(query)
+
+    async def aretrieve(self, query: str, top_k=5, filters=None, **kwargs):
+        retriever = self.as_retriever(top_k=top_k, filters=filters, **kwargs)
+        return await retriever.aretrieve(query)
+
+    async def aembed_query(self, query: str):
+        """
+        Embeds a search query, sharing the call with concurrent requests for
+        the same text.
+        """
+        if not self.single_flight:
+            return await self.embed_model.aget_query_embedding(query)
+        return await self.embed_flight.ado(
+            query, lambda: self.embed_model.aget_query_embedding(query)
+        )
+
+    async def aembed_queries(self, queries: list[str]):
+        if hasattr(self.embed_model, "aget_query_embedding_batch"):
+            return await self.embed_model.aget_query_embedding_batch(queries)
+        if len(queries) > 1 and queries_as_texts(self.embed_model):
+            return await self.embed_model.aget_text_embedding_batch(queries)
+        return await asyncio.gather(
+            *[self.embed_model.aget_query_embedding(query) for query in queries]
+        )
+
+    async def abatch_retrieve(self, items: list[dict], chunk_size=16, concurrency=4):
+        """
+        Retrieves many queries at once. All queries are embedded in a single
+        batched call, then searched ``chunk_size`` at a time through Qdrant's
+        batch query API with up to ``concurrency`` chunks in flight.
+
+        Args:
+            items: Dicts with ``query`` and ``top_k`` and optionally
+                ``filters`` (MetadataFilters), ``mode``, ``fusion`` and
+                ``alpha``, as for ``as_retriever``.
+
+        Yields:
+            ``(position, nodes)`` pairs as each chunk completes.
+        """
+        if not items:
+            return
+        embeddings = await self.aembed_queries([item["query"] for item in items])
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def run_chunk(start):
+            positions = range(start, min(start + chunk_size, len(items)))
+            async with semaphore:
+                results = await self._abatch_chunk(
+                    [items[i] for i in positions], [embeddings[i] for i in positions]
+                )
+            return list(zip(positions, results))
+
+        tasks = [
+            asyncio.ensure_future(run_chunk(start))
+            for start in range(0, len(items), chunk_size)
+        ]
+        try:
+            for future in asyncio.as_completed(tasks):
+                for position, nodes in await future:
+                    yield position, nodes
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _abatch_chunk(self, items: list[dict], embeddings):
+        if self.aqdrant_client is None:
+            return await asyncio.gather(
+                *[
+                    self.as_retriever(
+                        top_k=item["top_k"],
+                        filters=item.get("filters"),
+                        mode=item.get("mode"),
+                        fusion=item.get("fusion", "rrf"),
+                        alpha=item.get("alpha", 0.5),
+                    ).aretrieve(QueryBundle(item["query"], embedding=embedding))
+                    for item, embedding in zip(items, embeddings)
+                ]
+            )
+
+        # One dense and/or sparse request per query, fused below for hybrid
+        requests, plans = [], []
+        for item, embedding in zip(items, embeddings):
+            mode = (item.get("mode") or self.search_mode) if self.hybrid else "dense"
+            limit = item["top_k"] * 2 if mode == "hybrid" else item["top_k"]
+            query_filter = to_qdrant_filter(item.get("filters"))
+            slots = {}
+            if mode in ("dense", "hybrid"):
+                slots["dense"] = len(requests)
+                requests.append(
+                    QueryRequest(
+                        query=embedding,
+                        using=DENSE_VECTOR_NAME if self.hybrid else None,
+                        filter=query_filter,
+                        limit=limit,
+                        with_payload=True,
+                    )
+                )
+            if mode in ("sparse", "hybrid"):
+                indices, values = self.sparse_encoder.encode_queries([item["query"]])
+                slots["sparse"] = len(requests)
+                requests.append(
+                    QueryRequest(
+                        query=SparseVector(indices=indices[0], values=values[0]),
+                        using=SPARSE_VECTOR_NAME,
+                        filter=query_filter,
+                        limit=limit,
+                        with_payload=True,
+                    )
+                )
+            plans.append((item, mode, slots))
+
+        responses = await self.aqdrant_client.query_batch_points(
+            collection_name=self.collection_name, requests=requests
+        )
 
-    def retrieve(self, query: str, top_k=5):
-        return self.index.as_retriever(similarity_top_k=top_k).retrieve(query)
+        results = []
+        for item, mode, slots in plans:
+            parsed = {
+                name: self.vector_store.parse_to_query_result(responses[slot].points)
+                for name, slot in slots.items()
+            }
+            if mode == "hybrid":
+                fusion = FUSIONS[item.get("fusion", "rrf")]
+                result = fusion(
+                    parsed["dense"],
+                    parsed["sparse"],
+                    alpha=item.get("alpha", 0.5),
+                    top_k=item["top_k"],
+                )
+            else:
+                result = parsed[mode]
+            results.append(
+                [
+                    NodeWithScore(node=node, score=score)
+                    for node, score in zip(result.nodes, result.similarities)
+                ]
+            )
+        return results
@@ -5,6 +5,7 @@ import requests
 from llama_index.llms.ollama import Ollama
 
 from src.config.load_config import load_config
+from src.utils.metrics import timed
 
 logger = logging.getLogger(__name__)
 config = load_config()
@@ -15,7 +16,8 @@ def llm_model(llm_config=config.llm_config()):
     base_url = llm_config["ollama_api"]
     model_name = llm_config["llm_model"]
     data = {"model": model_name}
-    response = requests.post(f"{base_url}/api/pull", data=json.dumps(data))
+    with timed("model_pull"):
+        response = requests.post(f"{base_url}/api/pull", data=json.dumps(data))
 
     if response.status_code == 200:
         logger.info(f"Pulled model {model_name} from {base_url}")
@@ -26,7 +28,7 @@ def llm_model(llm_config=config.llm_config()):
         model=llm_config["llm_model"],
         temperature=0.2,
         base_url=llm_config["ollama_api"],
-        request_timeout=600,
+        request_timeout=llm_config.get("request_timeout", 600),
         stream=True,
     )
     return llm
@@ -0,0 +1,235 @@
+import logging
+import threading
+import time
+from typing import List, Literal, Optional
+
+import numpy as np
+import pandas as pd
+from llama_index.core.schema import NodeWithScore, TextNode
+from pydantic import BaseModel
+
+from src.core.filters import RANGE_FIELDS
+from src.pipeline.doc_schema import DocSchema
+from src.pipeline.preprocessed_doc import movie_id
+
+logger = logging.getLogger(__name__)
+
+# Sortable fields -> metadata key
+SORT_FIELDS = {
+    "rating": "IMDB_Rating",
+    "year": "Released_Year",
+    "gross": "Gross",
+    "votes": "No_of_Votes",
+    "runtime": "Runtime",
+    "meta_score": "Meta_score",
+}
+
+
+class TableQuery(BaseModel):
+    """
+    A filter/sort/top-N query. Filter fields mirror ``MovieFilters`` so
+    request filters can be merged in.
+    """
+
+    genres: Optional[List[str]] = None
+    directors: Optional[List[str]] = None
+    year_min: Optional[int] = None
+    year_max: Optional[int] = None
+    rating_min: Optional[float] = None
+    rating_max: Optional[float] = None
+    runtime_min: Optional[int] = None
+    runtime_max: Optional[int] = None
+    gross_min: Optional[float] = None
+    gross_max: Optional[float] = None
+    sort_by: Literal["rating", "year", "gross", "votes", "runtime", "meta_score"] = (
+        "rating"
+    )
+    descending: bool = True
+    # None when the question does not say how many
+    limit: Optional[int] = None
+
+    def merge(self, filters) -> "TableQuery":
+        """
+        Applies request filters (a ``MovieFilters``) on top of the query:
+        genre and director lists replace the parsed ones, range bounds are
+        tightened.
+        """
+        if filters is None:
+            return self
+        update = {}
+        for name in ("genres", "directors"):
+            if getattr(filters, name):
+                update[name] = list(getattr(filters, name))
+        for name in RANGE_FIELDS:
+            for bound, pick in (("min", max), ("max", min)):
+                field = f"{name}_{bound}"
+                values = [
+                    value
+                    for value in (getattr(self, field), getattr(filters, field))
+                    if value is not None
+                ]
+                if values:
+                    update[field] = pick(values)
+        return self.model_copy(update=update)
+
+    def describe(self) -> str:
+        parts = []
+        if self.genres:
+            parts.append(f"genre {' or '.join(self.genres)}")
+        if self.directors:
+            parts.append(f"directed by {' or '.join(self.directors)}")
+        for name in RANGE_FIELDS:
+            low = getattr(self, f"{name}_min")
+            high = getattr(self, f"{name}_max")
+            if low is not None and low == high:
+                parts.append(f"{name} {low}")
+            elif low is not None and high is not None:
+                parts.append(f"{name} {low} to {high}")
+            elif low is not None:
+                parts.append(f"{name} >= {low}")
+            elif high is not None:
+                parts.append(f"{name} <= {high}")
+        order = "descending" if self.descending else "ascending"
+        where = f" where {', '.join(parts)}" if parts else ""
+        top = f"Top {self.limit} movies" if self.limit else "Movies"
+        return f"{top}{where}, sorted by {self.sort_by} {order}"
+
+
+class _Columns:
+    """One immutable load of the table, swapped in whole on reload."""
+
+    def __init__(self, ids: List[str], records: List[dict]):
+        self.ids = ids
+        self.records = records
+        self.size = len(records)
+        self.numbers = {
+            key: np.array(
+                [np.nan if r[key] is None else r[key] for r in records],
+                dtype=np.float64,
+            )
+            for key in SORT_FIELDS.values()
+        }
+        # Missing values sort last in both directions
+        self.orders = {
+            key: np.argsort(column, kind="stable")
+            for key, column in self.numbers.items()
+        }
+        self.orders_desc = {
+            key: np.argsort(-column, kind="stable")
+            for key, column in self.numbers.items()
+        }
+        self.directors = np.array(
+            [(r["Director"] or "").lower() for r in records], dtype=object
+        )
+        self.genres = {}
+        for row, record in enumerate(records):
+            for genre in record["Genre"]:
+                mask = self.genres.setdefault(
+                    genre.lower(), np.zeros(self.size, dtype=bool)
+                )
+                mask[row] = True
+        self.genre_names = sorted({g for r in records for g in r["Genre"]})
+        self.director_names = sorted({r["Director"] for r in records if r["Director"]})
+
+
+class MovieTable:
+    """
+    The movie CSV as typed in-memory columns with precomputed sort orders,
+    for exact filter/sort/top-N queries that vector search answers poorly
+    ("top 10 dramas after 2000", "Kubrick films by year").
+
+    Rows are normalized with the same ``DocSchema`` as the indexed documents
+    and returned as nodes with the same ids, text and metadata.
+    """
+
+    def __init__(self, file_path: str, schema: DocSchema = None, max_rows: int = 50):
+        self.file_path = file_path
+        self.schema = schema or DocSchema()
+        self.max_rows = max_rows
+        self.version = 0
+        self._lock = threading.Lock()
+        self._columns = None
+        self.load()
+
+    def load(self):
+        started = time.perf_counter()
+        ids, records = [], []
+        for frame in pd.read_csv(self.file_path, chunksize=1000):
+            for record in frame.to_dict(orient="records"):
+                ids.append(movie_id(record))
+                records.append(self.schema.normalize(record))
+        columns = _Columns(ids, records)
+        with self._lock:
+            self._columns = columns
+            self.version += 1
+        logger.info(
+            f"Loaded movie table with {columns.size} rows in "
+            f"{time.perf_counter() - started:.2f}s"
+        )
+
+    def reload(self):
+        try:
+            self.load()
+        except Exception as e:
+            logger.error(f"Reloading movie table failed: {str(e)}")
+
+    def __len__(self) -> int:
+        return self._columns.size
+
+    @property
+    def genre_names(self) -> List[str]:
+        return self._columns.genre_names
+
+    @property
+    def director_names(self) -> List[str]:
+        return self._columns.director_names
+
+    def search(self, query: TableQuery, limit: int = 10) -> List[tuple]:
+        """
+        Returns ``(movie_id, values)`` for the matching rows in query order.
+        ``query.limit`` rows, or ``limit`` when the query sets none, capped
+        at ``max_rows``. Rows missing the sort value are left out.
+        """
+        columns = self._columns
+        key = SORT_FIELDS[query.sort_by]
+        mask = ~np.isnan(columns.numbers[key])
+        if query.genres:
+            genre_mask = np.zeros(columns.size, dtype=bool)
+            for genre in query.genres:
+                found = columns.genres.get(genre.strip().lower())
+                if found is not None:
+                    genre_mask |= found
+            mask &= genre_mask
+        if query.directors:
+            names = [name.strip().lower() for name in query.directors]
+            mask &= np.isin(columns.directors, names)
+        for name, field in RANGE_FIELDS.items():
+            column = columns.numbers[field]
+            low = getattr(query, f"{name}_min")
+            high = getattr(query, f"{name}_max")
+            if low is not None:
+                mask &= column >= low
+            if high is not None:
+                mask &= column <= high
+
+        orders = columns.orders_desc if query.descending else columns.orders
+        order = orders[key]
+        rows = order[mask[order]][: min(query.limit or limit, self.max_rows)]
+        return [(columns.ids[row], columns.records[row]) for row in rows]
+
+    def to_node(self, id_: str, record: dict) -> TextNode:
+        metadata = self.schema.metadata(record)
+        return TextNode(
+            id_=id_,
+            text=self.schema.text(record),
+            metadata=metadata,
+            excluded_embed_metadata_keys=self.schema.excluded_embed_keys(metadata),
+            excluded_llm_metadata_keys=self.schema.excluded_llm_keys(metadata),
+        )
+
+    def nodes(self, query: TableQuery, limit: int = 10) -> List[NodeWithScore]:
+        # Exact matches, all scored 1.0 and kept in query order
+        return [
+            NodeWithScore(node=self.to_node(id_, record), score=1.0)
+            for id_, record in self.search(query, limit)
+        ]
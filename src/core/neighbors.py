@@ -0,0 +1,308 @@
+import logging
+import os
+import re
+import threading
+import time
+from typing import Iterable, List, Optional
+
+import numpy as np
+from llama_index.core.vector_stores.utils import metadata_dict_to_node
+
+from src.core.context_packer import parse_record
+from src.pipeline.preprocessed_doc import HASH_KEY
+from src.utils.metrics import timed
+
+logger = logging.getLogger(__name__)
+
+YEAR_SUFFIX = re.compile(r"\s*\(\d{4}\)$")
+
+
+def movie_title(payload: dict) -> Optional[str]:
+    # Templated documents only carry the title in their text
+    if payload.get("Series_Title"):
+        return payload["Series_Title"]
+    try:
+        text = metadata_dict_to_node(payload).get_content()
+    except Exception:
+        return None
+    record = parse_record(text) or {}
+    title = record.get("Series_Title") or record.get("Title")
+    return YEAR_SUFFIX.sub("", str(title)) if title else None
+
+
+class MovieVectors:
+    """
+    One vector per movie, the normalized mean of its chunk vectors, with the
+    fields needed to serve and filter neighbors.
+    """
+
+    def __init__(self, chunks: Iterable[tuple]):
+        movies = {}
+        for payload, vector in chunks:
+            doc_id = payload.get("doc_id")
+            if doc_id is None:
+                continue
+            movie = movies.get(doc_id)
+            if movie is None:
+                movies[doc_id] = movie = {"payload": payload, "vectors": []}
+            movie["vectors"].append(np.asarray(vector, dtype=np.float32))
+
+        self.ids = list(movies)
+        self.hashes = [movies[i]["payload"].get(HASH_KEY) or "" for i in self.ids]
+        self.titles = [movie_title(movies[i]["payload"]) or "" for i in self.ids]
+        self.years = [movies[i]["payload"].get("Released_Year") for i in self.ids]
+        self.genres = [movies[i]["payload"].get("Genre") or [] for i in self.ids]
+        if not self.ids:
+            self.matrix = np.zeros((0, 0), dtype=np.float32)
+            return
+        matrix = np.stack([np.mean(movies[i]["vectors"], axis=0) for i in self.ids])
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        self.matrix = (matrix / np.where(norms == 0, 1, norms)).astype(np.float32)
+
+
+class NeighborTable:
+    """
+    Exact k-nearest-neighbor table over the stored movie vectors, so "more
+    like this" is a lookup instead of an embedding call and a vector search.
+
+    Neighbors are computed with a blocked matrix multiply (``block_size``
+    movies at a time against all of them) and saved to ``path`` as a
+    compressed ``.npz`` of ids, content hashes, neighbor rows (int32) and
+    cosine scores (float32), plus the title, year and genres used to serve
+    and filter them.
+
+    ``refresh`` only recomputes what changed: rows of new or updated movies
+    in full, and for the other rows a merge of their old list with the
+    changed movies. A row that lost neighbors and cannot prove its merged
+    list is still the exact top k is recomputed in full too.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        k: int = 20,
+        block_size: int = 1024,
+        rebuild_ratio: float = 0.25,
+    ):
+        self.path = path
+        self.k = k
+        self.block_size = block_size
+        self.rebuild_ratio = rebuild_ratio
+        self._lock = threading.Lock()
+        self._state = None
+        self._rows = {}
+        self._genres = []
+        self.load()
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        with np.load(self.path) as data:
+            state = {name: data[name] for name in data.files}
+        if state["neighbors"].shape[1] != self.k:
+            logger.info(f"Neighbor table {self.path} has another k, rebuilding")
+            return
+        self._set(state)
+
+    def _set(self, state: dict):
+        rows = {movie_id: row for row, movie_id in enumerate(state["ids"].tolist())}
+        genres = [set(g.split("|")) if g else set() for g in state["genres"].tolist()]
+        with self._lock:
+            self._state = state
+            self._rows = rows
+            self._genres = genres
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez_compressed(f, **self._state)
+        os.replace(tmp_path, self.path)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def _top_k(self, matrix: np.ndarray, rows: np.ndarray):
+        """Full neighbor lists for ``rows``, ``block_size`` rows per product."""
+        count = len(matrix)
+        k = min(self.k, count - 1)
+        neighbors = np.full((len(rows), self.k), -1, dtype=np.int32)
+        scores = np.full((len(rows), self.k), -np.inf, dtype=np.float32)
+        if k <= 0:
+            return neighbors, scores
+        for start in range(0, len(rows), self.block_size):
+            block = rows[start : start + self.block_size]
+            sims = matrix[block] @ matrix.T
+            sims[np.arange(len(block)), block] = -np.inf  # not its own neighbor
+            top = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+            top_scores = np.take_along_axis(sims, top, axis=1)
+            order = np.argsort(-top_scores, axis=1)
+            neighbors[start : start + len(block), :k] = np.take_along_axis(
+                top, order, axis=1
+            )
+            scores[start : start + len(block), :k] = np.take_along_axis(
+                top_scores, order, axis=1
+            )
+        return neighbors, scores
+
+    def _merge(self, movies: MovieVectors, changed: np.ndarray, unchanged: np.ndarray):
+        """
+        Updates the lists of unchanged rows with the changed movies. Returns
+        the merged lists and a mask of rows that need a full recompute.
+        """
+        old = self._state
+        old_rows = self._rows
+        # Old row -> new row, -1 for movies that were removed or changed
+        remap = np.full(len(old["ids"]), -1, dtype=np.int64)
+        changed_set = set(changed.tolist())
+        for row, movie_id in enumerate(movies.ids):
+            old_row = old_rows.get(movie_id)
+            if old_row is not None and row not in changed_set:
+                remap[old_row] = row
+
+        neighbors = np.full((len(unchanged), self.k), -1, dtype=np.int32)
+        scores = np.full((len(unchanged), self.k), -np.inf, dtype=np.float32)
+        stale = np.zeros(len(unchanged), dtype=bool)
+        for start in range(0, len(unchanged), self.block_size):
+            block = unchanged[start : start + self.block_size]
+            previous = np.array([old_rows[movies.ids[row]] for row in block])
+            old_neighbors = old["neighbors"][previous]
+            kept = np.where(old_neighbors >= 0, remap[old_neighbors], -1)
+            kept_scores = np.where(kept >= 0, old["scores"][previous], -np.inf)
+            # Movies outside the old list scored at most its k-th score
+            threshold = old["scores"][previous][:, -1]
+            candidates = np.broadcast_to(changed, (len(block), len(changed)))
+            candidate_scores = movies.matrix[block] @ movies.matrix[changed].T
+            merged = np.concatenate([kept, candidates], axis=1)
+            merged_scores = np.concatenate([kept_scores, candidate_scores], axis=1)
+            order = np.argsort(-merged_scores, axis=1)[:, : self.k]
+            top = np.take_along_axis(merged, order, axis=1)
+            top_scores = np.take_along_axis(merged_scores, order, axis=1)
+            end = start + len(block)
+            neighbors[start:end] = top
+            scores[start:end] = top_scores
+            stale[start:end] = (top_scores >= threshold[:, None]).sum(axis=1) < self.k
+        return neighbors, scores, stale
+
+    def refresh(self, movies: MovieVectors) -> dict:
+        """
+        Brings the table in line with ``movies`` and saves it.
+
+        Returns:
+            Counts of changed, removed and recomputed movies.
+        """
+        started = time.perf_counter()
+        old = self._state
+        count = len(movies.ids)
+        old_hashes = {}
+        if old is not None:
+            old_hashes = dict(zip(old["ids"].tolist(), old["hashes"].tolist()))
+        changed = np.array(
+            [
+                row
+                for row, movie_id in enumerate(movies.ids)
+                if old_hashes.get(movie_id) != movies.hashes[row]
+            ],
+            dtype=np.int64,
+        )
+        removed = len(set(old_hashes) - set(movies.ids))
+        report = {"changed": len(changed), "removed": removed, "recomputed": 0}
+        if old is not None and not len(changed) and not removed:
+            return report
+
+        full = (
+            old is None
+            or len(old["ids"]) <= self.k + 1
+            or count <= self.k + 1
+            or old.get("dim", np.array(0)).item() != movies.matrix.shape[-1]
+            or len(changed) + removed > self.rebuild_ratio * count
+        )
+        with timed("neighbors"):
+            if full:
+                recompute = np.arange(count)
+                neighbors = np.full((count, self.k), -1, dtype=np.int32)
+                scores = np.full((count, self.k), -np.inf, dtype=np.float32)
+            else:
+                unchanged = np.setdiff1d(np.arange(count), changed)
+                merged, merged_scores, stale = self._merge(movies, changed, unchanged)
+                neighbors = np.full((count, self.k), -1, dtype=np.int32)
+                scores = np.full((count, self.k), -np.inf, dtype=np.float32)
+                neighbors[unchanged] = merged
+                scores[unchanged] = merged_scores
+                recompute = np.concatenate([changed, unchanged[stale]])
+            if len(recompute):
+                neighbors[recompute], scores[recompute] = self._top_k(
+                    movies.matrix, recompute
+                )
+        report["recomputed"] = len(recompute)
+
+        self._set(
+            {
+                "ids": np.array(movies.ids, dtype=str),
+                "hashes": np.array(movies.hashes, dtype=str),
+                "titles": np.array(movies.titles, dtype=str),
+                "years": np.array(
+                    [-1 if year is None else year for year in movies.years],
+                    dtype=np.int32,
+                ),
+                "genres": np.array(["|".join(g) for g in movies.genres], dtype=str),
+                "neighbors": neighbors,
+                "scores": scores,
+                "dim": np.array(movies.matrix.shape[-1]),
+            }
+        )
+        self.save()
+        logger.info(
+            f"Neighbor table refreshed in {time.perf_counter() - started:.2f}s "
+            f"{report}"
+        )
+        return report
+
+    def similar(
+        self,
+        movie_id: str,
+        limit: int = 10,
+        genres: List[str] = None,
+        year_min: int = None,
+        year_max: int = None,
+    ) -> Optional[List[dict]]:
+        """
+        Returns the nearest movies to ``movie_id``, best first, or None for
+        an unknown id. Filters apply to the stored top ``k``, so a narrow
+        filter can return fewer than ``limit`` movies.
+        """
+        with self._lock:
+            state, rows, movie_genres = self._state, self._rows, self._genres
+        row = rows.get(movie_id)
+        if row is None:
+            return None
+        wanted = {genre.strip().title() for genre in genres or []}
+        results = []
+        for neighbor, score in zip(state["neighbors"][row], state["scores"][row]):
+            if neighbor < 0:
+                break
+            year = int(state["years"][neighbor])
+            if wanted and not wanted & movie_genres[neighbor]:
+                continue
+            if year_min is not None and (year < 0 or year < year_min):
+                continue
+            if year_max is not None and (year < 0 or year > year_max):
+                continue
+            results.append(
+                {
+                    "movie_id": str(state["ids"][neighbor]),
+                    "title": str(state["titles"][neighbor]),
+                    "year": year if year >= 0 else None,
+                    "genres": sorted(movie_genres[neighbor]),
+                    "score": float(score),
+                }
+            )
+            if len(results) >= limit:
+                break
+        return results
+
+    def title(self, movie_id: str) -> Optional[str]:
+        with self._lock:
+            state, rows = self._state, self._rows
+        row = rows.get(movie_id)
+        return None if row is None else str(state["titles"][row])
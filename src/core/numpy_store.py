@@ -0,0 +1,354 @@
+import asyncio
+import json
+import os
+import threading
+from typing import Any, List, Optional
+
+import numpy as np
+from llama_index.core.schema import BaseNode
+from llama_index.core.vector_stores.types import (
+    BasePydanticVectorStore,
+    FilterCondition,
+    FilterOperator,
+    MetadataFilters,
+    VectorStoreQuery,
+    VectorStoreQueryResult,
+)
+from llama_index.core.vector_stores.utils import (
+    metadata_dict_to_node,
+    node_to_metadata_dict,
+)
+from pydantic import PrivateAttr
+
+from src.utils.metrics import timed
+
+
+def _as_list(value):
+    return value if isinstance(value, list) else [value]
+
+
+def _match(filter, metadata: dict) -> bool:
+    value = metadata.get(filter.key)
+    op = filter.operator
+    if op == FilterOperator.IS_EMPTY:
+        return value is None or value == []
+    if value is None:
+        return op in (FilterOperator.NE, FilterOperator.NIN)
+    if op in (FilterOperator.EQ, FilterOperator.CONTAINS):
+        return filter.value in _as_list(value)
+    if op == FilterOperator.NE:
+        return filter.value not in _as_list(value)
+    if op == FilterOperator.IN:
+        return bool(set(_as_list(value)) & set(_as_list(filter.value)))
+    if op == FilterOperator.NIN:
+        return not set(_as_list(value)) & set(_as_list(filter.value))
+    if op == FilterOperator.TEXT_MATCH:
+        return str(filter.value) in str(value)
+    try:
+        if op == FilterOperator.GT:
+            return value > filter.value
+        if op == FilterOperator.GTE:
+            return value >= filter.value
+        if op == FilterOperator.LT:
+            return value < filter.value
+        if op == FilterOperator.LTE:
+            return value <= filter.value
+    except TypeError:
+        return False
+    raise ValueError(f"Unsupported filter operator: {op}")
+
+
+def matches_filters(filters: MetadataFilters, metadata: dict) -> bool:
+    results = (
+        matches_filters(f, metadata)
+        if isinstance(f, MetadataFilters)
+        else _match(f, metadata)
+        for f in filters.filters
+    )
+    if filters.condition == FilterCondition.OR:
+        return any(results)
+    if filters.condition == FilterCondition.NOT:
+        return not any(results)
+    return all(results)
+
+
+class NumpyVectorStore(BasePydanticVectorStore):
+    """
+    In-process vector store over a memory-mapped embedding matrix.
+
+    Files in ``persist_dir``:
+
+    - ``vectors.bin``: L2-normalized rows, float32 or int8 (with per-row
+      float32 scales in ``scales.bin``), appended on every add.
+    - ``log.jsonl``: one ``add`` entry per row (node payload) and ``delete``
+      entries, replayed on load. Upserting an existing node id supersedes its
+      old row.
+
+    Search is an exact blocked matrix-vector product, so it needs no index
+    build and no network hop. The matrix is opened with ``np.memmap``, which
+    lets several worker processes share one copy of it through the page cache.
+    Read-only instances pick up rows appended by a writer on the next query.
+    """
+
+    stores_text: bool = True
+    flat_metadata: bool = False
+    persist_dir: str
+    dtype: str = "float32"
+    read_only: bool = False
+    block_size: int = 65536
+
+    _dim: Optional[int] = PrivateAttr(default=None)
+    _vectors: Any = PrivateAttr(default=None)
+    _scales: Any = PrivateAttr(default=None)
+    _payloads: List[Optional[dict]] = PrivateAttr(default_factory=list)
+    _alive: Any = PrivateAttr(default=None)
+    _id_to_row: dict = PrivateAttr(default_factory=dict)
+    _doc_rows: dict = PrivateAttr(default_factory=dict)
+    _log_size: int = PrivateAttr(default=-1)
+    _lock: Any = PrivateAttr(default_factory=threading.RLock)
+
+    def __init__(self, persist_dir: str, **kwargs: Any):
+        super().__init__(persist_dir=persist_dir, **kwargs)
+        if self.dtype not in ("float32", "int8"):
+            raise ValueError(f"Unsupported dtype: {self.dtype}")
+        if not self.read_only:
+            os.makedirs(persist_dir, exist_ok=True)
+        self._load()
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "NumpyVectorStore"
+
+    @property
+    def client(self) -> Any:
+        return None
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.persist_dir, name)
+
+    def exists(self) -> bool:
+        return os.path.exists(self._path("log.jsonl")) and len(self._id_to_row) > 0
+
+    def __len__(self) -> int:
+        return len(self._id_to_row)
+
+    def __bool__(self) -> bool:
+        # llama-index tests the store for truthiness and swaps in an
+        # in-memory store for a falsy one, an empty store is still the store
+        return True
+
+    @property
+    def dim(self) -> Optional[int]:
+        return self._dim
+
+    def _load(self):
+        with self._lock:
+            log_path = self._path("log.jsonl")
+            size = os.path.getsize(log_path) if os.path.exists(log_path) else 0
+            if size == self._log_size:
+                return
+            self._payloads, self._id_to_row, self._doc_rows = [], {}, {}
+            if size:
+                with open(log_path) as f:
+                    for line in f:
+                        self._apply(json.loads(line))
+            self._log_size = size
+            self._map_vectors()
+
+    def _apply(self, entry: dict):
+        if entry["op"] == "add":
+            row = len(self._payloads)
+            old = self._id_to_row.get(entry["id"])
+            if old is not None:
+                self._drop_row(old)
+            if self._dim is None:
+                self._dim = entry["dim"]
+            self._payloads.append(entry["payload"])
+            self._id_to_row[entry["id"]] = row
+            self._doc_rows.setdefault(entry["doc_id"], set()).add(row)
+        elif entry["op"] == "delete":
+            for row in list(self._doc_rows.pop(entry["doc_id"], ())):
+                self._drop_row(row)
+
+    def _drop_row(self, row: int):
+        payload = self._payloads[row]
+        if payload is None:
+            return
+        self._payloads[row] = None
+        self._id_to_row.pop(payload["_id"], None)
+        rows = self._doc_rows.get(payload.get("doc_id"))
+        if rows is not None:
+            rows.discard(row)
+
+    def _map_vectors(self):
+        count = len(self._payloads)
+        if not count:
+            self._vectors = self._scales = None
+            self._alive = np.zeros(0, dtype=bool)
+            return
+        self._vectors = np.memmap(
+            self._path("vectors.bin"),
+            dtype=np.dtype(self.dtype),
+            mode="r",
+            shape=(count, self._dim),
+        )
+        if self.dtype == "int8":
+            self._scales = np.memmap(
+                self._path("scales.bin"), dtype=np.float32, mode="r", shape=(count,)
+            )
+        self._alive = np.array([p is not None for p in self._payloads], dtype=bool)
+
+    def _append_log(self, entries: List[dict]):
+        with open(self._path("log.jsonl"), "a") as f:
+            for entry in entries:
+                f.write(json.dumps(entry) + "\n")
+        for entry in entries:
+            self._apply(entry)
+        self._log_size = os.path.getsize(self._path("log.jsonl"))
+
+    def _truncate_vectors(self, dim: int):
+        # Drop rows written by an add that crashed before reaching the log, so
+        # the matrix and the log stay aligned.
+        count = len(self._payloads)
+        files = [("vectors.bin", count * dim * np.dtype(self.dtype).itemsize)]
+        if self.dtype == "int8":
+            files.append(("scales.bin", count * 4))
+        for name, expected in files:
+            path = self._path(name)
+            if os.path.exists(path) and os.path.getsize(path) > expected:
+                os.truncate(path, expected)
+
+    def add(self, nodes: List[BaseNode], **add_kwargs: Any) -> List[str]:
+        if self.read_only:
+            raise RuntimeError("NumpyVectorStore is read-only")
+        if not nodes:
+            return []
+        matrix = np.asarray([node.get_embedding() for node in nodes], dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix = matrix / np.where(norms == 0, 1, norms)
+
+        with self._lock:
+            if self._dim is not None and matrix.shape[1] != self._dim:
+                raise ValueError(
+                    f"Embedding dimension {matrix.shape[1]} does not match "
+                    f"store dimension {self._dim}"
+                )
+            self._truncate_vectors(matrix.shape[1])
+            if self.dtype == "int8":
+                scales = np.abs(matrix).max(axis=1) / 127
+                scales[scales == 0] = 1
+                quantized = np.round(matrix / scales[:, None]).astype(np.int8)
+                with open(self._path("vectors.bin"), "ab") as f:
+                    f.write(quantized.tobytes())
+                with open(self._path("scales.bin"), "ab") as f:
+                    f.write(scales.astype(np.float32).tobytes())
+            else:
+                with open(self._path("vectors.bin"), "ab") as f:
+                    f.write(matrix.tobytes())
+
+            entries = []
+            for node in nodes:
+                payload = node_to_metadata_dict(
+                    node, remove_text=False, flat_metadata=self.flat_metadata
+                )
+                payload["_id"] = node.node_id
+                entries.append(
+                    {
+                        "op": "add",
+                        "id": node.node_id,
+                        "doc_id": node.ref_doc_id,
+                        "dim": matrix.shape[1],
+                        "payload": payload,
+                    }
+                )
+            self._append_log(entries)
+            self._map_vectors()
+        return [node.node_id for node in nodes]
+
+    def delete(self, ref_doc_id: str, **delete_kwargs: Any) -> None:
+        if self.read_only:
+            raise RuntimeError("NumpyVectorStore is read-only")
+        with self._lock:
+            if ref_doc_id in self._doc_rows:
+                self._append_log([{"op": "delete", "doc_id": ref_doc_id}])
+                self._map_vectors()
+
+    def iter_payloads(self):
+        self._load()
+        for payload in self._payloads:
+            if payload is not None:
+                yield payload
+
+    def iter_vectors(self):
+        """Yields ``(payload, vector)`` for every live row, dequantized."""
+        self._load()
+        with self._lock:
+            vectors, scales, payloads = self._vectors, self._scales, self._payloads
+            rows = np.flatnonzero(self._alive)
+        for row in rows:
+            vector = np.asarray(vectors[row], dtype=np.float32)
+            if scales is not None:
+                vector = vector * scales[row]
+            yield payloads[row], vector
+
+    def query(self, query: VectorStoreQuery, **kwargs: Any) -> VectorStoreQueryResult:
+        with timed("vector_search"):
+            return self._search(query)
+
+    def _search(self, query: VectorStoreQuery) -> VectorStoreQueryResult:
+        self._load()
+        with self._lock:
+            vectors, scales, payloads = self._vectors, self._scales, self._payloads
+            mask = self._alive.copy()
+        if vectors is None or query.query_embedding is None:
+            return VectorStoreQueryResult(nodes=[], similarities=[], ids=[])
+
+        if query.filters is not None:
+            for row in np.flatnonzero(mask):
+                if not matches_filters(query.filters, payloads[row]):
+                    mask[row] = False
+        if query.node_ids:
+            wanted = set(query.node_ids)
+            for row in np.flatnonzero(mask):
+                if payloads[row]["_id"] not in wanted:
+                    mask[row] = False
+
+        q = np.asarray(query.query_embedding, dtype=np.float32)
+        q = q / (np.linalg.norm(q) or 1)
+        top_k = query.similarity_top_k
+        best_rows = np.empty(0, dtype=np.int64)
+        best_scores = np.empty(0, dtype=np.float32)
+        for start in range(0, len(mask), self.block_size):
+            end = min(start + self.block_size, len(mask))
+            block_mask = mask[start:end]
+            if not block_mask.any():
+                continue
+            block = vectors[start:end]
+            if scales is not None:
+                scores = (block.astype(np.float32) @ q) * scales[start:end]
+            else:
+                scores = block @ q
+            scores = np.where(block_mask, scores, -np.inf)
+            rows = np.concatenate([best_rows, np.arange(start, end)])
+            scores = np.concatenate([best_scores, scores])
+            if len(scores) > top_k:
+                keep = np.argpartition(-scores, top_k - 1)[:top_k]
+                rows, scores = rows[keep], scores[keep]
+            best_rows, best_scores = rows, scores
+
+        order = np.argsort(-best_scores)
+        nodes, similarities, ids = [], [], []
+        for i in order:
+            if not np.isfinite(best_scores[i]):
+                continue
+            payload = payloads[best_rows[i]]
+            nodes.append(metadata_dict_to_node(payload))
+            similarities.append(float(best_scores[i]))
+            ids.append(payload["_id"])
+        return VectorStoreQueryResult(nodes=nodes, similarities=similarities, ids=ids)
+
+    async def aquery(
+        self, query: VectorStoreQuery, **kwargs: Any
+    ) -> VectorStoreQueryResult:
+        # The matrix product releases the GIL, keep it off the event loop
+        return await asyncio.to_thread(self.query, query, **kwargs)
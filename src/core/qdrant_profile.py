@@ -0,0 +1,145 @@
+from typing import Optional
+
+from qdrant_client import AsyncQdrantClient, QdrantClient
+from qdrant_client.http.models import (
+    CompressionRatio,
+    Distance,
+    HnswConfigDiff,
+    ProductQuantization,
+    ProductQuantizationConfig,
+    QuantizationSearchParams,
+    ScalarQuantization,
+    ScalarQuantizationConfig,
+    ScalarType,
+    SearchParams,
+    VectorParams,
+)
+
+from src.utils.metrics import timed
+
+
+def client_kwargs(profile: dict) -> dict:
+    kwargs = {"prefer_grpc": profile["prefer_grpc"]}
+    if profile["prefer_grpc"]:
+        kwargs["grpc_port"] = profile["grpc_port"]
+    return kwargs
+
+
+def hnsw_config(profile: dict) -> HnswConfigDiff:
+    return HnswConfigDiff(
+        m=profile["hnsw_m"],
+        ef_construct=profile["hnsw_ef_construct"],
+        on_disk=profile["on_disk"],
+    )
+
+
+def dense_params(profile: dict, size: int) -> VectorParams:
+    return VectorParams(
+        size=size,
+        distance=Distance.COSINE,
+        on_disk=profile["on_disk"],
+        hnsw_config=hnsw_config(profile),
+    )
+
+
+def quantization_config(profile: dict):
+    if profile["quantization"] == "scalar":
+        return ScalarQuantization(
+            scalar=ScalarQuantizationConfig(
+                type=ScalarType.INT8, quantile=0.99, always_ram=True
+            )
+        )
+    if profile["quantization"] == "product":
+        return ProductQuantization(
+            product=ProductQuantizationConfig(
+                compression=CompressionRatio(profile["pq_compression"]),
+                always_ram=True,
+            )
+        )
+    if profile["quantization"] not in ("", "none"):
+        raise ValueError(f"Unknown quantization: {profile['quantization']}")
+    return None
+
+
+def search_params(profile: dict) -> Optional[SearchParams]:
+    quantization = None
+    if quantization_config(profile) is not None:
+        quantization = QuantizationSearchParams(
+            rescore=profile["rescore"], oversampling=profile["oversampling"]
+        )
+    if profile["hnsw_ef"] is None and quantization is None:
+        return None
+    return SearchParams(hnsw_ef=profile["hnsw_ef"], quantization=quantization)
+
+
+def _with_params(request, params: SearchParams):
+    if params is None or getattr(request, "params", None) is not None:
+        return request
+    return request.model_copy(update={"params": params})
+
+
+class ProfiledQdrantClient(QdrantClient):
+    """
+    QdrantClient that applies the configured search params (HNSW ``ef``,
+    quantization rescoring/oversampling) to every search that does not set
+    its own, including the ones issued by the llama-index vector store
+    (``search`` and ``search_batch``).
+    """
+
+    def __init__(self, *args, search_params: SearchParams = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.default_search_params = search_params
+
+    def query_points(self, *args, **kwargs):
+        if kwargs.get("search_params") is None:
+            kwargs["search_params"] = self.default_search_params
+        with timed("vector_search"):
+            return super().query_points(*args, **kwargs)
+
+    def query_batch_points(self, collection_name, requests, **kwargs):
+        requests = [_with_params(r, self.default_search_params) for r in requests]
+        with timed("vector_search"):
+            return super().query_batch_points(collection_name, requests, **kwargs)
+
+    def search(self, *args, **kwargs):
+        if kwargs.get("search_params") is None:
+            kwargs["search_params"] = self.default_search_params
+        with timed("vector_search"):
+            return super().search(*args, **kwargs)
+
+    def search_batch(self, collection_name, requests, **kwargs):
+        requests = [_with_params(r, self.default_search_params) for r in requests]
+        with timed("vector_search"):
+            return super().search_batch(collection_name, requests, **kwargs)
+
+
+class ProfiledAsyncQdrantClient(AsyncQdrantClient):
+    """Async counterpart of ``ProfiledQdrantClient``."""
+
+    def __init__(self, *args, search_params: SearchParams = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.default_search_params = search_params
+
+    async def query_points(self, *args, **kwargs):
+        if kwargs.get("search_params") is None:
+            kwargs["search_params"] = self.default_search_params
+        with timed("vector_search"):
+            return await super().query_points(*args, **kwargs)
+
+    async def query_batch_points(self, collection_name, requests, **kwargs):
+        requests = [_with_params(r, self.default_search_params) for r in requests]
+        with timed("vector_search"):
+            return await super().query_batch_points(
+                collection_name, requests, **kwargs
+            )
+
+    async def search(self, *args, **kwargs):
+        if kwargs.get("search_params") is None:
+            kwargs["search_params"] = self.default_search_params
+        with timed("vector_search"):
+            return await super().search(*args, **kwargs)
+
+    async def search_batch(self, collection_name, requests, **kwargs):
+        requests = [_with_params(r, self.default_search_params) for r in requests]
+        with timed("vector_search"):
+            return await super().search_batch(collection_name, requests, **kwargs)
@@ -0,0 +1,358 @@
+import re
+from typing import Optional
+
+from src.core.movie_table import MovieTable, TableQuery
+
+YEAR = r"((?:18|19|20)\d\d)"
+NUMBER_WORDS = {
+    "one": 1,
+    "two": 2,
+    "three": 3,
+    "four": 4,
+    "five": 5,
+    "six": 6,
+    "seven": 7,
+    "eight": 8,
+    "nine": 9,
+    "ten": 10,
+    "twenty": 20,
+    "fifty": 50,
+}
+# Up to three digits, so years are not read as counts
+NUMBER = rf"(\d{{1,3}}|{'|'.join(NUMBER_WORDS)})"
+
+# (pattern, sort field, descending), first match wins
+SORT_PATTERNS = [
+    (r"\b(highest|top|biggest)[- ]grossing\b|\bbox office\b", "gross", True),
+    (r"\b(most|highest) (money|revenue|gross)\b", "gross", True),
+    (r"\blowest[- ]grossing\b", "gross", False),
+    (r"\b(lowest|worst)[- ]rated\b", "rating", False),
+    (r"\b(highest|best|top)[- ]rated\b", "rating", True),
+    (r"\bbest\s+(?:[\w-]+\s+)?(movies?|films?|ones)\b|'s best\b", "rating", True),
+    (r"\bmost (popular|voted|votes)\b", "votes", True),
+    (r"\bmeta ?scores?\b|\bcritically acclaimed\b", "meta_score", True),
+    (r"\blongest\b", "runtime", True),
+    (r"\bshortest\b", "runtime", False),
+    (r"\b(newest|latest|most recent)\b", "year", True),
+    (r"\b(oldest|earliest)\b", "year", False),
+    (r"\bchronological", "year", False),
+]
+# "sorted by X", "ordered by X", ...
+ORDER_BY = re.compile(
+    r"\b(?:sorted|ordered|ranked|sort|order|rank)\s+(?:them\s+)?by\s+"
+    r"(rating|imdb rating|year|release year|release date|date|gross|box office|"
+    r"votes|popularity|runtime|length|meta ?score)"
+    r"(?:\s+(asc|ascending|desc|descending))?",
+    re.IGNORECASE,
+)
+ORDER_FIELDS = {
+    "rating": ("rating", True),
+    "imdb rating": ("rating", True),
+    "year": ("year", False),
+    "release year": ("year", False),
+    "release date": ("year", False),
+    "date": ("year", False),
+    "gross": ("gross", True),
+    "box office": ("gross", True),
+    "votes": ("votes", True),
+    "popularity": ("votes", True),
+    "runtime": ("runtime", True),
+    "length": ("runtime", True),
+    "metascore": ("meta_score", True),
+    "meta score": ("meta_score", True),
+}
+TOP_N = re.compile(
+    rf"\b(?:top|best|first|highest|lowest|worst|last)\s+{NUMBER}\b"
+    rf"|\b{NUMBER}\s+(?:[\w-]+\s+){{0,2}}(?:movies|films|titles|pictures)\b"
+    rf"|\b(?:show|list|give|name|recommend)(?:\s+me)?\s+{NUMBER}\b",
+    re.IGNORECASE,
+)
+SINGULAR = re.compile(r"\bthe\s+(?:[\w-]+\s+){1,3}(?:movie|film)\b(?!s)", re.IGNORECASE)
+MOVIES = re.compile(r"\b(movies|films|titles)\b", re.IGNORECASE)
+# Questions about content need vector search even when they ask for a ranking
+TOPIC = re.compile(
+    r"\b(about|similar|involving|featuring|plot|story|themes?)\b"
+    r"|\b(movies?|films?|something|anything|one)\s+like\b",
+    re.IGNORECASE,
+)
+
+# Year filters
+BETWEEN = re.compile(rf"\b(?:between|from)\s+{YEAR}\s+(?:and|to|-)\s+{YEAR}\b")
+YEAR_RANGE = re.compile(rf"\b{YEAR}\s*(?:-|to)\s*{YEAR}\b")
+AFTER = re.compile(rf"\b(after|since)\s+{YEAR}\b")
+BEFORE = re.compile(rf"\b(before|until|up to)\s+{YEAR}\b")
+DECADE = re.compile(r"\b(?:the\s+)?(?:((?:18|19|20)\d)0|'?(\d)0)'?s\b")
+SINGLE_YEAR = re.compile(rf"\b{YEAR}\b")
+
+# Other numeric filters
+RATED_ABOVE = re.compile(
+    r"\brated\s+(?:above|over|at least|more than|>=?)\s*(\d+(?:\.\d+)?)", re.IGNORECASE
+)
+RATED_BELOW = re.compile(
+    r"\brated\s+(?:below|under|at most|less than|<=?)\s*(\d+(?:\.\d+)?)", re.IGNORECASE
+)
+RUNTIME_UNDER = re.compile(
+    r"\b(?:under|less than|shorter than)\s+(\d+)\s*(min|minutes|hours?)\b",
+    re.IGNORECASE,
+)
+RUNTIME_OVER = re.compile(
+    r"\b(?:over|more than|longer than)\s+(\d+)\s*(min|minutes|hours?)\b",
+    re.IGNORECASE,
+)
+
+# Genre words that are not the genre name or its plural
+GENRE_ALIASES = {
+    "Sci-Fi": ["science fiction", "scifi", "sci fi"],
+    "Animation": ["animated", "cartoons?"],
+    "Romance": ["romantic", "romances"],
+    "Comedy": ["comedies", "funny"],
+    "Mystery": ["mysteries"],
+    "Biography": ["biopics?", "biographies", "biographical"],
+    "Documentary": ["documentaries"],
+    "Horror": ["scary"],
+    "Family": ["family-friendly"],
+}
+# Words that only name a director in "by X", "X's movies", ...
+DIRECTOR_CONTEXT = r"(?:by|directed by|director|from)\s+"
+
+# Patterns whose whole match is understood, removed before looking for
+# words the router did not parse
+PARSED = [
+    ORDER_BY,
+    BETWEEN,
+    YEAR_RANGE,
+    AFTER,
+    BEFORE,
+    DECADE,
+    SINGLE_YEAR,
+    RATED_ABOVE,
+    RATED_BELOW,
+    RUNTIME_UNDER,
+    RUNTIME_OVER,
+]
+# Words a table query may contain besides the parsed filters. Any other
+# word ("with Tom Hanks", "set in Paris", "tonight") is a constraint the
+# table cannot apply, so the question goes to vector search.
+KNOWN_WORDS = set(
+    """
+    a all an and any are best biggest box by can chronological
+    chronologically critically acclaimed desc descending director directed
+    earliest ever film films first for from get give gross grossing highest
+    i imdb in is last latest list longest lowest made me meta metascore
+    money most movie movies name newest of office old oldest on one ones
+    or order ordered please popular popularity rank ranked rated rating
+    recent recommend released revenue runtime s score scores shortest show
+    sort sorted the them time titles top voted votes what which worst year
+    asc ascending pictures title some us we you
+    """.split()
+) | set(NUMBER_WORDS)
+RANKING = re.compile(r"^(top|best|highest)\b|^(lowest|worst)\b", re.IGNORECASE)
+
+
+def _number(value: str) -> int:
+    return int(value) if value.isdigit() else NUMBER_WORDS[value.lower()]
+
+
+def _decade(match) -> tuple:
+    if match.group(1):
+        start = int(match.group(1)) * 10
+    else:
+        # '90s -> 1990s, '00s -> 2000s
+        digit = int(match.group(2))
+        start = 1900 + digit * 10 if digit >= 3 else 2000 + digit * 10
+    return start, start + 9
+
+
+class QueryRouter:
+    """
+    Detects questions that are really table queries (filter, sort, top-N)
+    and turns them into a ``TableQuery`` for the ``MovieTable``. Anything
+    else, e.g. questions about plots or themes, returns None and goes to
+    vector search.
+
+    A question is routed when it asks for an order ("highest rated", "sorted
+    by year", "top 10"), or lists movies by director or year ("movies by
+    Kubrick", "films from 1994"). Genre and director names come from the
+    table itself. A question with words the router does not understand
+    ("top 5 movies with Tom Hanks") is not routed, since the table would
+    drop that constraint.
+    """
+
+    def __init__(self, table: MovieTable):
+        self.table = table
+        self._version = None
+        self._genres = []
+        self._directors = None
+        self._director_surnames = None
+
+    def _compile(self):
+        genres = []
+        for genre in self.table.genre_names:
+            name = re.escape(genre.lower())
+            words = [name, f"{name}s"] + GENRE_ALIASES.get(genre, [])
+            if name.endswith("y"):
+                words.append(f"{name[:-1]}ies")
+            pattern = re.compile(rf"\b(?:{'|'.join(words)})\b", re.IGNORECASE)
+            genres.append((genre, pattern))
+
+        # Full names anywhere, surnames only next to "by", "movies", ...
+        names = sorted(self.table.director_names, key=len, reverse=True)
+        surnames = {}
+        for name in names:
+            parts = name.split()
+            if len(parts) > 1:
+                surnames.setdefault(parts[-1].lower(), []).append(name)
+        full = "|".join(re.escape(name) for name in names)
+        short = "|".join(re.escape(name) for name in sorted(surnames, key=len)[::-1])
+        self._genres = genres
+        self._directors = {name.lower(): name for name in names}
+        self._director_surnames = surnames
+        self._full_names = re.compile(rf"\b({full})\b", re.IGNORECASE) if full else None
+        self._surnames = (
+            re.compile(rf"\b{DIRECTOR_CONTEXT}({short})(?:'s)?\b", re.IGNORECASE)
+            if short
+            else None
+        )
+        self._possessive = (
+            re.compile(
+                rf"\b({short})(?:'s)?\s+(?:\w+\s+)?(?:movies?|films?)\b",
+                re.IGNORECASE,
+            )
+            if short
+            else None
+        )
+        self._version = self.table.version
+
+    def _find_directors(self, text: str) -> list:
+        found = []
+        if self._full_names is not None:
+            found += [
+                self._directors[match.lower()]
+                for match in self._full_names.findall(text)
+            ]
+        if not found:
+            for pattern in (self._surnames, self._possessive):
+                if pattern is None:
+                    continue
+                for match in pattern.findall(text):
+                    found += self._director_surnames[match.lower()]
+        return list(dict.fromkeys(found))
+
+    def _year_filters(self, text: str, fields: dict) -> bool:
+        match = BETWEEN.search(text) or YEAR_RANGE.search(text)
+        if match:
+            low, high = sorted(int(year) for year in match.groups())
+            fields.update(year_min=low, year_max=high)
+            return True
+        found = False
+        match = AFTER.search(text)
+        if match:
+            year = int(match.group(2))
+            fields["year_min"] = year + 1 if match.group(1) == "after" else year
+            found = True
+        match = BEFORE.search(text)
+        if match:
+            year = int(match.group(2))
+            fields["year_max"] = year - 1 if match.group(1) == "before" else year
+            found = True
+        if found:
+            return True
+        match = DECADE.search(text)
+        if match:
+            fields["year_min"], fields["year_max"] = _decade(match)
+            return True
+        match = SINGLE_YEAR.search(text)
+        if match:
+            fields["year_min"] = fields["year_max"] = int(match.group(1))
+            return True
+        return False
+
+    def _unparsed(self, lowered: str, directors: list) -> list:
+        """Words of the question that no rule understood."""
+        rest = lowered
+        for pattern in PARSED:
+            rest = pattern.sub(" ", rest)
+        for _, pattern in self._genres:
+            rest = pattern.sub(" ", rest)
+        for name in directors:
+            for word in name.lower().split():
+                rest = re.sub(rf"\b{re.escape(word)}(?:'s)?(?!\w)", " ", rest)
+        return [
+            word for word in re.findall(r"[^\W\d_]+", rest) if word not in KNOWN_WORDS
+        ]
+
+    def route(self, text: str, filters=None) -> Optional[TableQuery]:
+        """
+        Returns the table query for ``text`` with the request ``filters``
+        (a ``MovieFilters``) applied, or None when it is not one.
+        """
+        if self._version != self.table.version:
+            self._compile()
+        lowered = text.lower()
+        fields = {}
+
+        sort = None
+        match = ORDER_BY.search(text)
+        if match is None and TOPIC.search(text):
+            return None
+        if match:
+            field = re.sub(r"\s+", " ", match.group(1).lower())
+            sort_by, descending = ORDER_FIELDS[field]
+            if match.group(2):
+                descending = match.group(2).lower().startswith("desc")
+            sort = (sort_by, descending)
+        else:
+            for pattern, sort_by, descending in SORT_PATTERNS:
+                if re.search(pattern, lowered):
+                    sort = (sort_by, descending)
+                    break
+
+        match = TOP_N.search(text)
+        if match:
+            count = next(group for group in match.groups() if group)
+            fields["limit"] = _number(count)
+            # "top 5", "worst 3": a ranking by rating unless another was asked
+            ranking = RANKING.match(match.group(0))
+            if sort is None and ranking:
+                sort = ("rating", ranking.group(1) is not None)
+        elif sort is not None and SINGULAR.search(text):
+            fields["limit"] = 1
+
+        genres = [genre for genre, pattern in self._genres if pattern.search(text)]
+        if genres:
+            fields["genres"] = genres
+        directors = self._find_directors(text)
+        if directors:
+            fields["directors"] = directors
+        has_years = self._year_filters(lowered, fields)
+
+        match = RATED_ABOVE.search(text)
+        if match:
+            fields["rating_min"] = float(match.group(1))
+        match = RATED_BELOW.search(text)
+        if match:
+            fields["rating_max"] = float(match.group(1))
+        for pattern, bound in (
+            (RUNTIME_UNDER, "runtime_max"),
+            (RUNTIME_OVER, "runtime_min"),
+        ):
+            match = pattern.search(text)
+            if match:
+                minutes = int(match.group(1))
+                if match.group(2).lower().startswith("h"):
+                    minutes *= 60
+                fields[bound] = minutes
+
+        if self._unparsed(lowered, directors):
+            return None
+        listing = (directors or has_years) and MOVIES.search(text)
+        # A bare count ("2 movies tonight") is not a table query
+        counted = "limit" in fields and len(fields) > 1
+        if sort is None and not counted and not listing:
+            return None
+        if sort is not None:
+            fields["sort_by"], fields["descending"] = sort
+        elif directors and not has_years:
+            # A director's filmography reads best in release order
+            fields["sort_by"], fields["descending"] = "year", False
+        return TableQuery(**fields).merge(filters)
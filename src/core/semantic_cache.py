@@ -0,0 +1,143 @@
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from src.utils.metrics import cache_result
+
+
+class SemanticCache:
+    """
+    Answer cache keyed by query embedding.
+
+    Entries live in namespaces (e.g. ``search:5`` or ``chat``) so results are
+    only shared between requests that would have produced the same kind of
+    answer. A lookup hits when the cosine similarity between the query and a
+    cached query is at least ``threshold``. Entries are evicted least recently
+    used first once ``max_entries`` is reached, and expire after ``ttl``
+    seconds.
+
+    The cache is per process. ``clear`` after a re-ingest only empties the
+    cache of the process that ingested, other workers keep their entries
+    until they expire.
+    """
+
+    def __init__(self, threshold: float = 0.95, max_entries: int = 1024, ttl=3600):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._matrices = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(embedding):
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _matrix(self, namespace):
+        # Stacked vectors per namespace, built once and then kept in step with
+        # ``store`` and ``_drop`` instead of being rebuilt after every change.
+        if namespace not in self._matrices:
+            ids = [k for k, e in self._entries.items() if e[0] == namespace]
+            vectors = [self._entries[k][1] for k in ids]
+            self._matrices[namespace] = _Rows(ids, vectors)
+        return self._matrices[namespace]
+
+    def _drop(self, entry_id):
+        namespace = self._entries.pop(entry_id)[0]
+        rows = self._matrices.get(namespace)
+        if rows is not None:
+            rows.remove(entry_id)
+
+    def lookup(self, namespace: str, embedding):
+        vector = self._normalize(embedding)
+        now = time.monotonic()
+        with self._lock:
+            rows = self._matrix(namespace)
+            if rows.ids:
+                ids = list(rows.ids)
+                scores = rows.matrix() @ vector
+                for i in np.argsort(-scores):
+                    if scores[i] < self.threshold:
+                        break
+                    entry_id = ids[i]
+                    _, _, value, expires_at = self._entries[entry_id]
+                    if expires_at < now:
+                        self._drop(entry_id)
+                        continue
+                    self._entries.move_to_end(entry_id)
+                    self.hits += 1
+                    cache_result("semantic", True)
+                    return value
+            self.misses += 1
+            cache_result("semantic", False)
+            return None
+
+    def store(self, namespace: str, embedding, value):
+        vector = self._normalize(embedding)
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = (
+                namespace,
+                vector,
+                value,
+                time.monotonic() + self.ttl,
+            )
+            rows = self._matrices.get(namespace)
+            if rows is not None:
+                rows.add(entry_id, vector)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._matrices.clear()
+
+    def stats(self):
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+class _Rows:
+    """
+    Growable matrix of one namespace's vectors.
+
+    Rows are appended into spare capacity and removed by moving the last row
+    into the gap, so stores and evictions cost O(dim) instead of restacking
+    every cached vector.
+    """
+
+    def __init__(self, ids, vectors):
+        self.ids = list(ids)
+        self._index = {entry_id: i for i, entry_id in enumerate(self.ids)}
+        self._data = np.stack(vectors) if vectors else None
+
+    def matrix(self):
+        return self._data[: len(self.ids)]
+
+    def add(self, entry_id, vector):
+        size = len(self.ids)
+        if self._data is None:
+            self._data = np.empty((4, vector.shape[0]), dtype=np.float32)
+        elif size == len(self._data):
+            grown = np.empty((2 * size, self._data.shape[1]), dtype=np.float32)
+            grown[:size] = self._data
+            self._data = grown
+        self._data[size] = vector
+        self._index[entry_id] = size
+        self.ids.append(entry_id)
+
+    def remove(self, entry_id):
+        i = self._index.pop(entry_id)
+        last = self.ids.pop()
+        if last != entry_id:
+            self._data[i] = self._data[len(self.ids)]
+            self.ids[i] = last
+            self._index[last] = i
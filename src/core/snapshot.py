@@ -0,0 +1,279 @@
+"""
+Embedding snapshots, so a collection can be rebuilt without re-embedding.
+
+A snapshot is a directory with:
+
+- ``nodes.parquet``: one row per node with its id, document id, text,
+  metadata and the metadata keys excluded from embedding and from the LLM.
+- ``embeddings.npy``: the dense vectors as a float32 matrix, row-aligned
+  with the Parquet file.
+- ``manifest.json``: embedding model, dimension, node count and checksums.
+
+Importing upserts the stored vectors directly. The embedding model is never
+called, the model name and dimension are checked against the target instead.
+BM25 sparse vectors are recomputed locally from the text.
+
+    python -m src.core.snapshot export snapshots/movies
+    python -m src.core.snapshot import snapshots/movies --collection movies_v2
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from typing import List
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.schema import NodeRelationship, RelatedNodeInfo, TextNode
+from llama_index.core.vector_stores.utils import metadata_dict_to_node
+
+from src.config.load_config import AppConfig, load_config
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+NODES_FILE = "nodes.parquet"
+EMBEDDINGS_FILE = "embeddings.npy"
+MANIFEST_FILE = "manifest.json"
+
+SCHEMA = pa.schema(
+    [
+        ("id", pa.string()),
+        ("doc_id", pa.string()),
+        ("text", pa.string()),
+        ("metadata", pa.string()),  # JSON
+        ("excluded_embed_metadata_keys", pa.list_(pa.string())),
+        ("excluded_llm_metadata_keys", pa.list_(pa.string())),
+        ("start_char_idx", pa.int64()),
+        ("end_char_idx", pa.int64()),
+    ]
+)
+
+
+class SnapshotError(ValueError):
+    pass
+
+
+class _NoEmbedding(BaseEmbedding):
+    """Stands in for the embedding model, snapshots never embed."""
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "NoEmbedding"
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        raise RuntimeError("Snapshots do not call the embedding model")
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        return self._get_query_embedding(query)
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        return self._get_query_embedding(text)
+
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _indexer(config: AppConfig, collection: str = None, **overrides):
+    # Deferred so the CLI help does not load the clients
+    from src.core.indexing import Indexer
+
+    indexer_config = config.indexer_config()
+    if collection:
+        indexer_config["collection_name"] = collection
+    indexer_config.update(overrides)
+    return Indexer(indexer_config=indexer_config, embed_model=_NoEmbedding())
+
+
+def export_snapshot(indexer, path: str, model: str, batch_size: int = 1000) -> dict:
+    """
+    Writes every stored node of ``indexer`` with its vector to ``path``.
+
+    Returns:
+        The manifest.
+    """
+    started = time.perf_counter()
+    os.makedirs(path, exist_ok=True)
+    rows, vectors = [], []
+    count = 0
+    with pq.ParquetWriter(os.path.join(path, NODES_FILE), SCHEMA) as writer:
+
+        def flush():
+            if rows:
+                writer.write_batch(pa.RecordBatch.from_pylist(rows, schema=SCHEMA))
+                rows.clear()
+
+        for payload, vector in indexer.iter_vectors():
+            node = metadata_dict_to_node(payload)
+            rows.append(
+                {
+                    "id": node.node_id,
+                    "doc_id": node.ref_doc_id or payload.get("doc_id"),
+                    "text": node.get_content(),
+                    "metadata": json.dumps(node.metadata, default=str),
+                    "excluded_embed_metadata_keys": node.excluded_embed_metadata_keys,
+                    "excluded_llm_metadata_keys": node.excluded_llm_metadata_keys,
+                    "start_char_idx": node.start_char_idx,
+                    "end_char_idx": node.end_char_idx,
+                }
+            )
+            vectors.append(np.asarray(vector, dtype=np.float32))
+            count += 1
+            if len(rows) >= batch_size:
+                flush()
+        flush()
+
+    if not vectors:
+        raise SnapshotError(f"Collection {indexer.collection_name} is empty")
+    matrix = np.stack(vectors)
+    np.save(os.path.join(path, EMBEDDINGS_FILE), matrix)
+
+    manifest = {
+        "format": FORMAT_VERSION,
+        "model": model,
+        "dimension": int(matrix.shape[1]),
+        "count": count,
+        "collection": indexer.collection_name,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "files": {
+            name: _sha256(os.path.join(path, name))
+            for name in (NODES_FILE, EMBEDDINGS_FILE)
+        },
+    }
+    with open(os.path.join(path, MANIFEST_FILE), "w") as f:
+        json.dump(manifest, f, indent=2)
+    logger.info(
+        f"Exported {count} nodes from {indexer.collection_name} to {path} "
+        f"in {time.perf_counter() - started:.1f}s"
+    )
+    return manifest
+
+
+def read_manifest(path: str, model: str = None, verify: bool = True) -> dict:
+    """
+    Loads the manifest of the snapshot at ``path`` and checks its format,
+    embedding model and file checksums.
+    """
+    with open(os.path.join(path, MANIFEST_FILE)) as f:
+        manifest = json.load(f)
+    if manifest.get("format") != FORMAT_VERSION:
+        raise SnapshotError(f"Unsupported snapshot format: {manifest.get('format')}")
+    if model is not None and manifest["model"] != model:
+        raise SnapshotError(
+            f"Snapshot was embedded with {manifest['model']}, "
+            f"the configured model is {model}"
+        )
+    if verify:
+        for name, checksum in manifest["files"].items():
+            if _sha256(os.path.join(path, name)) != checksum:
+                raise SnapshotError(f"Checksum mismatch for {name}")
+    return manifest
+
+
+def import_snapshot(indexer, path: str, manifest: dict, batch_size: int = 256) -> dict:
+    """
+    Upserts the nodes and vectors of the snapshot at ``path`` into the
+    store of ``indexer``, without embedding anything.
+
+    Returns:
+        Import stats (nodes and elapsed seconds).
+    """
+    started = time.perf_counter()
+    dimension = indexer.dimension()
+    if dimension is not None and dimension != manifest["dimension"]:
+        raise SnapshotError(
+            f"Snapshot dimension {manifest['dimension']} does not match "
+            f"collection dimension {dimension}"
+        )
+    matrix = np.load(os.path.join(path, EMBEDDINGS_FILE), mmap_mode="r")
+    if matrix.shape != (manifest["count"], manifest["dimension"]):
+        raise SnapshotError(f"Unexpected embeddings shape {matrix.shape}")
+
+    indexer.create_payload_indexes()
+    row = 0
+    parquet = pq.ParquetFile(os.path.join(path, NODES_FILE))
+    for batch in parquet.iter_batches(batch_size=batch_size):
+        nodes = []
+        for record in batch.to_pylist():
+            node = TextNode(
+                id_=record["id"],
+                text=record["text"],
+                metadata=json.loads(record["metadata"]),
+                excluded_embed_metadata_keys=record["excluded_embed_metadata_keys"],
+                excluded_llm_metadata_keys=record["excluded_llm_metadata_keys"],
+                start_char_idx=record["start_char_idx"],
+                end_char_idx=record["end_char_idx"],
+                embedding=matrix[row].tolist(),
+            )
+            if record["doc_id"]:
+                node.relationships[NodeRelationship.SOURCE] = RelatedNodeInfo(
+                    node_id=record["doc_id"]
+                )
+            nodes.append(node)
+            row += 1
+        indexer.vector_store.add(nodes)
+    if row != manifest["count"]:
+        raise SnapshotError(
+            f"Snapshot has {row} nodes, the manifest lists {manifest['count']}"
+        )
+
+    stats = {"nodes": row, "seconds": time.perf_counter() - started}
+    logger.info(
+        f"Imported {row} nodes into {indexer.collection_name} "
+        f"in {stats['seconds']:.1f}s"
+    )
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Export or import an embedding snapshot"
+    )
+    parser.add_argument("command", choices=["export", "import"])
+    parser.add_argument("path", help="Snapshot directory")
+    parser.add_argument(
+        "--collection", help="Collection to read or write, defaults to COLLECTION"
+    )
+    parser.add_argument("--batch-size", type=int, default=None)
+    parser.add_argument(
+        "--skip-verify", action="store_true", help="Skip the checksum check on import"
+    )
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    config = load_config()
+    model = config.embedded_config()["embedded_model"]
+    if args.command == "export":
+        # Reads an existing collection, a missing one fails on the size probe
+        indexer = _indexer(config, args.collection)
+        manifest = export_snapshot(
+            indexer, args.path, model, batch_size=args.batch_size or 1000
+        )
+        print(json.dumps(manifest, indent=2))
+        return
+
+    manifest = read_manifest(args.path, model=model, verify=not args.skip_verify)
+    # The collection is created with the snapshot's dimension, no probe call
+    indexer = _indexer(config, args.collection, vector_size=manifest["dimension"])
+    stats = import_snapshot(
+        indexer,
+        args.path,
+        manifest,
+        batch_size=args.batch_size or config.indexer_config()["upsert_batch_size"],
+    )
+    print(json.dumps(stats))
+
+
+if __name__ == "__main__":
+    main()
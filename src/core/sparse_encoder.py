@@ -0,0 +1,126 @@
+import re
+import zlib
+from collections import Counter
+from typing import List, Tuple
+
+from llama_index.core.vector_stores.types import VectorStoreQueryResult
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has in is it its of on or that the to was "
+    "were will with".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+def token_id(token: str) -> int:
+    # Stable across processes, unlike hash(); fits Qdrant's uint32 indices.
+    return zlib.crc32(token.encode("utf-8")) & 0x7FFFFFFF
+
+
+class BM25Encoder:
+    """
+    Local BM25 term weights for Qdrant sparse vectors.
+
+    Documents carry the saturated, length-normalized term frequency part of
+    BM25 and queries carry a weight of 1 per term. The collection is created
+    with the IDF modifier, so Qdrant supplies the IDF part at search time and
+    the dot product is the full BM25 score. No model or external service is
+    involved.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75, avg_doc_len: float = 120):
+        self.k1 = k1
+        self.b = b
+        self.avg_doc_len = avg_doc_len
+
+    def _vector(self, counts: Counter, weight_fn) -> Tuple[List[int], List[float]]:
+        weights = {}
+        for token, tf in counts.items():
+            index = token_id(token)
+            weights[index] = weights.get(index, 0.0) + weight_fn(tf)
+        indices = sorted(weights)
+        return indices, [weights[i] for i in indices]
+
+    def encode_documents(self, texts: List[str]):
+        all_indices, all_values = [], []
+        for text in texts:
+            tokens = tokenize(text)
+            norm = self.k1 * (1 - self.b + self.b * len(tokens) / self.avg_doc_len)
+            indices, values = self._vector(
+                Counter(tokens), lambda tf: tf * (self.k1 + 1) / (tf + norm)
+            )
+            all_indices.append(indices)
+            all_values.append(values)
+        return all_indices, all_values
+
+    def encode_queries(self, texts: List[str]):
+        all_indices, all_values = [], []
+        for text in texts:
+            indices, values = self._vector(Counter(set(tokenize(text))), lambda tf: 1.0)
+            all_indices.append(indices)
+            all_values.append(values)
+        return all_indices, all_values
+
+
+def _fused_result(scores: dict, nodes: dict, top_k: int) -> VectorStoreQueryResult:
+    top = sorted(scores, key=scores.get, reverse=True)[:top_k]
+    return VectorStoreQueryResult(
+        nodes=[nodes[i] for i in top],
+        similarities=[scores[i] for i in top],
+        ids=top,
+    )
+
+
+def reciprocal_rank_fusion(
+    dense_result: VectorStoreQueryResult,
+    sparse_result: VectorStoreQueryResult,
+    alpha: float = 0.5,
+    top_k: int = 2,
+    k: int = 60,
+) -> VectorStoreQueryResult:
+    """
+    Weighted reciprocal rank fusion: each list contributes
+    ``weight / (k + rank)`` per node, with ``alpha`` weighting the dense list.
+    """
+    scores, nodes = {}, {}
+    for weight, result in ((alpha, dense_result), (1 - alpha, sparse_result)):
+        for rank, node in enumerate(result.nodes or []):
+            scores[node.node_id] = scores.get(node.node_id, 0.0) + weight / (
+                k + rank + 1
+            )
+            nodes.setdefault(node.node_id, node)
+    return _fused_result(scores, nodes, top_k)
+
+
+def weighted_score_fusion(
+    dense_result: VectorStoreQueryResult,
+    sparse_result: VectorStoreQueryResult,
+    alpha: float = 0.5,
+    top_k: int = 2,
+) -> VectorStoreQueryResult:
+    """
+    Min-max normalizes each list's scores, then combines them as
+    ``alpha * dense + (1 - alpha) * sparse``.
+    """
+    scores, nodes = {}, {}
+    for weight, result in ((alpha, dense_result), (1 - alpha, sparse_result)):
+        similarities = result.similarities or []
+        if not similarities:
+            continue
+        low, high = min(similarities), max(similarities)
+        spread = (high - low) or 1.0
+        for node, score in zip(result.nodes or [], similarities):
+            normalized = (score - low) / spread if high > low else 1.0
+            scores[node.node_id] = scores.get(node.node_id, 0.0) + weight * normalized
+            nodes.setdefault(node.node_id, node)
+    return _fused_result(scores, nodes, top_k)
+
+
+FUSIONS = {
+    "rrf": reciprocal_rank_fusion,
+    "weighted": weighted_score_fusion,
+}
@@ -0,0 +1,200 @@
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, List, Optional
+
+from llama_index.core.base.llms.types import ChatMessage, MessageRole
+from llama_index.core.llms import LLM
+from llama_index.core.memory import ChatMemoryBuffer
+from pydantic import Field
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_SUFFIX = "::summary"
+SUMMARY_PREFIX = "Earlier conversation: "
+SUMMARY_PROMPT = """Update the running summary of a conversation between a user and a
+movie assistant. Keep the user's preferences, the movies, people and facts already
+discussed, and any open questions. Write plain prose of at most {words} words and nothing else.
+
+Current summary:
+{summary}
+
+New messages:
+{messages}
+
+Updated summary:"""
+
+_executor = None
+_in_flight = set()
+_tasks = set()
+_lock = threading.Lock()
+
+
+def summary_executor(workers: int = 1) -> ThreadPoolExecutor:
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=workers, thread_name_prefix="chat-summary"
+            )
+    return _executor
+
+
+class RollingSummaryMemory(ChatMemoryBuffer):
+    """
+    Chat memory that keeps the last ``recent_messages`` messages verbatim
+    and folds older ones into a running summary.
+
+    The summary is stored in the chat store next to the conversation (key
+    ``<user>::summary``) and returned as a system message ahead of the
+    verbatim history. Folding happens in a background thread after a turn is
+    stored, so summarization never sits between a question and its first
+    token. Until a fold finishes, the unsummarized messages are returned
+    verbatim, still capped by ``token_limit``.
+
+    With a ``lane`` (the ``FairLane`` of LLM generations) a fold scheduled
+    from the event loop waits for a slot like any generation, so summaries
+    never push Ollama past its concurrency. A rejected fold is retried after
+    the next turn.
+    """
+
+    llm: Optional[LLM] = Field(default=None, exclude=True)
+    lane: Optional[Any] = Field(default=None, exclude=True)
+    recent_messages: int = 8
+    summary_token_limit: int = 512
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "RollingSummaryMemory"
+
+    @property
+    def summary_key(self) -> str:
+        return f"{self.chat_store_key}{SUMMARY_SUFFIX}"
+
+    def _with_summary(self, summary: List[ChatMessage], messages: List[ChatMessage]):
+        return list(summary) + list(messages)
+
+    def get_all(self) -> List[ChatMessage]:
+        summary = self.chat_store.get_messages(self.summary_key)
+        return self._with_summary(summary, super().get_all())
+
+    async def aget_all(self) -> List[ChatMessage]:
+        summary = await self.chat_store.aget_messages(self.summary_key)
+        return self._with_summary(summary, await super().aget_all())
+
+    def put(self, message: ChatMessage) -> None:
+        super().put(message)
+        self._schedule()
+
+    async def aput(self, message: ChatMessage) -> None:
+        await super().aput(message)
+        self._schedule()
+
+    def reset(self) -> None:
+        super().reset()
+        self.chat_store.delete_messages(self.summary_key)
+
+    def _schedule(self):
+        if self.llm is None:
+            return
+        key = self.chat_store_key
+        with _lock:
+            if key in _in_flight:
+                return
+            _in_flight.add(key)
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        if self.lane is None or loop is None:
+            summary_executor().submit(self._fold)
+            return
+        task = loop.create_task(self._admitted_fold())
+        _tasks.add(task)
+        task.add_done_callback(_tasks.discard)
+
+    async def _admitted_fold(self):
+        lease = None
+        try:
+            # Queued apart from the user's own requests
+            lease = await self.lane.acquire(self.summary_key)
+            await asyncio.get_running_loop().run_in_executor(
+                summary_executor(), self._fold
+            )
+        except Exception as e:
+            logger.info(f"Chat summary for {self.chat_store_key} deferred: {e}")
+        finally:
+            if lease is None:
+                with _lock:
+                    _in_flight.discard(self.chat_store_key)
+            else:
+                lease.release()
+
+    def _split_point(self, messages: List[ChatMessage]) -> int:
+        """
+        Number of leading messages to fold, chosen so the verbatim tail
+        starts at a user message.
+        """
+        cut = len(messages) - self.recent_messages
+        while 0 < cut < len(messages) and messages[cut].role != MessageRole.USER:
+            cut += 1
+        return cut if cut < len(messages) else 0
+
+    def _fold(self):
+        key = self.chat_store_key
+        try:
+            messages = self.chat_store.get_messages(key)
+            cut = self._split_point(messages)
+            if cut <= 0:
+                return
+            folded = messages[:cut]
+            summary = self.chat_store.get_messages(self.summary_key)
+            # The prefix is for the chat prompt, the LLM only sees the text
+            previous = (
+                summary[0].content.removeprefix(SUMMARY_PREFIX) if summary else "(none)"
+            )
+            transcript = "\n".join(f"{m.role.value}: {m.content}" for m in folded)
+            prompt = SUMMARY_PROMPT.format(
+                words=int(self.summary_token_limit * 0.75),
+                summary=previous,
+                messages=transcript,
+            )
+            text = self.llm.complete(prompt).text.strip()
+            tokens = self.tokenizer_fn(text)
+            if len(tokens) > self.summary_token_limit:
+                # Hard cap in case the model ignores the word budget
+                text = text[: int(len(text) * self.summary_token_limit / len(tokens))]
+
+            message = ChatMessage(
+                role=MessageRole.SYSTEM, content=f"{SUMMARY_PREFIX}{text}"
+            )
+            if not self._replace_folded(key, folded, message):
+                logger.info(f"Chat summary for {key} discarded, history changed")
+        except Exception as e:
+            logger.error(f"Chat summary for {key} failed: {str(e)}")
+        finally:
+            with _lock:
+                _in_flight.discard(key)
+
+    def _replace_folded(
+        self, key: str, folded: List[ChatMessage], summary: ChatMessage
+    ) -> bool:
+        # Messages may have been added while the summary was generated, only
+        # remove the exact prefix that was folded. The summary is written in
+        # the same step, so the turns are never in both or lost from both.
+        def replace(messages):
+            if messages[: len(folded)] != folded:
+                return False
+            del messages[: len(folded)]
+            self.chat_store.set_messages(self.summary_key, [summary])
+            return True
+
+        update = getattr(self.chat_store, "update_messages", None)
+        if update is not None:
+            return update(key, replace)
+        messages = self.chat_store.get_messages(key)
+        replaced = replace(messages)
+        if replaced:
+            self.chat_store.set_messages(key, messages)
+        return replaced
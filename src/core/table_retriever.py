@@ -0,0 +1,65 @@
+from typing import List
+
+from llama_index.core.base.base_retriever import BaseRetriever
+from llama_index.core.schema import NodeWithScore, QueryBundle, TextNode
+
+from src.core.context_packer import HEADER_KEY
+from src.core.movie_table import MovieTable, TableQuery
+from src.core.query_router import QueryRouter
+from src.utils.metrics import timed
+
+
+class TableRetriever(BaseRetriever):
+    """
+    Retriever that answers table queries ("top 10 dramas after 2000") with
+    the exact rows from the ``MovieTable``, so the LLM only has to phrase
+    the answer. Other questions, and table queries without matches, go to
+    ``retriever``.
+    """
+
+    def __init__(
+        self,
+        retriever: BaseRetriever,
+        table: MovieTable,
+        router: QueryRouter,
+        filters=None,
+        top_k: int = 10,
+    ):
+        super().__init__()
+        self._retriever = retriever
+        self._table = table
+        self._router = router
+        self._filters = filters
+        self._top_k = top_k
+
+    def _lookup(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        query = self._router.route(query_bundle.query_str, self._filters)
+        if query is None:
+            return []
+        with timed("table_query"):
+            nodes = self._table.nodes(query, self._top_k)
+        if not nodes:
+            return []
+        # Tells the LLM the rows are exact and already ranked
+        header = self._header(query, len(nodes))
+        return [NodeWithScore(node=header, score=1.0)] + nodes
+
+    def _header(self, query: TableQuery, count: int) -> TextNode:
+        # The packer restates the count when rows do not fit its budget
+        template = f"Lookup: {query.describe()}. {{count}} exact results, in order"
+        return TextNode(
+            id_="table-query",
+            text=template.replace("{count}", str(count)),
+            metadata={HEADER_KEY: template},
+            excluded_embed_metadata_keys=[HEADER_KEY],
+            excluded_llm_metadata_keys=[HEADER_KEY],
+        )
+
+    def _retrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        return self._lookup(query_bundle) or self._retriever.retrieve(query_bundle)
+
+    async def _aretrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        nodes = self._lookup(query_bundle)
+        if nodes:
+            return nodes
+        return await self._retriever.aretrieve(query_bundle)
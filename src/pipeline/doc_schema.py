@@ -0,0 +1,114 @@
+import string
+
+
+def to_int(value):
+    try:
+        return int(float(str(value).split()[0].replace(",", "")))
+    except (ValueError, IndexError):
+        return None
+
+
+def to_float(value):
+    try:
+        number = float(str(value).replace(",", ""))
+    except ValueError:
+        return None
+    return None if number != number else number  # NaN
+
+
+def to_text(value):
+    if value is None or value != value:  # NaN
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+def to_list(value):
+    value = to_text(value)
+    if value is None:
+        return []
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+# Embedding text, one line per field. Lines whose fields are all empty are
+# left out.
+DEFAULT_TEMPLATE = (
+    "Title: {Series_Title} ({Released_Year})\n"
+    "Genre: {Genre}\n"
+    "Director: {Director}\n"
+    "Stars: {Stars}\n"
+    "Overview: {Overview}"
+)
+
+# Metadata fields and their normalizers
+FIELDS = {
+    "Series_Title": to_text,
+    "Released_Year": to_int,
+    "Certificate": to_text,
+    "Runtime": to_int,  # minutes
+    "Genre": to_list,
+    "IMDB_Rating": to_float,
+    "Overview": to_text,
+    "Meta_score": to_int,
+    "Director": to_text,
+    "No_of_Votes": to_int,
+    "Gross": to_float,
+}
+STAR_COLUMNS = ["Star1", "Star2", "Star3", "Star4"]
+
+
+class DocSchema:
+    """
+    Turns a CSV row into the text that is embedded and the typed metadata
+    that is stored next to it.
+
+    Fields used in ``template`` are only kept in the text, so they are not
+    repeated in the payload or the prompt. The remaining fields are stored as
+    metadata, visible to the LLM but not embedded. ``Poster_Link`` and any
+    column not listed in ``FIELDS`` are dropped.
+    """
+
+    def __init__(self, template: str = None):
+        self.template = (template or DEFAULT_TEMPLATE).replace("\\n", "\n")
+        self.lines = [
+            (line, [name for _, name, _, _ in string.Formatter().parse(line) if name])
+            for line in self.template.splitlines()
+        ]
+        self.text_fields = {name for _, names in self.lines for name in names}
+
+    def normalize(self, record: dict) -> dict:
+        values = {name: norm(record.get(name)) for name, norm in FIELDS.items()}
+        values["Stars"] = [
+            star for star in (to_text(record.get(col)) for col in STAR_COLUMNS) if star
+        ]
+        return values
+
+    def text(self, values: dict) -> str:
+        lines = []
+        for line, names in self.lines:
+            fields = {name: values.get(name) for name in names}
+            if all(value in (None, []) for value in fields.values()):
+                continue
+            fields = {
+                name: ", ".join(value) if isinstance(value, list) else value
+                for name, value in fields.items()
+            }
+            fields = {name: "" if v is None else v for name, v in fields.items()}
+            lines.append(line.format(**fields).replace(" ()", ""))
+        return "\n".join(lines)
+
+    def metadata(self, values: dict) -> dict:
+        # Filters and payload indexes rely on these, keep them even when they
+        # are part of the text
+        keep = {"Genre", "Director", "Released_Year"}
+        return {
+            name: value
+            for name, value in values.items()
+            if name in keep or name not in self.text_fields
+        }
+
+    def excluded_llm_keys(self, metadata: dict) -> list:
+        return [name for name in metadata if name in self.text_fields]
+
+    def excluded_embed_keys(self, metadata: dict) -> list:
+        return list(metadata)
@@ -0,0 +1,207 @@
+import logging
+import queue
+import threading
+import time
+from typing import Iterable
+
+from llama_index.core.schema import BaseNode, MetadataMode
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+
+
+class BulkIngestor:
+    """
+    Embeds and upserts nodes through a bounded three stage pipeline:
+
+    parse -> embed (``embed_concurrency`` workers, ``embed_batch_size`` nodes
+    per Ollama call) -> upsert (batches of ``upsert_batch_size`` points).
+
+    Queues between the stages hold at most ``queue_size`` batches, so a slow
+    stage applies backpressure instead of buffering the whole corpus, and
+    upserts run while later batches are still being embedded.
+    """
+
+    def __init__(
+        self,
+        embed_model,
+        vector_store,
+        embed_batch_size: int = 32,
+        embed_concurrency: int = 4,
+        upsert_batch_size: int = 256,
+        queue_size: int = 8,
+        progress_interval: float = 10.0,
+    ):
+        self.embed_model = embed_model
+        self.vector_store = vector_store
+        self.embed_batch_size = embed_batch_size
+        self.embed_concurrency = embed_concurrency
+        self.upsert_batch_size = upsert_batch_size
+        self.queue_size = queue_size
+        self.progress_interval = progress_interval
+
+    def _batches(self, nodes: Iterable[BaseNode]):
+        """
+        Groups nodes into numbered embedding batches and counts the source rows
+        in each. Chunks of one row are contiguous and never split across
+        batches, so a committed batch always covers whole rows.
+        """
+        batch, rows, last_doc, seq = [], 0, None, 0
+        for node in nodes:
+            if node.ref_doc_id != last_doc:
+                if len(batch) >= self.embed_batch_size:
+                    yield seq, batch, rows
+                    batch, rows, seq = [], 0, seq + 1
+                rows += 1
+                last_doc = node.ref_doc_id
+            batch.append(node)
+        if batch:
+            yield seq, batch, rows
+
+    def run(self, nodes: Iterable[BaseNode], on_commit=None) -> dict:
+        """
+        Runs the pipeline over ``nodes``, which may be a lazy iterator.
+
+        Args:
+            nodes: Nodes to embed and upsert, grouped by source row.
+            on_commit: Optional callback receiving the number of leading rows
+                that are fully upserted, e.g. to checkpoint a resumable load.
+
+        Returns:
+            Ingestion stats (rows, vectors and elapsed seconds).
+        """
+        embed_queue = queue.Queue(maxsize=self.queue_size)
+        upsert_queue = queue.Queue(maxsize=self.queue_size)
+        stop = threading.Event()
+        errors = []
+        stats = {"rows": 0, "vectors": 0, "seconds": 0.0}
+        started = time.perf_counter()
+
+        def put(q, item):
+            while not stop.is_set():
+                try:
+                    q.put(item, timeout=0.5)
+                    return
+                except queue.Full:
+                    continue
+
+        def get(q):
+            while not stop.is_set():
+                try:
+                    return q.get(timeout=0.5)
+                except queue.Empty:
+                    continue
+            return _DONE
+
+        def embed_worker():
+            try:
+                while True:
+                    item = get(embed_queue)
+                    if item is _DONE:
+                        break
+                    seq, batch, rows = item
+                    texts = [
+                        n.get_content(metadata_mode=MetadataMode.EMBED) for n in batch
+                    ]
+                    vectors = self.embed_model.get_text_embedding_batch(texts)
+                    for node, vector in zip(batch, vectors):
+                        node.embedding = vector
+                    put(upsert_queue, (seq, batch, rows))
+            except Exception as e:
+                errors.append(e)
+                stop.set()
+            finally:
+                put(upsert_queue, _DONE)
+
+        def upsert_worker():
+            pending, pending_batches = [], {}
+            # Batches finish out of order; only the contiguous prefix counts
+            # as committed for on_commit.
+            finished_batches, next_seq, committed = {}, 0, 0
+            finished = 0
+            last_report = time.perf_counter()
+
+            def flush():
+                nonlocal pending, pending_batches, next_seq, committed
+                if not pending:
+                    return
+                self.vector_store.add(pending)
+                stats["vectors"] += len(pending)
+                stats["rows"] += sum(pending_batches.values())
+                finished_batches.update(pending_batches)
+                pending, pending_batches = [], {}
+                advanced = False
+                while next_seq in finished_batches:
+                    committed += finished_batches.pop(next_seq)
+                    next_seq += 1
+                    advanced = True
+                if advanced and on_commit is not None:
+                    on_commit(committed)
+
+            try:
+                while finished < self.embed_concurrency:
+                    item = get(upsert_queue)
+                    if item is _DONE:
+                        if stop.is_set():
+                            break
+                        finished += 1
+                        continue
+                    seq, batch, rows = item
+                    pending.extend(batch)
+                    pending_batches[seq] = rows
+                    if len(pending) >= self.upsert_batch_size:
+                        flush()
+                    now = time.perf_counter()
+                    if now - last_report >= self.progress_interval:
+                        self._report(stats, now - started)
+                        last_report = now
+                if not stop.is_set():
+                    flush()
+            except Exception as e:
+                errors.append(e)
+                stop.set()
+
+        workers = [
+            threading.Thread(target=embed_worker, daemon=True)
+            for _ in range(self.embed_concurrency)
+        ]
+        upserter = threading.Thread(target=upsert_worker, daemon=True)
+        for worker in workers:
+            worker.start()
+        upserter.start()
+
+        try:
+            for item in self._batches(nodes):
+                if stop.is_set():
+                    break
+                put(embed_queue, item)
+        except Exception as e:
+            errors.append(e)
+            stop.set()
+        finally:
+            for _ in workers:
+                put(embed_queue, _DONE)
+            for worker in workers:
+                worker.join()
+            upserter.join()
+
+        if errors:
+            raise errors[0]
+
+        stats["seconds"] = time.perf_counter() - started
+        self._report(stats, stats["seconds"], final=True)
+        return stats
+
+    @staticmethod
+    def _report(stats: dict, elapsed: float, final: bool = False):
+        elapsed = max(elapsed, 1e-9)
+        logger.info(
+            "%s %d rows, %d vectors in %.1fs (%.1f rows/s, %.1f vectors/s)",
+            "Ingested" if final else "Ingesting:",
+            stats["rows"],
+            stats["vectors"],
+            elapsed,
+            stats["rows"] / elapsed,
+            stats["vectors"] / elapsed,
+        )
@@ -1,43 +1,105 @@
+import hashlib
+import json
+import uuid
+from itertools import islice
+
 import pandas as pd
 from llama_index.core import Document
 from llama_index.core.node_parser import SentenceSplitter
 
+from src.pipeline.doc_schema import DocSchema
+
+# Namespace for deterministic movie and chunk ids
+MOVIE_NAMESPACE = uuid.UUID("6f1c8a52-3c1e-4b9e-9a57-2d0f3c0f6d11")
+HASH_KEY = "content_hash"
+
+
+def movie_id(record: dict) -> str:
+    key = f"{record['Series_Title']}|{record['Released_Year']}|{record['Director']}"
+    return str(uuid.uuid5(MOVIE_NAMESPACE, key))
+
+
+def chunk_id(i: int, doc) -> str:
+    return str(uuid.uuid5(MOVIE_NAMESPACE, f"{doc.id_}:{i}"))
+
+
+def content_hash(text: str, metadata: dict) -> str:
+    payload = json.dumps([text, metadata], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
 
 class Process_doc:
     def __init__(
-        self, file_path: str = None, chunk_size: int = 1024, chunk_overlap: int = 200
+        self,
+        file_path: str = None,
+        chunk_size: int = 1024,
+        chunk_overlap: int = 200,
+        chunk_rows: int = 1000,
+        schema: DocSchema = None,
     ):
         self.path = file_path
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
+        self.chunk_rows = chunk_rows
+        self.schema = schema or DocSchema()
+
+    def record_to_doc(self, record: dict) -> Document:
+        values = self.schema.normalize(record)
+        text = self.schema.text(values)
+        metadata = self.schema.metadata(values)
+        excluded_embed = self.schema.excluded_embed_keys(metadata) + [HASH_KEY]
+        excluded_llm = self.schema.excluded_llm_keys(metadata) + [HASH_KEY]
+        metadata[HASH_KEY] = content_hash(text, metadata)
+        return Document(
+            id_=movie_id(record),
+            text=text,
+            metadata=metadata,
+            excluded_embed_metadata_keys=excluded_embed,
+            excluded_llm_metadata_keys=excluded_llm,
+        )
 
     def csv_to_doc(self, file_path=None):
-        path = file_path or self.path
-        df = pd.read_csv(path)
-        records = df.to_dict(orient="records")
-        documents = [
-            Document(
-                text=str(t),
-                metadata={
-                    "Genre": t["Genre"],
-                    "Director": t["Director"],
-                    "Released_Year": t["Released_Year"],
-                },
-            )
-            for t in records
-        ]
+        documents = list(self.iter_docs(file_path))
         return documents
 
+    def iter_docs(self, file_path=None, start_row: int = 0):
+        """
+        Lazily reads the CSV ``chunk_rows`` rows at a time, so memory stays
+        bounded regardless of file size.
+
+        Args:
+            file_path: CSV to read, defaults to the configured path.
+            start_row: Number of data rows to skip, to resume an interrupted
+                load.
+        """
+        path = file_path or self.path
+        reader = pd.read_csv(
+            path,
+            chunksize=self.chunk_rows,
+            skiprows=lambda i: 0 < i <= start_row,
+        )
+        for frame in reader:
+            for record in frame.to_dict(orient="records"):
+                yield self.record_to_doc(record)
+
+    def iter_nodes(self, documents):
+        parser = self.parser()
+        documents = iter(documents)
+        while batch := list(islice(documents, self.chunk_rows)):
+            yield from parser.get_nodes_from_documents(batch)
+
     def parser(self):
 
         node_parser = SentenceSplitter(
             chunk_size=self.chunk_size,
             chunk_overlap=self.chunk_overlap,
+            id_func=chunk_id,
         )
         return node_parser
 
     def run(self, documents: list[Document] = None):
-        documents = documents or self.csv_to_doc(self.path)
+        if documents is None:
+            documents = self.csv_to_doc(self.path)
         parser = self.parser()
         nodes = parser.get_nodes_from_documents(documents)
         return nodes
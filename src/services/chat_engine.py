@@ -1,23 +1,41 @@
 from llama_index.core.chat_engine import ContextChatEngine
 
-from src.config.load_config import load_config
 from src.core.chat_store import chat_mem
-from src.core.indexing import Indexer
-from src.core.llm_model import llm_model
+from src.core.filters import build_filters
+from src.core.table_retriever import TableRetriever
+from src.services.resources import Resources, get_resources
 from src.utils.prompt_instruction import prompt_template
 
-config = load_config()
 
+def chat_engine(user_id, resources: Resources = None, filters=None, mode=None):
+    resources = resources or get_resources()
 
-indexer = Indexer(indexer_config=config.indexer_config()).get_index()
+    retriever = resources.retriever
+    metadata_filters = build_filters(filters)
+    if metadata_filters is not None or mode is not None:
+        retriever = resources.indexer.as_retriever(
+            top_k=2, filters=metadata_filters, mode=mode
+        )
+    if resources.query_router is not None:
+        retriever = TableRetriever(
+            retriever, resources.movie_table, resources.query_router, filters=filters
+        )
 
-
-def chat_engine(user_id):
+    postprocessors = []
+    if resources.context_packer is not None:
+        postprocessors.append(resources.context_packer)
 
     chat_engine = ContextChatEngine(
-        retriever=indexer.as_retriever(),
-        llm=llm_model(),
-        memory=chat_mem(user_id),
+        retriever=retriever,
+        llm=resources.llm,
+        memory=chat_mem(
+            user_id,
+            resources.chat_store,
+            resources.llm,
+            resources.memory_config,
+            lane=resources.chat_lane,
+        ),
+        node_postprocessors=postprocessors,
         prefix_messages=[],
         context_template=prompt_template,
     )
@@ -0,0 +1,198 @@
+import atexit
+import json
+import logging
+import threading
+import time
+
+import requests
+
+from src.config.load_config import AppConfig, load_config
+from src.services.scheduler import FairLane
+from src.utils.metrics import timed
+
+logger = logging.getLogger(__name__)
+
+
+class Resources:
+    """
+    Heavy handles shared by every request in the process: the index and its
+    retriever, the LLM client and the chat store. Requests only bind a
+    per-user memory view on top of these.
+    """
+
+    def __init__(self, config: AppConfig):
+        # Deferred so importing the API does not load the clients
+        from src.core.chat_store import chat_store
+        from src.core.context_packer import ContextPacker
+        from src.core.indexing import Indexer
+        from src.core.llm_model import llm_model
+        from src.core.movie_table import MovieTable
+        from src.core.neighbors import NeighborTable
+        from src.core.query_router import QueryRouter
+        from src.core.semantic_cache import SemanticCache
+        from src.pipeline.doc_schema import DocSchema
+
+        self.config = config
+        self.indexer = Indexer(indexer_config=config.indexer_config())
+        self.index = self.indexer.get_index()
+        self.retriever = self.indexer.as_retriever(top_k=2)
+        self.llm = llm_model(config.llm_config())
+        self.memory_config = config.memory_config()
+        self.chat_store = chat_store(
+            config.postgres_config(),
+            max_conversations=self.memory_config["cache_size"],
+            flush_interval=self.memory_config["flush_interval"],
+            backend=self.memory_config["backend"],
+        )
+        # Write back buffered chat history when the process exits
+        atexit.register(self.chat_store.close)
+        context_config = config.context_config()
+        self.context_packer = None
+        if context_config["enabled"]:
+            self.context_packer = ContextPacker(
+                token_budget=context_config["token_budget"]
+            )
+        self.cache_config = config.cache_config()
+        self.semantic_cache = SemanticCache(
+            threshold=self.cache_config["threshold"],
+            max_entries=self.cache_config["max_entries"],
+            ttl=self.cache_config["ttl"],
+        )
+        self.indexer.on_change(self.semantic_cache.clear)
+        table_config = config.table_config()
+        self.movie_table = None
+        self.query_router = None
+        if table_config["enabled"]:
+            indexer_config = config.indexer_config()
+            self.movie_table = MovieTable(
+                indexer_config["file_path"],
+                schema=DocSchema(indexer_config["doc_template"]),
+                max_rows=table_config["max_rows"],
+            )
+            self.query_router = QueryRouter(self.movie_table)
+            # The table is read from the same CSV as the index
+            self.indexer.on_change(self.movie_table.reload)
+        neighbors_config = config.neighbors_config()
+        self.neighbor_table = None
+        if neighbors_config["enabled"]:
+            self.neighbor_table = NeighborTable(
+                neighbors_config["path"],
+                k=neighbors_config["k"],
+                block_size=neighbors_config["block_size"],
+            )
+            self.refresh_neighbors()
+            self.indexer.on_change(self.refresh_neighbors)
+        # Generations and searches are admitted separately, so searches never
+        # queue behind generations
+        scheduler_config = config.scheduler_config()
+        self.chat_lane = FairLane(
+            "chat",
+            concurrency=scheduler_config["llm_concurrency"],
+            queue_size=scheduler_config["llm_queue_size"],
+            max_wait=scheduler_config["llm_max_wait"],
+            user_queue_size=scheduler_config["llm_user_queue_size"],
+        )
+        self.search_lane = FairLane(
+            "search",
+            concurrency=scheduler_config["search_concurrency"],
+            queue_size=scheduler_config["search_queue_size"],
+            max_wait=scheduler_config["search_max_wait"],
+        )
+
+    def refresh_neighbors(self):
+        """
+        Updates the similar-movies table from the stored vectors, only the
+        movies that changed since it was saved are recomputed.
+        """
+        from src.core.neighbors import MovieVectors
+
+        try:
+            self.neighbor_table.refresh(MovieVectors(self.indexer.iter_vectors()))
+        except Exception as e:
+            logger.error(f"Refreshing similar movies failed: {str(e)}")
+
+    def warm_up(self):
+        """
+        Primes the connections and models so the first request does not pay
+        for them: embeds a probe query, runs one search and asks Ollama to
+        load the LLM and keep it resident.
+
+        It runs before the resources are marked ready, while the API still
+        answers 503, so it cannot compete with admitted generations for an
+        LLM slot.
+        """
+        startup_config = self.config.startup_config()
+        with timed("warm_up_search"):
+            self.indexer.retrieve("warm up", top_k=1)
+
+        llm_config = self.config.llm_config()
+        # A generate request without a prompt only loads the model
+        data = {
+            "model": llm_config["llm_model"],
+            "keep_alive": startup_config["keep_alive"],
+        }
+        with timed("warm_up_llm"):
+            response = requests.post(
+                f"{llm_config['ollama_api']}/api/generate",
+                data=json.dumps(data),
+                timeout=llm_config["request_timeout"],
+            )
+        if response.status_code != 200:
+            logger.error(f"LLM warm-up failed {response.status_code}: {response.text}")
+
+    def close(self):
+        self.chat_store.close()
+
+
+_resources = None
+_lock = threading.Lock()
+_ready = threading.Event()
+_error = None
+
+
+def get_resources(config: AppConfig = None) -> Resources:
+    global _resources, _error
+    if _resources is None:
+        with _lock:
+            if _resources is None:
+                logger.info("Building shared resources")
+                started = time.perf_counter()
+                try:
+                    _resources = Resources(config or load_config())
+                except Exception as e:
+                    _error = e
+                    raise
+                _error = None
+                logger.info(
+                    f"Shared resources ready in {time.perf_counter() - started:.1f}s"
+                )
+    return _resources
+
+
+def init_resources(config: AppConfig = None) -> Resources:
+    """
+    Builds the shared resources and runs the optional warm-up. Called once
+    from the app lifespan, off the event loop.
+    """
+    config = config or load_config()
+    resources = get_resources(config)
+    if config.startup_config()["warm_up"]:
+        try:
+            resources.warm_up()
+        except Exception as e:
+            logger.error(f"Warm-up failed: {str(e)}")
+    _ready.set()
+    return resources
+
+
+def resources_ready() -> bool:
+    return _ready.is_set()
+
+
+def resources_error():
+    return _error
+
+
+def close_resources():
+    if _resources is not None:
+        _resources.close()
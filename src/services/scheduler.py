@@ -0,0 +1,173 @@
+import asyncio
+import logging
+import math
+import time
+from collections import OrderedDict, deque
+
+from prometheus_client import Counter, Gauge, Histogram
+
+logger = logging.getLogger(__name__)
+
+LANE_ACTIVE = Gauge("rag_lane_active", "Requests holding a slot", ["lane"])
+LANE_QUEUED = Gauge("rag_lane_queued", "Requests waiting for a slot", ["lane"])
+LANE_REJECTED = Counter(
+    "rag_lane_rejected", "Requests rejected by admission control", ["lane", "reason"]
+)
+LANE_WAIT_SECONDS = Histogram(
+    "rag_lane_wait_seconds",
+    "Time spent waiting for a slot",
+    ["lane"],
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, status_code: int, detail: str, retry_after: int):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class Lease:
+    """A granted slot. ``release()`` is idempotent."""
+
+    def __init__(self, lane: "FairLane"):
+        self._lane = lane
+        self._released = False
+        self.started = time.monotonic()
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self._lane._release(self)
+
+
+class FairLane:
+    """
+    Admission control for one class of work (e.g. LLM generations).
+
+    At most ``concurrency`` requests run at once. Others wait in per-user
+    queues that are served round-robin, so a user sending many requests only
+    gets one turn per round. Requests are rejected up front instead of
+    queueing when:
+
+    - the lane already has ``queue_size`` waiters (503),
+    - the user already has ``user_queue_size`` waiters (429),
+    - the expected wait, from the average service time, exceeds ``max_wait``
+      (503).
+
+    A waiter that is still queued after ``max_wait`` seconds is rejected too
+    (503). Rejections carry a ``Retry-After`` estimate.
+
+    The lane is used from one event loop and is not thread-safe.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        concurrency: int,
+        queue_size: int,
+        max_wait: float,
+        user_queue_size: int = None,
+    ):
+        self.name = name
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.max_wait = max_wait
+        self.user_queue_size = user_queue_size
+        self._active = 0
+        self._queued = 0
+        self._queues = OrderedDict()
+        self._service_time = None
+
+    def _expected_wait(self, position: int):
+        if self._service_time is None:
+            return None
+        return position * self._service_time / self.concurrency
+
+    def _retry_after(self) -> int:
+        expected = self._expected_wait(self._queued + 1)
+        return max(1, math.ceil(expected if expected is not None else 1))
+
+    def _reject(self, status_code: int, reason: str, detail: str):
+        LANE_REJECTED.labels(self.name, reason).inc()
+        raise AdmissionRejected(status_code, detail, self._retry_after())
+
+    def _grant(self) -> Lease:
+        self._active += 1
+        LANE_ACTIVE.labels(self.name).set(self._active)
+        return Lease(self)
+
+    def _release(self, lease: Lease):
+        self._active -= 1
+        LANE_ACTIVE.labels(self.name).set(self._active)
+        elapsed = time.monotonic() - lease.started
+        if self._service_time is None:
+            self._service_time = elapsed
+        else:
+            self._service_time = 0.8 * self._service_time + 0.2 * elapsed
+        self._dispatch()
+
+    def _dispatch(self):
+        while self._active < self.concurrency and self._queues:
+            user_id, queue = next(iter(self._queues.items()))
+            waiter = queue.popleft()
+            self._queued -= 1
+            if queue:
+                self._queues.move_to_end(user_id)
+            else:
+                del self._queues[user_id]
+            if not waiter.done():
+                waiter.set_result(self._grant())
+        LANE_QUEUED.labels(self.name).set(self._queued)
+
+    def _remove(self, user_id: str, waiter: asyncio.Future):
+        queue = self._queues.get(user_id)
+        if queue is None or waiter not in queue:
+            return
+        queue.remove(waiter)
+        self._queued -= 1
+        if not queue:
+            del self._queues[user_id]
+        LANE_QUEUED.labels(self.name).set(self._queued)
+
+    async def acquire(self, user_id: str = "anonymous") -> Lease:
+        if self._active < self.concurrency and not self._queued:
+            LANE_WAIT_SECONDS.labels(self.name).observe(0)
+            return self._grant()
+
+        if self._queued >= self.queue_size:
+            self._reject(503, "queue_full", "Server is busy, try again later")
+        queue = self._queues.get(user_id)
+        if self.user_queue_size and queue and len(queue) >= self.user_queue_size:
+            self._reject(429, "user_limit", "Too many concurrent requests")
+        expected = self._expected_wait(self._queued + 1)
+        if expected is not None and expected > self.max_wait:
+            self._reject(503, "deadline", "Server is busy, try again later")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._queues.setdefault(user_id, deque()).append(waiter)
+        self._queued += 1
+        LANE_QUEUED.labels(self.name).set(self._queued)
+        started = time.monotonic()
+        try:
+            lease = await asyncio.wait_for(waiter, timeout=self.max_wait)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # Granted while we gave up, hand the slot on
+                waiter.result().release()
+            self._remove(user_id, waiter)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            self._reject(503, "timeout", "Timed out waiting for capacity")
+        LANE_WAIT_SECONDS.labels(self.name).observe(time.monotonic() - started)
+        return lease
+
+    def stats(self) -> dict:
+        return {
+            "active": self._active,
+            "queued": self._queued,
+            "users_waiting": len(self._queues),
+            "service_time": self._service_time,
+        }
@@ -0,0 +1,28 @@
+from functools import partial
+
+import anyio
+import anyio.to_thread
+
+from src.config.load_config import load_config
+
+config = load_config().server_config()
+
+_limiter = None
+
+
+def blocking_limiter() -> anyio.CapacityLimiter:
+    # Created lazily so it binds to the running event loop.
+    global _limiter
+    if _limiter is None:
+        _limiter = anyio.CapacityLimiter(config["blocking_threads"])
+    return _limiter
+
+
+async def run_blocking(func, *args, **kwargs):
+    """
+    Runs a synchronous callable on the bounded worker pool so it cannot stall
+    the event loop or exhaust the default thread pool shared with FastAPI.
+    """
+    return await anyio.to_thread.run_sync(
+        partial(func, *args, **kwargs), limiter=blocking_limiter()
+    )
@@ -0,0 +1,278 @@
+import contextvars
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import Counter as StackCounter
+from contextlib import contextmanager
+from typing import Any, Optional
+
+from llama_index.core.instrumentation import get_dispatcher
+from llama_index.core.instrumentation.span.simple import SimpleSpan
+from llama_index.core.instrumentation.span_handlers import BaseSpanHandler
+from prometheus_client import Counter, Gauge, Histogram
+
+logger = logging.getLogger(__name__)
+
+STAGE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+STAGE_SECONDS = Histogram(
+    "rag_stage_seconds",
+    "Time spent in each request stage",
+    ["stage"],
+    buckets=STAGE_BUCKETS,
+)
+REQUEST_SECONDS = Histogram(
+    "rag_request_seconds",
+    "Time to the end of the response, per route",
+    ["method", "route", "status"],
+    buckets=STAGE_BUCKETS + (30, 60),
+)
+CHAT_TTFT_SECONDS = Histogram(
+    "rag_chat_ttft_seconds",
+    "Time from request to the first streamed token",
+    buckets=STAGE_BUCKETS + (30,),
+)
+CHAT_TOKENS_PER_SECOND = Histogram(
+    "rag_chat_tokens_per_second",
+    "Generation speed of streamed answers after the first token",
+    buckets=(1, 2, 5, 10, 20, 30, 50, 75, 100, 200),
+)
+CHAT_TOKENS = Counter("rag_chat_tokens", "Tokens streamed to clients")
+ACTIVE_STREAMS = Gauge("rag_active_streams", "Chat streams currently open")
+CACHE_REQUESTS = Counter(
+    "rag_cache_requests", "Cache lookups by cache and result", ["cache", "result"]
+)
+
+# Stage durations of the current request, in seconds, for Server-Timing
+_timings: contextvars.ContextVar[Optional[dict]] = contextvars.ContextVar(
+    "request_timings", default=None
+)
+
+
+def record(stage: str, seconds: float):
+    STAGE_SECONDS.labels(stage).observe(seconds)
+    timings = _timings.get()
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+
+@contextmanager
+def timed(stage: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - started)
+
+
+def cache_result(cache: str, hit: bool):
+    CACHE_REQUESTS.labels(cache, "hit" if hit else "miss").inc()
+
+
+def start_request_timings() -> dict:
+    timings = {}
+    _timings.set(timings)
+    return timings
+
+
+def current_timings() -> dict:
+    return dict(_timings.get() or {})
+
+
+def server_timing_header(timings: dict, total: float = None) -> str:
+    entries = [f"{stage};dur={sec * 1000:.1f}" for stage, sec in timings.items()]
+    if total is not None:
+        entries.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(entries)
+
+
+# Stages of the llama-index internals, by instrumented method name
+SPAN_STAGES = {
+    "get_query_embedding": "embed_query",
+    "aget_query_embedding": "embed_query",
+    "get_text_embedding_batch": "embed_documents",
+    "aget_text_embedding_batch": "embed_documents",
+    "retrieve": "retrieve",
+    "aretrieve": "retrieve",
+    "postprocess_nodes": "context_pack",
+    "apostprocess_nodes": "context_pack",
+}
+
+
+class StageSpanHandler(BaseSpanHandler[SimpleSpan]):
+    """
+    Times llama-index spans (query embedding, retrieval, postprocessing) that
+    run inside the chat engine. A span nested in a span of the same stage,
+    e.g. a cached embedding calling the wrapped model, is not counted twice.
+    """
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "StageSpanHandler"
+
+    def new_span(
+        self,
+        id_: str,
+        bound_args: Any,
+        instance: Optional[Any] = None,
+        parent_span_id: Optional[str] = None,
+        tags: Optional[dict] = None,
+        **kwargs: Any,
+    ) -> Optional[SimpleSpan]:
+        method = id_.split("-", 1)[0].rsplit(".", 1)[-1]
+        stage = SPAN_STAGES.get(method)
+        if stage is None:
+            return None
+        parent = self.open_spans.get(parent_span_id) if parent_span_id else None
+        if parent is not None and parent.tags.get("stage") == stage:
+            return None
+        return SimpleSpan(
+            id_=id_,
+            parent_id=parent_span_id,
+            tags={"stage": stage, "started": time.perf_counter()},
+        )
+
+    def prepare_to_exit_span(
+        self,
+        id_: str,
+        bound_args: Any,
+        instance: Optional[Any] = None,
+        result: Optional[Any] = None,
+        **kwargs: Any,
+    ) -> Optional[SimpleSpan]:
+        span = self.open_spans.get(id_)
+        if span is not None:
+            record(span.tags["stage"], time.perf_counter() - span.tags["started"])
+        return span
+
+    def prepare_to_drop_span(
+        self,
+        id_: str,
+        bound_args: Any,
+        instance: Optional[Any] = None,
+        err: Optional[BaseException] = None,
+        **kwargs: Any,
+    ) -> Optional[SimpleSpan]:
+        return self.open_spans.get(id_)
+
+
+_span_handler = None
+
+
+def instrument_llama_index():
+    global _span_handler
+    if _span_handler is None:
+        _span_handler = StageSpanHandler()
+        get_dispatcher().add_span_handler(_span_handler)
+
+
+class ServerTimingMiddleware:
+    """
+    ASGI middleware that collects stage timings per request, adds them as a
+    ``Server-Timing`` header and observes the request duration per route.
+
+    Streaming responses send their headers before the work is done, so they
+    only carry the stages finished by then; chat streams end with a timing
+    frame instead.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        started = time.perf_counter()
+        timings = start_request_timings()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                total = time.perf_counter() - started
+                header = server_timing_header(timings, total)
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"server-timing", header.encode("latin-1"))
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            route = scope.get("route")
+            REQUEST_SECONDS.labels(
+                scope["method"],
+                getattr(route, "path", "unmatched"),
+                str(status),
+            ).observe(time.perf_counter() - started)
+
+
+class SamplingProfiler:
+    """
+    Low overhead wall-clock profiler that samples the stack of every thread
+    every ``interval`` seconds while it runs. Results are folded stacks
+    (``frame;frame;frame count``), the input format of flame graph tools.
+    """
+
+    def __init__(self):
+        self._stacks = StackCounter()
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self.interval = 0.01
+        self.started_at = None
+        self.samples = 0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval: float = 0.01):
+        with self._lock:
+            if self.running:
+                return
+            self._stacks.clear()
+            self.samples = 0
+            self.interval = interval
+            self.started_at = time.time()
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, name="sampling-profiler", daemon=True
+            )
+            self._thread.start()
+        logger.info(f"Sampling profiler started, interval {interval * 1000:.1f}ms")
+
+    def stop(self) -> str:
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread is not None:
+            self._stop.set()
+            thread.join()
+            logger.info(f"Sampling profiler stopped after {self.samples} samples")
+        return self.folded()
+
+    def folded(self) -> str:
+        return "\n".join(
+            f"{stack} {count}" for stack, count in self._stacks.most_common()
+        )
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                stack = ";".join(
+                    f"{entry.name} ({entry.filename}:{entry.lineno})"
+                    for entry in traceback.extract_stack(frame)
+                )
+                self._stacks[stack] += 1
+            self.samples += 1
+
+
+profiler = SamplingProfiler()
@@ -0,0 +1,86 @@
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Hashable
+
+from prometheus_client import Counter
+
+SINGLE_FLIGHT_REQUESTS = Counter(
+    "rag_single_flight_requests",
+    "Calls through a single-flight group, by whether they ran the work "
+    "(leader) or shared an in-flight result (coalesced)",
+    ["flight", "role"],
+)
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls with the same key into one execution.
+
+    The first caller for a key runs the work; callers arriving while it is in
+    flight wait for it and receive the same result or exception. Nothing is
+    kept after the call completes, this is not a cache.
+
+    Async work runs in its own task, so a cancelled leader (e.g. a client
+    that disconnected) does not fail the callers sharing its result.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._tasks = {}
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._leaders = 0
+        self._coalesced = 0
+
+    def _count(self, coalesced: bool):
+        role = "coalesced" if coalesced else "leader"
+        SINGLE_FLIGHT_REQUESTS.labels(self.name, role).inc()
+        with self._lock:
+            if coalesced:
+                self._coalesced += 1
+            else:
+                self._leaders += 1
+
+    async def ado(self, key: Hashable, func: Callable[[], Awaitable[Any]]):
+        loop = asyncio.get_running_loop()
+        # Tasks are bound to their loop, keep one table per loop
+        flight_key = (id(loop), key)
+        task = self._tasks.get(flight_key)
+        self._count(coalesced=task is not None)
+        if task is None:
+            task = loop.create_task(func())
+            self._tasks[flight_key] = task
+            task.add_done_callback(lambda _: self._tasks.pop(flight_key, None))
+        return await asyncio.shield(task)
+
+    def do(self, key: Hashable, func: Callable[[], Any]):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = {"done": threading.Event()}
+        self._count(coalesced=not leader)
+        if not leader:
+            call["done"].wait()
+            if "error" in call:
+                raise call["error"]
+            return call["result"]
+
+        try:
+            call["result"] = func()
+            return call["result"]
+        except BaseException as e:
+            call["error"] = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call["done"].set()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "leaders": self._leaders,
+                "coalesced": self._coalesced,
+                "in_flight": len(self._tasks) + len(self._calls),
+            }
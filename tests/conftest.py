@@ -0,0 +1,28 @@
+import pytest
+from llama_index.core import MockEmbedding
+
+from src.core.indexing import Indexer
+
+DIM = 8
+
+
+def indexer_config(tmp_path, collection="movies", **overrides):
+    config = {
+        "vector_store": "numpy",
+        "numpy_store_path": str(tmp_path / "numpy_store"),
+        "collection_name": collection,
+        "file_path": str(tmp_path / "movies.csv"),
+    }
+    config.update(overrides)
+    return config
+
+
+@pytest.fixture
+def make_indexer(tmp_path):
+    def make(collection="movies", **overrides):
+        return Indexer(
+            indexer_config=indexer_config(tmp_path, collection, **overrides),
+            embed_model=MockEmbedding(embed_dim=DIM),
+        )
+
+    return make
@@ -0,0 +1,62 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from llama_index.core.base.llms.types import ChatMessage
+from sqlalchemy import create_engine, select
+
+from src.core.chat_store import WriteBehindChatStore, chat_table
+
+
+@pytest.fixture
+def database(tmp_path):
+    # The Postgres upsert compiles to the same ON CONFLICT clause on SQLite
+    return f"sqlite:///{tmp_path / 'chat.db'}"
+
+
+def message(content):
+    return ChatMessage(role="user", content=content)
+
+
+def persisted(url, key):
+    with create_engine(url).connect() as conn:
+        row = conn.execute(
+            select(chat_table.c.value).where(chat_table.c.key == key)
+        ).first()
+    return [m["blocks"][0]["text"] for m in row[0]] if row else None
+
+
+def test_writes_are_visible_before_flush_and_survive_close(database):
+    store = WriteBehindChatStore(engine=create_engine(database), flush_interval=60)
+    store.add_message("user", message("hello"))
+    store.add_message("user", message("again"))
+
+    assert [m.content for m in store.get_messages("user")] == ["hello", "again"]
+    assert persisted(database, "user") is None
+
+    store.close()
+
+    assert persisted(database, "user") == ["hello", "again"]
+    reopened = WriteBehindChatStore(engine=create_engine(database))
+    assert [m.content for m in reopened.get_messages("user")] == ["hello", "again"]
+    reopened.close()
+
+
+def test_concurrent_add_message_keeps_every_write(database):
+    store = WriteBehindChatStore(
+        engine=create_engine(database), max_conversations=1, flush_interval=0.01
+    )
+    contents = [f"{key}-{i}" for key in ("a", "b") for i in range(50)]
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(
+            pool.map(
+                lambda content: store.add_message(content[0], message(content)),
+                contents,
+            )
+        )
+    store.close()
+
+    for key in ("a", "b"):
+        expected = {c for c in contents if c.startswith(key)}
+        assert set(persisted(database, key)) == expected
+        assert len(persisted(database, key)) == len(expected)
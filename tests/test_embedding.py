@@ -0,0 +1,57 @@
+import asyncio
+from types import SimpleNamespace
+
+from llama_index.core import MockEmbedding
+
+from src.core.embedded_model import BatchOllamaEmbedding
+
+from .conftest import DIM
+
+
+class CountingEmbedding(MockEmbedding):
+    query_instruction: str = None
+    calls: list = []
+
+    async def _aget_query_embedding(self, query):
+        self.calls.append(("query", query))
+        return await super()._aget_query_embedding(query)
+
+    async def _aget_text_embeddings(self, texts):
+        self.calls.append(("texts", texts))
+        return [self._get_vector() for _ in texts]
+
+
+def test_batch_ollama_embedding_sends_one_request(monkeypatch):
+    model = BatchOllamaEmbedding(model_name="bge-m3", base_url="http://ollama")
+    requests = []
+
+    async def embed(model, input, options=None):
+        requests.append(input)
+        return SimpleNamespace(embeddings=[[float(i)] * DIM for i in range(len(input))])
+
+    monkeypatch.setattr(model._async_client, "embed", embed)
+    vectors = asyncio.run(model.aget_text_embedding_batch(["a", "b", "c"]))
+
+    assert requests == [["a", "b", "c"]]
+    assert [vector[0] for vector in vectors] == [0.0, 1.0, 2.0]
+
+
+def test_queries_share_one_batch_without_cache(make_indexer):
+    indexer = make_indexer()
+    indexer.embed_model = CountingEmbedding(embed_dim=DIM, calls=[])
+
+    vectors = asyncio.run(indexer.aembed_queries(["a", "b", "c"]))
+
+    assert len(vectors) == 3
+    assert indexer.embed_model.calls == [("texts", ["a", "b", "c"])]
+
+
+def test_queries_with_an_instruction_embed_one_by_one(make_indexer):
+    indexer = make_indexer()
+    indexer.embed_model = CountingEmbedding(
+        embed_dim=DIM, calls=[], query_instruction="query:"
+    )
+
+    asyncio.run(indexer.aembed_queries(["a", "b"]))
+
+    assert sorted(indexer.embed_model.calls) == [("query", "a"), ("query", "b")]
@@ -0,0 +1,43 @@
+import asyncio
+import threading
+
+from llama_index.core import MockEmbedding
+
+from src.core.embedding_cache import CachedEmbedding, DiskEmbeddingCache
+
+from .conftest import DIM
+
+
+def test_async_disk_tier_runs_off_the_event_loop(tmp_path, monkeypatch):
+    path = str(tmp_path / "embeddings.sqlite")
+    CachedEmbedding(MockEmbedding(embed_dim=DIM), disk_path=path).get_query_embedding(
+        "warm"
+    )
+    threads = []
+    for name in ("get", "put_many"):
+        original = getattr(DiskEmbeddingCache, name)
+
+        def record(self, *args, original=original):
+            threads.append(threading.current_thread())
+            return original(self, *args)
+
+        monkeypatch.setattr(DiskEmbeddingCache, name, record)
+    model = CachedEmbedding(MockEmbedding(embed_dim=DIM), disk_path=path)
+
+    async def run():
+        # A disk hit, then a miss stored to disk, then a memory hit
+        await model.aget_query_embedding("warm")
+        await model.aget_query_embedding("cold")
+        await model.aget_query_embedding("cold")
+        return threading.current_thread()
+
+    loop_thread = asyncio.run(run())
+
+    assert len(threads) == 3
+    assert loop_thread not in threads
+    assert model.stats() == {
+        "entries": 2,
+        "memory_hits": 1,
+        "disk_hits": 1,
+        "misses": 1,
+    }
@@ -0,0 +1,61 @@
+import asyncio
+
+from llama_index.core.schema import TextNode
+
+from src.core.numpy_store import NumpyVectorStore
+
+from .conftest import DIM
+
+
+def test_indexer_on_empty_numpy_store(make_indexer):
+    indexer = make_indexer()
+
+    assert isinstance(indexer.vector_store, NumpyVectorStore)
+    assert len(indexer.vector_store) == 0
+    assert indexer.qdrant_client is None
+    assert indexer.dimension() is None
+
+
+def test_indexer_on_missing_read_only_numpy_store(make_indexer):
+    # A read-only worker may start before the writer created the store
+    indexer = make_indexer(numpy_store_read_only=True)
+
+    assert isinstance(indexer.vector_store, NumpyVectorStore)
+    assert indexer.vector_store.read_only
+    assert indexer.get_index() is indexer.index
+
+
+
+def test_index_searches_an_empty_numpy_store_once_filled(make_indexer):
+    indexer = make_indexer()
+    indexer.vector_store.add(
+        [TextNode(text="movie", embedding=[1.0] * DIM, id_="movie-1")]
+    )
+
+    [node] = indexer.retrieve("movie", top_k=1)
+
+    assert node.node.node_id == "movie-1"
+
+
+def test_batch_retrieve_forwards_fusion_on_numpy(make_indexer, monkeypatch):
+    indexer = make_indexer()
+    indexer.vector_store.add(
+        [TextNode(text="movie", embedding=[1.0] * DIM, id_="movie-1")]
+    )
+    calls = []
+    as_retriever = indexer.as_retriever
+
+    def spy(**kwargs):
+        calls.append(kwargs)
+        return as_retriever(**kwargs)
+
+    monkeypatch.setattr(indexer, "as_retriever", spy)
+    items = [{"query": "movie", "top_k": 1, "fusion": "weighted", "alpha": 0.8}]
+
+    async def run():
+        return [result async for result in indexer.abatch_retrieve(items)]
+
+    [(position, nodes)] = asyncio.run(run())
+
+    assert position == 0 and len(nodes) == 1
+    assert calls[0]["fusion"] == "weighted" and calls[0]["alpha"] == 0.8
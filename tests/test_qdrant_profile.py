@@ -0,0 +1,94 @@
+import asyncio
+
+import pytest
+from llama_index.core.schema import TextNode
+from qdrant_client import AsyncQdrantClient, QdrantClient
+from qdrant_client.http.models import Distance, PointStruct, VectorParams
+
+from src.core.qdrant_profile import ProfiledAsyncQdrantClient, search_params
+from src.utils.metrics import current_timings, start_request_timings
+
+from .conftest import DIM
+
+PROFILE = {
+    "prefer_grpc": False,
+    "grpc_port": 6334,
+    "quantization": "none",
+    "pq_compression": "x16",
+    "rescore": True,
+    "oversampling": 2.0,
+    "hnsw_m": 16,
+    "hnsw_ef_construct": 100,
+    "hnsw_ef": 64,
+    "on_disk": False,
+}
+
+
+def spy(monkeypatch, cls, name):
+    calls = []
+    original = getattr(cls, name)
+
+    def record(self, collection_name, *args, **kwargs):
+        calls.append(args[0] if args else kwargs.get("requests", kwargs))
+        return original(self, collection_name, *args, **kwargs)
+
+    monkeypatch.setattr(cls, name, record)
+    return calls
+
+
+def call_params(call) -> list:
+    # ``search`` keyword arguments or a ``search_batch`` request list
+    if isinstance(call, dict):
+        return [call["search_params"]]
+    return [request.params for request in call]
+
+
+@pytest.mark.parametrize(
+    "hybrid, mode, method",
+    [(False, "dense", "search"), (True, "hybrid", "search_batch")],
+)
+def test_profile_reaches_vector_store_queries(
+    make_indexer, monkeypatch, hybrid, mode, method
+):
+    indexer = make_indexer(
+        vector_store="qdrant",
+        vector_db=":memory:",
+        vector_size=DIM,
+        qdrant_profile=PROFILE,
+        hybrid=hybrid,
+    )
+    indexer.vector_store.add(
+        [TextNode(text=f"movie {i}", embedding=[float(i + 1)] * DIM) for i in range(3)]
+    )
+    calls = spy(monkeypatch, QdrantClient, method)
+    start_request_timings()
+
+    assert indexer.retrieve("movie", top_k=2, mode=mode)
+
+    assert calls
+    for call in calls:
+        assert all(params.hnsw_ef == 64 for params in call_params(call))
+    assert "vector_search" in current_timings()
+
+
+def test_async_client_applies_profile(monkeypatch):
+    calls = spy(monkeypatch, AsyncQdrantClient, "search")
+
+    async def run():
+        client = ProfiledAsyncQdrantClient(
+            ":memory:", search_params=search_params(PROFILE)
+        )
+        await client.create_collection(
+            "movies", vectors_config=VectorParams(size=DIM, distance=Distance.COSINE)
+        )
+        await client.upsert(
+            "movies", [PointStruct(id=1, vector=[1.0] * DIM, payload={})]
+        )
+        start_request_timings()
+        await client.search(collection_name="movies", query_vector=[1.0] * DIM)
+        return current_timings()
+
+    timings = asyncio.run(run())
+
+    assert calls[0]["search_params"].hnsw_ef == 64
+    assert "vector_search" in timings
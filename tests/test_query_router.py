@@ -0,0 +1,102 @@
+import csv
+
+import pytest
+from llama_index.core.schema import QueryBundle
+
+from src.core.context_packer import ContextPacker
+from src.core.movie_table import MovieTable
+from src.core.query_router import QueryRouter
+from src.core.table_retriever import TableRetriever
+
+COLUMNS = [
+    "Series_Title",
+    "Released_Year",
+    "Runtime",
+    "Genre",
+    "IMDB_Rating",
+    "Overview",
+    "Director",
+    "Star1",
+    "No_of_Votes",
+    "Gross",
+]
+MOVIES = [
+    ("The Shining", 1980, 146, "Drama, Horror", 8.4, "Stanley Kubrick"),
+    ("2001: A Space Odyssey", 1968, 149, "Adventure, Sci-Fi", 8.3, "Stanley Kubrick"),
+    ("Inception", 2010, 148, "Action, Sci-Fi", 8.8, "Christopher Nolan"),
+    ("Memento", 2000, 113, "Mystery, Thriller", 8.4, "Christopher Nolan"),
+    ("Jaws", 1975, 124, "Adventure, Thriller", 8.0, "Steven Spielberg"),
+    ("Big", 1988, 104, "Comedy, Drama", 7.3, "Penny Marshall"),
+]
+
+
+@pytest.fixture(scope="module")
+def router(tmp_path_factory):
+    path = tmp_path_factory.mktemp("table") / "movies.csv"
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(COLUMNS)
+        for title, year, runtime, genre, rating, director in MOVIES:
+            writer.writerow(
+                [
+                    title,
+                    year,
+                    f"{runtime} min",
+                    genre,
+                    rating,
+                    "An overview",
+                    director,
+                    "Tom Hanks",
+                    100000,
+                    "1,000,000",
+                ]
+            )
+    return QueryRouter(MovieTable(str(path)))
+
+
+@pytest.mark.parametrize(
+    "question, expected",
+    [
+        ("top 10 dramas after 2000", {"genres": ["Drama"], "year_min": 2001}),
+        ("movies by Kubrick", {"directors": ["Stanley Kubrick"]}),
+        ("films from 1994", {"year_min": 1994, "year_max": 1994}),
+        ("What are Nolan's best films?", {"directors": ["Christopher Nolan"]}),
+        ("top 10 movies", {"limit": 10, "sort_by": "rating"}),
+        ("worst 3 horror movies", {"limit": 3, "descending": False}),
+        ("5 comedy movies", {"limit": 5, "genres": ["Comedy"]}),
+        ("sci-fi movies rated above 8 since 2010", {"rating_min": 8.0}),
+    ],
+)
+def test_routes_table_queries(router, question, expected):
+    query = router.route(question)
+
+    assert query is not None
+    assert query.model_dump(include=set(expected)) == expected
+
+
+@pytest.mark.parametrize(
+    "question",
+    [
+        "top 5 movies with Tom Hanks",
+        "I want to watch 2 movies tonight",
+        "top 3 movies starring Al Pacino",
+        "highest rated movies set in Paris",
+        "best movie about redemption",
+        "2 movies",
+    ],
+)
+def test_leaves_other_questions_to_vector_search(router, question):
+    assert router.route(question) is None
+
+
+@pytest.mark.parametrize("token_budget", [60, 1500])
+def test_header_counts_the_packed_rows(router, token_budget):
+    retriever = TableRetriever(None, router.table, router)
+    packer = ContextPacker(token_budget=token_budget)
+    bundle = QueryBundle("Stanley Kubrick and Christopher Nolan movies by year")
+
+    nodes = packer.postprocess_nodes(retriever.retrieve(bundle), bundle)
+
+    header, rows = nodes[0], nodes[1:]
+    assert header.node.node_id == "table-query"
+    assert f"{len(rows)} exact results" in header.node.get_content()
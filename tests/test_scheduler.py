@@ -0,0 +1,84 @@
+import asyncio
+
+import pytest
+
+from src.services.scheduler import AdmissionRejected, FairLane
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+async def queue_up(lane, user_ids):
+    tasks = []
+    for user_id in user_ids:
+        tasks.append(asyncio.create_task(lane.acquire(user_id)))
+        await asyncio.sleep(0)
+    return tasks
+
+
+def test_waiters_are_served_round_robin_across_users():
+    async def run():
+        lane = FairLane("test", concurrency=1, queue_size=10, max_wait=5)
+        holder = await lane.acquire("a")
+        tasks = await queue_up(lane, ["a", "a", "a", "b", "c"])
+        owners = dict(zip(tasks, ["a", "a", "a", "b", "c"]))
+
+        order = []
+        lease = holder
+        for _ in tasks:
+            lease.release()
+            await settle()
+            [granted] = [t for t in owners if t.done()]
+            order.append(owners.pop(granted))
+            lease = granted.result()
+        lease.release()
+        return order
+
+    assert asyncio.run(run()) == ["a", "b", "c", "a", "a"]
+
+
+def test_rejects_when_the_lane_or_the_user_queue_is_full():
+    async def run():
+        lane = FairLane(
+            "test", concurrency=1, queue_size=3, max_wait=5, user_queue_size=2
+        )
+        holder = await lane.acquire("a")
+        tasks = await queue_up(lane, ["a", "a"])
+
+        with pytest.raises(AdmissionRejected) as user_limit:
+            await lane.acquire("a")
+        await queue_up(lane, ["b"])
+        with pytest.raises(AdmissionRejected) as queue_full:
+            await lane.acquire("c")
+
+        stats = lane.stats()
+        holder.release()
+        for task in asyncio.all_tasks() - {asyncio.current_task()}:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        return user_limit.value, queue_full.value, stats
+
+    user_limit, queue_full, stats = asyncio.run(run())
+    assert user_limit.status_code == 429
+    assert queue_full.status_code == 503
+    assert user_limit.retry_after >= 1 and queue_full.retry_after >= 1
+    assert stats["queued"] == 3 and stats["users_waiting"] == 2
+
+
+def test_releasing_a_lease_twice_frees_one_slot():
+    async def run():
+        lane = FairLane("test", concurrency=2, queue_size=10, max_wait=5)
+        first = await lane.acquire("a")
+        await lane.acquire("b")
+        [waiter] = await queue_up(lane, ["c"])
+
+        first.release()
+        first.release()
+        await settle()
+        return lane.stats(), waiter.done()
+
+    stats, granted = asyncio.run(run())
+    assert granted
+    assert stats["active"] == 2 and stats["queued"] == 0
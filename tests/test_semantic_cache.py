@@ -0,0 +1,39 @@
+import numpy as np
+
+from src.core.semantic_cache import SemanticCache
+
+
+def unit(i, dim=8):
+    vector = np.zeros(dim, dtype=np.float32)
+    vector[i] = 1.0
+    return vector
+
+
+def test_store_extends_the_namespace_matrix_in_place():
+    cache = SemanticCache(max_entries=3)
+    cache.store("chat", unit(0), "a")
+    assert cache.lookup("chat", unit(0)) == "a"
+    rows = cache._matrices["chat"]
+
+    cache.store("chat", unit(1), "b")
+    cache.store("search:5", unit(1), "other")
+    cache.store("chat", unit(2), "c")
+
+    assert cache._matrices["chat"] is rows
+    assert cache.lookup("chat", unit(0)) is None
+    assert cache.lookup("chat", unit(1)) == "b"
+    assert cache.lookup("chat", unit(2)) == "c"
+    assert cache.lookup("search:5", unit(1)) == "other"
+    assert sorted(rows.ids) == sorted(
+        k for k, e in cache._entries.items() if e[0] == "chat"
+    )
+
+
+def test_expired_entries_are_skipped_and_removed():
+    cache = SemanticCache(ttl=-1)
+    cache.store("chat", unit(0), "stale")
+    cache.store("chat", unit(1), "stale")
+
+    assert cache.lookup("chat", unit(0)) is None
+    assert cache.stats()["entries"] == 1
+    assert cache._matrices["chat"].ids == [1]
@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+from llama_index.core.schema import NodeRelationship, RelatedNodeInfo, TextNode
+from llama_index.core.vector_stores.utils import metadata_dict_to_node
+
+from src.core.snapshot import export_snapshot, import_snapshot, read_manifest
+
+from .conftest import DIM
+
+BACKENDS = {
+    "numpy": {},
+    "qdrant": {"vector_store": "qdrant", "vector_db": ":memory:", "vector_size": DIM},
+}
+
+
+def movie_nodes(count=5):
+    rng = np.random.default_rng(0)
+    nodes = []
+    for i in range(count):
+        node = TextNode(
+            id_=f"00000000-0000-0000-0000-00000000000{i}",
+            text=f"Title: Movie {i}\nOverview: A story number {i}",
+            metadata={"Series_Title": f"Movie {i}", "Released_Year": 1990 + i},
+            excluded_embed_metadata_keys=["Released_Year"],
+            embedding=rng.standard_normal(DIM).astype(np.float32).tolist(),
+        )
+        node.relationships[NodeRelationship.SOURCE] = RelatedNodeInfo(
+            node_id=f"movie-{i}"
+        )
+        nodes.append(node)
+    return nodes
+
+
+def stored(indexer) -> dict:
+    result = {}
+    for payload, vector in indexer.iter_vectors():
+        node = metadata_dict_to_node(payload)
+        result[node.node_id] = (node, np.asarray(vector, dtype=np.float32))
+    return result
+
+
+@pytest.mark.parametrize("backend", list(BACKENDS))
+def test_snapshot_roundtrip(make_indexer, tmp_path, backend):
+    source = make_indexer(**BACKENDS[backend])
+    source.vector_store.add(movie_nodes())
+    path = str(tmp_path / "snapshot")
+
+    export_snapshot(source, path, model="mock")
+    manifest = read_manifest(path, model="mock")
+    target = make_indexer(
+        "movies_v2", **{**BACKENDS[backend], "vector_size": manifest["dimension"]}
+    )
+    stats = import_snapshot(target, path, manifest)
+
+    assert manifest["count"] == stats["nodes"] == 5
+    expected, actual = stored(source), stored(target)
+    assert actual.keys() == expected.keys()
+    for node_id, (node, vector) in expected.items():
+        restored, restored_vector = actual[node_id]
+        assert restored.get_content() == node.get_content()
+        assert restored.metadata == node.metadata
+        assert restored.excluded_embed_metadata_keys == ["Released_Year"]
+        assert restored.ref_doc_id == node.ref_doc_id
+        np.testing.assert_allclose(restored_vector, vector, rtol=1e-6)
@@ -0,0 +1,108 @@
+import asyncio
+
+from llama_index.core.base.llms.types import (
+    ChatMessage,
+    CompletionResponse,
+    LLMMetadata,
+    MessageRole,
+)
+from llama_index.core.llms import CustomLLM, MockLLM
+from llama_index.core.storage.chat_store import SimpleChatStore
+
+from src.core.chat_store import WriteBehindChatStore, chat_mem
+from src.services.scheduler import FairLane
+
+
+class ScriptedLLM(CustomLLM):
+    """Answers ``summary <n>`` and records the prompts it was given."""
+
+    prompts: list = []
+    during: object = None
+
+    @property
+    def metadata(self) -> LLMMetadata:
+        return LLMMetadata()
+
+    def complete(self, prompt, formatted=False, **kwargs) -> CompletionResponse:
+        self.prompts.append(prompt)
+        if self.during is not None:
+            self.during()
+        return CompletionResponse(text=f"summary {len(self.prompts)}")
+
+    def stream_complete(self, prompt, formatted=False, **kwargs):
+        raise NotImplementedError
+
+
+def talk(memory, turns, start=0):
+    for i in range(start, start + turns):
+        memory.chat_store.add_message(
+            memory.chat_store_key, ChatMessage(role=MessageRole.USER, content=f"q{i}")
+        )
+        memory.chat_store.add_message(
+            memory.chat_store_key,
+            ChatMessage(role=MessageRole.ASSISTANT, content=f"a{i}"),
+        )
+
+
+def summary_memory(llm, key):
+    return chat_mem(
+        key, WriteBehindChatStore(), llm, {"mode": "summary", "recent_messages": 2}
+    )
+
+
+def test_summary_waits_for_an_llm_slot():
+    async def run():
+        store = SimpleChatStore()
+        lane = FairLane("chat", concurrency=1, queue_size=8, max_wait=5)
+        memory = chat_mem(
+            "user",
+            store,
+            MockLLM(max_tokens=8),
+            {"mode": "summary", "recent_messages": 2},
+            lane=lane,
+        )
+        lease = await lane.acquire("other")
+        for i in range(3):
+            await memory.aput(ChatMessage(role=MessageRole.USER, content=f"q{i}"))
+            await memory.aput(ChatMessage(role=MessageRole.ASSISTANT, content=f"a{i}"))
+        await asyncio.sleep(0.05)
+        # The only slot is taken, nothing is folded yet
+        assert lane.stats()["queued"] == 1
+        assert store.get_messages(memory.summary_key) == []
+
+        lease.release()
+        for _ in range(100):
+            if store.get_messages(memory.summary_key):
+                break
+            await asyncio.sleep(0.01)
+        assert store.get_messages(memory.summary_key)
+        assert len(store.get_messages("user")) == 2
+        assert lane.stats()["active"] == 0
+
+    asyncio.run(run())
+
+
+def test_summary_prefix_is_not_fed_back():
+    llm = ScriptedLLM(prompts=[])
+    memory = summary_memory(llm, "prefix")
+
+    talk(memory, 3)
+    memory._fold()
+    talk(memory, 2, start=3)
+    memory._fold()
+
+    assert "Current summary:\nsummary 1\n" in llm.prompts[1]
+    [summary] = memory.chat_store.get_messages(memory.summary_key)
+    assert summary.content == "Earlier conversation: summary 2"
+
+
+def test_summary_is_dropped_when_history_changes():
+    llm = ScriptedLLM(prompts=[])
+    memory = summary_memory(llm, "reset")
+    llm.during = lambda: memory.chat_store.delete_messages("reset")
+
+    talk(memory, 3)
+    memory._fold()
+
+    assert memory.chat_store.get_messages(memory.summary_key) == []
+    assert memory.chat_store.get_messages("reset") == []